@@ -0,0 +1,12 @@
+BALABOBA_API_URL = 'https://zeapi.yandex.net/lab/api/yalm/text3'
+BALABOBA_CONNECT_TIMEOUT = 1
+BALABOBA_READ_TIMEOUT = 5
+BALABOBA_POOL_SIZE = 10
+
+BALABOBA_CACHE_TIMEOUT = 60 * 60
+BALABOBA_CACHE_SIZE = 256
+
+BALABOBA_FAILURE_THRESHOLD = 3
+BALABOBA_RESET_TIMEOUT = 30
+
+BALABOBA_FALLBACK_TEXT = 'Балабоба сейчас отдыхает, загляните попозже.'
@@ -0,0 +1,137 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.test import SimpleTestCase
+
+from ..utils import BalabobaClient, CircuitBreaker, TTLCache
+
+FALLBACK = 'Запасной текст'
+ANSWER = 'Привет и продолжение'
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def __call__(self):
+        return self.now
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        server.requests += 1
+        length = int(self.headers['Content-Length'])
+        query = json.loads(self.rfile.read(length))['query']
+        if server.mode == 'slow':
+            time.sleep(0.5)
+        if server.mode == 'error':
+            self.send_response(500)
+            self.end_headers()
+            return
+        body = json.dumps(
+            {'query': query, 'text': f'{query} и продолжение', 'error': 0},
+            ensure_ascii=False,
+        ).encode()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except BrokenPipeError:
+            # Клиент уже ушел по таймауту.
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+class BalabobaClientTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server.daemon_threads = True
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.start()
+        cls.url = f'http://127.0.0.1:{cls.server.server_address[1]}/'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        cls.thread.join()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.mode = 'ok'
+        self.server.requests = 0
+        self.clock = FakeClock()
+        self.client = BalabobaClient(
+            api_url=self.url,
+            timeout=(0.5, 0.2),
+            cache=TTLCache(2, 60, clock=self.clock),
+            breaker=CircuitBreaker(2, 30, clock=self.clock),
+            fallback_text=FALLBACK,
+        )
+
+    def tearDown(self):
+        self.client.close()
+
+    def test_text_is_cached(self):
+        """Ответ кешируется по началу текста"""
+        self.assertEqual(self.client.get_text('Привет'), ANSWER)
+        self.assertEqual(self.client.get_text('Привет'), ANSWER)
+        self.assertEqual(self.server.requests, 1)
+
+        self.clock.now = 61
+        self.client.get_text('Привет')
+        self.assertEqual(self.server.requests, 2)
+
+    def test_slow_upstream_returns_fallback(self):
+        """Медленный ответ обрывается таймаутом и заменяется запасным"""
+        self.server.mode = 'slow'
+        start = time.perf_counter()
+        self.assertEqual(self.client.get_text('Привет'), FALLBACK)
+        self.assertLess(time.perf_counter() - start, 0.5)
+
+    def test_circuit_breaker(self):
+        """После серии ошибок запросы не отправляются до пробного"""
+        self.server.mode = 'error'
+        for _ in range(3):
+            self.assertEqual(self.client.get_text('Привет'), FALLBACK)
+        self.assertEqual(self.server.requests, 2)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+
+        self.server.mode = 'ok'
+        self.clock.now = 31
+        self.assertEqual(self.client.get_text('Привет'), ANSWER)
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.CLOSED)
+
+    def test_async_variant(self):
+        """Асинхронный вариант возвращает тот же текст"""
+        text = asyncio.run(self.client.get_text_async('Привет'))
+        self.assertEqual(text, ANSWER)
+
+        self.server.mode = 'error'
+        self.client.breaker.record_failure()
+        self.client.breaker.record_failure()
+        text = asyncio.run(self.client.get_text_async('Пока'))
+        self.assertEqual(text, FALLBACK)
+
+
+class TTLCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        """Переполненный кеш вытесняет давно не читанную запись"""
+        cache = TTLCache(2, 60)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(len(cache), 2)
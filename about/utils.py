@@ -1,5 +1,13 @@
-import json
-import urllib.request
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import constants
 
 headers = {
     'Content-Type': 'application/json',
@@ -11,14 +19,209 @@ headers = {
     'Referer': 'https://yandex.ru/',
 }
 
-API_URL = 'https://zeapi.yandex.net/lab/api/yalm/text3'
+API_URL = constants.BALABOBA_API_URL
+
+
+class BalabobaError(Exception):
+    """Балабоба не ответила или ответила ошибкой."""
+
+
+class TTLCache:
+    """Кеш с временем жизни записей и вытеснением давно не читанных."""
+
+    def __init__(self, max_size, timeout, clock=time.monotonic):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.clock = clock
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires <= self.clock():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, self.clock() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class CircuitBreaker:
+    """Размыкается после failure_threshold ошибок подряд.
+
+    Пока цепь разомкнута, запросы не отправляются; через
+    reset_timeout секунд пропускается один пробный запрос.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half-open'
+
+    def __init__(self, failure_threshold, reset_timeout,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow_request(self):
+        with self._lock:
+            state = self.state
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._probing = False
+            if (
+                self.opened_at is not None
+                or self.failures >= self.failure_threshold
+            ):
+                self.opened_at = self.clock()
+
+
+class BalabobaClient:
+    """Клиент Балабобы: пул соединений, таймауты, кеш и размыкатель.
+
+    get_text никогда не ждет дольше таймаутов и при любых проблемах
+    отдает fallback_text; при разомкнутой цепи — сразу.
+    """
+
+    def __init__(
+        self,
+        api_url=API_URL,
+        timeout=(
+            constants.BALABOBA_CONNECT_TIMEOUT,
+            constants.BALABOBA_READ_TIMEOUT,
+        ),
+        cache=None,
+        breaker=None,
+        fallback_text=constants.BALABOBA_FALLBACK_TEXT,
+        pool_size=constants.BALABOBA_POOL_SIZE,
+    ):
+        self.api_url = api_url
+        self.timeout = timeout
+        if cache is None:
+            cache = TTLCache(
+                constants.BALABOBA_CACHE_SIZE,
+                constants.BALABOBA_CACHE_TIMEOUT,
+            )
+        if breaker is None:
+            breaker = CircuitBreaker(
+                constants.BALABOBA_FAILURE_THRESHOLD,
+                constants.BALABOBA_RESET_TIMEOUT,
+            )
+        self.cache = cache
+        self.breaker = breaker
+        self.fallback_text = fallback_text
+        self.session = requests.Session()
+        self.session.headers.update(headers)
+        adapter = HTTPAdapter(
+            pool_connections=1, pool_maxsize=pool_size, max_retries=0
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self._executor = ThreadPoolExecutor(
+            pool_size, thread_name_prefix='balaboba'
+        )
+
+    def fetch(self, start_text):
+        """Запрашивает продолжение текста; ошибки — BalabobaError."""
+        payload = {'query': start_text, 'intro': 0, 'filter': 1}
+        try:
+            response = self.session.post(
+                self.api_url, json=payload, timeout=self.timeout
+            )
+            response.raise_for_status()
+            data = response.json()
+        except (requests.RequestException, ValueError) as error:
+            raise BalabobaError(error) from error
+        if data.get('error') or not isinstance(data.get('text'), str):
+            raise BalabobaError(f'Некорректный ответ: {data!r}')
+        return data['text']
+
+    def get_text(self, start_text):
+        text = self.cache.get(start_text)
+        if text is not None:
+            return text
+        if not self.breaker.allow_request():
+            return self.fallback_text
+        try:
+            text = self.fetch(start_text)
+        except BalabobaError:
+            self.breaker.record_failure()
+            return self.fallback_text
+        self.breaker.record_success()
+        self.cache.set(start_text, text)
+        return text
+
+    async def get_text_async(self, start_text):
+        """То же в цикле событий: запрос выполняется в пуле потоков."""
+        text = self.cache.get(start_text)
+        if text is not None:
+            return text
+        if self.breaker.state == CircuitBreaker.OPEN:
+            return self.fallback_text
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, self.get_text, start_text
+        )
+
+    def close(self):
+        self.session.close()
+        self._executor.shutdown(wait=False)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = BalabobaClient()
+        return _client
 
 
 def get_balaboba_text(start_text):
-    payload = {"query": f"{start_text}", "intro": 0, "filter": 1}
-    params = json.dumps(payload).encode('utf8')
-    req = urllib.request.Request(API_URL, data=params, headers=headers)
-    response = urllib.request.urlopen(req)
-    text = response.read().decode(
-        'unicode-escape').split('"text": "')[1].split('", "error"')[0]
-    return text
+    return get_client().get_text(start_text)
+
+
+async def get_balaboba_text_async(start_text):
+    return await get_client().get_text_async(start_text)
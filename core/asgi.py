@@ -0,0 +1,30 @@
+"""ASGI-обертка над WSGI-приложением Django 2.2.
+
+Django 2.2 не умеет ASGI и async views. Обертка принимает соединения
+в цикле событий, а сам Django выполняет в пуле из ASGI_THREADS
+потоков: медленный запрос занимает поток пула, а не воркер сервера.
+"""
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import SyncToAsync
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+
+
+class ThreadPoolWsgiToAsgi(WsgiToAsgi):
+    def __init__(self, wsgi_application, threads):
+        super().__init__(wsgi_application)
+        executor = ThreadPoolExecutor(threads, thread_name_prefix='asgi')
+
+        # Стандартная обертка asgiref выполняет все запросы
+        # в одном потоке (thread_sensitive), то есть по очереди.
+        class Instance(WsgiToAsgiInstance):
+            run_wsgi_app = SyncToAsync(
+                WsgiToAsgiInstance.__dict__['run_wsgi_app'].func,
+                thread_sensitive=False,
+                executor=executor,
+            )
+
+        self.instance_class = Instance
+
+    async def __call__(self, scope, receive, send):
+        await self.instance_class(self.wsgi_application)(scope, receive, send)
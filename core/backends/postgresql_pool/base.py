@@ -0,0 +1,57 @@
+"""PostgreSQL с пулом соединений psycopg2 внутри процесса.
+
+Django 2.2 открывает соединение на запрос или держит его
+CONN_MAX_AGE секунд в каждом потоке. Пул ограничивает число
+соединений процесса и переиспользует их между потоками.
+"""
+import threading
+
+from django.db.backends.postgresql import base
+from psycopg2 import pool
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(alias, settings_dict, conn_params):
+    # Служебное соединение к базе postgres (создание тестовой базы)
+    # использует тот же alias, поэтому пул выбирается и по имени базы.
+    key = (alias, conn_params.get('database'))
+    with _pools_lock:
+        if key not in _pools:
+            options = settings_dict.get('POOL', {})
+            _pools[key] = pool.ThreadedConnectionPool(
+                options.get('MIN_SIZE', 1),
+                options.get('MAX_SIZE', 10),
+                **conn_params
+            )
+        return _pools[key]
+
+
+def close_pools():
+    with _pools_lock:
+        for connection_pool in _pools.values():
+            connection_pool.closeall()
+        _pools.clear()
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    def get_new_connection(self, conn_params):
+        self.pool = get_pool(self.alias, self.settings_dict, conn_params)
+        connection = self.pool.getconn()
+        options = self.settings_dict['OPTIONS']
+        try:
+            self.isolation_level = options['isolation_level']
+        except KeyError:
+            self.isolation_level = connection.isolation_level
+        else:
+            if self.isolation_level != connection.isolation_level:
+                connection.set_session(isolation_level=self.isolation_level)
+        return connection
+
+    def _close(self):
+        if self.connection is None:
+            return
+        # Незавершенную транзакцию пул откатывает сам.
+        with self.wrap_database_errors:
+            self.pool.putconn(self.connection)
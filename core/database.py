@@ -0,0 +1,93 @@
+"""Настройки базы данных из переменных окружения.
+
+Модуль импортируется из settings, поэтому не зависит от Django.
+"""
+import os
+
+SQLITE = 'sqlite'
+POSTGRESQL = 'postgresql'
+
+ENGINES = {
+    SQLITE: 'django.db.backends.sqlite3',
+    POSTGRESQL: 'django.db.backends.postgresql',
+}
+POOL_ENGINE = 'core.backends.postgresql_pool'
+
+TRUE_VALUES = ('1', 'true', 'yes', 'on')
+
+
+def _flag(environ, name, default=False):
+    value = environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in TRUE_VALUES
+
+
+def database_from_env(base_dir, environ=os.environ, prefix='DB_'):
+    """Собирает словарь для DATABASES из переменных с префиксом prefix.
+
+    По умолчанию SQLite-файл в base_dir. PostgreSQL включается
+    переменной DB_ENGINE=postgresql; DB_POOL=1 подключает пул
+    соединений внутри процесса вместо постоянных соединений.
+    """
+    def get(name, default=None):
+        return environ.get(prefix + name, default)
+
+    engine = get('ENGINE', SQLITE)
+    if engine not in ENGINES:
+        raise ValueError(f'Неизвестный движок базы данных: {engine}')
+
+    if engine == SQLITE:
+        return {
+            'ENGINE': ENGINES[SQLITE],
+            'NAME': get('NAME', os.path.join(base_dir, 'db.sqlite3')),
+            'OPTIONS': {
+                # Секунды ожидания блокировки записи вместо
+                # немедленной ошибки database is locked.
+                'timeout': float(get('BUSY_TIMEOUT', 20)),
+            },
+            'TEST': {'NAME': get('TEST_NAME')},
+        }
+
+    database = {
+        'ENGINE': ENGINES[POSTGRESQL],
+        'NAME': get('NAME', 'yatube'),
+        'USER': get('USER', ''),
+        'PASSWORD': get('PASSWORD', ''),
+        'HOST': get('HOST', ''),
+        'PORT': get('PORT', ''),
+        'CONN_MAX_AGE': int(get('CONN_MAX_AGE', 60)),
+        'OPTIONS': {
+            'connect_timeout': int(get('CONNECT_TIMEOUT', 5)),
+        },
+        'TEST': {'NAME': get('TEST_NAME')},
+    }
+    if _flag(environ, prefix + 'POOL'):
+        # Соединение возвращается в пул в конце запроса,
+        # поэтому постоянные соединения Django не нужны.
+        database['ENGINE'] = POOL_ENGINE
+        database['CONN_MAX_AGE'] = 0
+        database['POOL'] = {
+            'MIN_SIZE': int(get('POOL_MIN_SIZE', 1)),
+            'MAX_SIZE': int(get('POOL_MAX_SIZE', 10)),
+        }
+    return database
+
+
+def replica_from_env(base_dir, environ=os.environ, prefix='DB_REPLICA_'):
+    """Реплика для чтения, если задана DB_REPLICA_NAME или DB_REPLICA_HOST.
+
+    Незаданные DB_REPLICA_* берутся из настроек основной базы.
+    В тестах реплика зеркалирует основную базу.
+    """
+    if not (environ.get(prefix + 'NAME') or environ.get(prefix + 'HOST')):
+        return None
+    merged = {
+        prefix + key[len('DB_'):]: value
+        for key, value in environ.items()
+        if key.startswith('DB_') and not key.startswith(prefix)
+    }
+    merged.update(environ)
+    database = database_from_env(base_dir, merged, prefix)
+    database['TEST'] = {'MIRROR': 'default'}
+    return database
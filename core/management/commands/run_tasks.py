@@ -0,0 +1,64 @@
+import multiprocessing
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from core.tasks import Worker
+
+
+def work(threads, burst, poll_interval, stop=None):
+    worker = Worker(threads)
+    return worker.run(stop=stop, burst=burst, poll_interval=poll_interval)
+
+
+class Command(BaseCommand):
+    help = 'Выполняет фоновые задачи из очереди Job'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--threads', type=int, default=1,
+            help='Потоков на процесс',
+        )
+        parser.add_argument(
+            '--processes', type=int, default=1,
+            help='Процессов-обработчиков',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Выйти, когда очередь опустеет',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=None,
+            help='Пауза между опросами пустой очереди, секунд',
+        )
+
+    def handle(self, *args, **options):
+        worker_args = (
+            options['threads'], options['burst'], options['poll_interval'],
+        )
+        if options['processes'] <= 1:
+            stop = threading.Event()
+            signal.signal(signal.SIGTERM, lambda *args: stop.set())
+            try:
+                processed = work(*worker_args, stop=stop)
+            except KeyboardInterrupt:
+                return
+            self.stdout.write(f'Выполнено задач: {processed}')
+            return
+
+        # Дочерние процессы открывают свои соединения с базой.
+        connections.close_all()
+        processes = [
+            multiprocessing.Process(target=work, args=worker_args)
+            for _ in range(options['processes'])
+        ]
+        for process in processes:
+            process.start()
+        try:
+            for process in processes:
+                process.join()
+        except KeyboardInterrupt:
+            for process in processes:
+                process.terminate()
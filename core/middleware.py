@@ -0,0 +1,84 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import profiling, routers
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingMiddleware:
+    """Собирает задержку, SQL-запросы, время БД, шаблонов и кеша по view.
+
+    Профилируется доля запросов PROFILING_SAMPLE_RATE; запросы дольше
+    PROFILING_SLOW_REQUEST_MS пишутся в лог.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = settings.PROFILING_SAMPLE_RATE
+        self.slow_request_ms = settings.PROFILING_SLOW_REQUEST_MS
+        profiling.instrument_templates()
+
+    def __call__(self, request):
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile, token = profiling.start()
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile))
+                response = self.get_response(request)
+        finally:
+            profiling.stop(token)
+        elapsed = time.perf_counter() - start
+
+        match = request.resolver_match
+        view_name = match.view_name if match else 'unresolved'
+        profiling.observe(view_name, elapsed, profile)
+
+        if elapsed * 1000 >= self.slow_request_ms:
+            logger.warning(
+                'Медленный запрос %s %s (%s): %.0f мс, запросов к БД %d '
+                '(%.0f мс), шаблоны %.0f мс',
+                request.method, request.path, view_name, elapsed * 1000,
+                profile.queries, profile.db_time * 1000,
+                profile.template_time * 1000,
+            )
+        return response
+
+
+class ReplicaRoutingMiddleware:
+    """Закрепляет за пользователем основную базу после его записи.
+
+    Запрос, в котором была запись, ставит cookie на
+    REPLICA_STICKY_SECONDS: пока она жива, чтение идет с основной
+    базы, и редирект после записи видит свежие данные, даже если
+    реплика отстает.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.cookie_name = settings.REPLICA_STICKY_COOKIE
+        self.sticky_seconds = settings.REPLICA_STICKY_SECONDS
+
+    def __call__(self, request):
+        state, token = routers.start(
+            primary=self.cookie_name in request.COOKIES
+        )
+        try:
+            response = self.get_response(request)
+        finally:
+            routers.stop(token)
+        if state.wrote:
+            response.set_cookie(
+                self.cookie_name, '1', max_age=self.sticky_seconds,
+                httponly=True, samesite='Lax',
+            )
+        return response
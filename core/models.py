@@ -12,3 +12,61 @@ class CreatedModel(models.Model):
     class Meta:
         abstract = True
         ordering = ['-created']
+
+
+class ModifiedModel(CreatedModel):
+    """Абстрактная модель. Добавляет даты создания и изменения."""
+    modified = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+        db_index=True,
+    )
+
+    class Meta(CreatedModel.Meta):
+        abstract = True
+
+
+class Job(models.Model):
+    """Фоновая задача в очереди на базе данных."""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUSES = (
+        (QUEUED, 'В очереди'),
+        (RUNNING, 'Выполняется'),
+        (DONE, 'Выполнена'),
+        (FAILED, 'Ошибка'),
+    )
+
+    name = models.CharField('Задача', max_length=200)
+    payload = models.TextField('Аргументы (JSON)', default='{}')
+    idempotency_key = models.CharField(
+        'Ключ идемпотентности',
+        max_length=200,
+        unique=True,
+        blank=True,
+        null=True,
+    )
+    status = models.CharField(
+        'Статус', max_length=10, choices=STATUSES, default=QUEUED)
+    attempts = models.PositiveIntegerField('Попыток', default=0)
+    max_attempts = models.PositiveIntegerField('Максимум попыток')
+    run_at = models.DateTimeField('Запустить не раньше')
+    locked_at = models.DateTimeField('Взята в работу', blank=True, null=True)
+    locked_by = models.CharField('Обработчик', max_length=100, blank=True)
+    last_error = models.TextField('Последняя ошибка', blank=True)
+    created = models.DateTimeField('Дата создания', auto_now_add=True)
+    finished = models.DateTimeField('Завершена', blank=True, null=True)
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = (
+            models.Index(
+                fields=('status', 'run_at', 'id'),
+                name='job_status_run_at_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.name} #{self.pk} ({self.status})'
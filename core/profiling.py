@@ -0,0 +1,145 @@
+import contextvars
+import threading
+import time
+from collections import defaultdict
+
+from django.template.base import Template
+
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+_current = contextvars.ContextVar('request_profile', default=None)
+
+
+class Histogram:
+    """Гистограмма с фиксированными границами корзин."""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        index = len(self.bounds)
+        for position, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = position
+                break
+        self.buckets[index] += 1
+        self.count += 1
+        self.total += value
+
+    def as_dict(self):
+        labels = [f'le_{bound}' for bound in self.bounds] + ['inf']
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'buckets': dict(zip(labels, self.buckets)),
+        }
+
+
+class RequestProfile:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_time += time.perf_counter() - start
+
+
+class ViewStats:
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS_MS)
+        self.db_time = Histogram(LATENCY_BUCKETS_MS)
+        self.template_time = Histogram(LATENCY_BUCKETS_MS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def as_dict(self):
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'requests': self.latency.count,
+            'latency_ms': self.latency.as_dict(),
+            'db_time_ms': self.db_time.as_dict(),
+            'template_time_ms': self.template_time.as_dict(),
+            'queries': self.queries.as_dict(),
+            'cache_hit_ratio': (
+                round(self.cache_hits / lookups, 3) if lookups else None
+            ),
+        }
+
+
+_stats = defaultdict(ViewStats)
+_stats_lock = threading.Lock()
+
+
+def start():
+    profile = RequestProfile()
+    return profile, _current.set(profile)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def observe(view_name, elapsed, profile):
+    with _stats_lock:
+        stats = _stats[view_name]
+        stats.latency.observe(elapsed * 1000)
+        stats.db_time.observe(profile.db_time * 1000)
+        stats.template_time.observe(profile.template_time * 1000)
+        stats.queries.observe(profile.queries)
+        stats.cache_hits += profile.cache_hits
+        stats.cache_misses += profile.cache_misses
+
+
+def snapshot():
+    """Агрегированные метрики по view с момента запуска процесса."""
+    with _stats_lock:
+        return {name: stats.as_dict() for name, stats in _stats.items()}
+
+
+def reset():
+    with _stats_lock:
+        _stats.clear()
+
+
+def record_cache(hits=0, misses=0):
+    """Учитывает обращения к кешу в профиле текущего запроса."""
+    profile = _current.get()
+    if profile is not None:
+        profile.cache_hits += hits
+        profile.cache_misses += misses
+
+
+def _timed_render(render):
+    def wrapper(self, context):
+        profile = _current.get()
+        if profile is None or profile.template_depth:
+            return render(self, context)
+        profile.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            profile.template_time += time.perf_counter() - start
+            profile.template_depth -= 1
+    wrapper.profiled = True
+    return wrapper
+
+
+def instrument_templates():
+    """Подключает замер времени рендера шаблонов верхнего уровня."""
+    if not getattr(Template.render, 'profiled', False):
+        Template.render = _timed_render(Template.render)
@@ -0,0 +1,98 @@
+"""Маршрутизация чтения на реплики с чтением своих записей."""
+import contextvars
+import random
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+# Приложения, которые всегда читаются с основной базы: сессия,
+# созданная при входе, должна быть видна уже следующему запросу,
+# а очередь задач захватывается по только что прочитанному статусу.
+PRIMARY_ONLY_APPS = ('sessions', 'thumbnail', 'core')
+
+
+class RoutingState:
+    def __init__(self, primary=False):
+        self.primary = primary
+        self.wrote = False
+
+
+_state = contextvars.ContextVar('routing_state', default=None)
+
+
+def start(primary=False):
+    """Начинает маршрутизацию запроса; возвращает (state, token)."""
+    state = RoutingState(primary)
+    return state, _state.set(state)
+
+
+def stop(token):
+    _state.reset(token)
+
+
+@contextmanager
+def use_primary():
+    """Читает с основной базы внутри блока."""
+    state = _state.get()
+    if state is None:
+        state, token = start(primary=True)
+        try:
+            yield state
+        finally:
+            stop(token)
+        return
+    previous, state.primary = state.primary, True
+    try:
+        yield state
+    finally:
+        state.primary = previous
+
+
+def primary_view(view):
+    """Помечает view, которая пишет: все ее запросы идут в основную базу."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with use_primary():
+            return view(request, *args, **kwargs)
+
+    wrapper.use_primary = True
+    return wrapper
+
+
+def replicas():
+    return settings.DATABASE_REPLICAS
+
+
+class PrimaryReplicaRouter:
+    """Запись всегда в основную базу, чтение со случайной реплики.
+
+    Чтение переходит на основную базу, если запрос помечен как
+    пишущий или пользователь недавно что-то записал.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            not replicas()
+            or model._meta.app_label in PRIMARY_ONLY_APPS
+            or (state is not None and (state.primary or state.wrote))
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas())
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.app_label not in (
+            PRIMARY_ONLY_APPS
+        ):
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        return obj1._state.db in aliases and obj2._state.db in aliases
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,217 @@
+"""Очередь фоновых задач на таблице Job без внешнего брокера.
+
+Задача объявляется декоратором @task и ставится в очередь вызовом
+.delay(...) после коммита текущей транзакции. Обработчик — команда
+run_tasks — забирает задачи из таблицы, повторяет упавшие с
+экспоненциальной задержкой и помечает исчерпавшие попытки как failed.
+С TASKS_EAGER (так работают тесты) задача выполняется в этом же
+процессе сразу после коммита, без таблицы.
+И там, и там задача читает с основной базы, а не с реплики.
+"""
+import functools
+import json
+import logging
+import os
+import socket
+import threading
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connections, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .models import Job
+from . import routers
+
+logger = logging.getLogger(__name__)
+
+LOCK_EXPIRED = 'Захват истек: обработчик пропал, не завершив задачу'
+
+
+class Task:
+    def __init__(self, func, max_attempts=None):
+        functools.update_wrapper(self, func)
+        self.func = func
+        self.name = f'{func.__module__}.{func.__name__}'
+        self.max_attempts = max_attempts
+
+    def __call__(self, *args, **kwargs):
+        # Задачу ставят сразу после коммита: реплика могла еще
+        # не получить строки, с которыми ей работать.
+        with routers.use_primary():
+            return self.func(*args, **kwargs)
+
+    def delay(self, *args, key=None, **kwargs):
+        """Ставит задачу в очередь после коммита; key убирает дубли."""
+        if settings.TASKS_EAGER:
+            transaction.on_commit(lambda: self(*args, **kwargs))
+            return
+        transaction.on_commit(
+            lambda: enqueue(self, args, kwargs, key=key)
+        )
+
+
+def task(func=None, *, max_attempts=None):
+    """Делает функцию фоновой задачей с JSON-совместимыми аргументами."""
+    if func is None:
+        return functools.partial(task, max_attempts=max_attempts)
+    return Task(func, max_attempts)
+
+
+def enqueue(task, args=(), kwargs=None, key=None, run_at=None):
+    """Создает Job; с занятым key возвращает уже существующую задачу."""
+    payload = json.dumps({'args': list(args), 'kwargs': kwargs or {}})
+    job = Job(
+        name=task.name,
+        payload=payload,
+        idempotency_key=key,
+        max_attempts=task.max_attempts or settings.TASKS_MAX_ATTEMPTS,
+        run_at=run_at or timezone.now(),
+    )
+    try:
+        with transaction.atomic():
+            job.save()
+    except IntegrityError:
+        if key is None:
+            raise
+        return Job.objects.get(idempotency_key=key)
+    return job
+
+
+def backoff(attempts):
+    """Задержка перед повтором: удваивается с каждой попыткой."""
+    seconds = settings.TASKS_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.TASKS_BACKOFF_MAX))
+
+
+class Worker:
+    """Забирает и выполняет задачи в threads потоках."""
+
+    def __init__(self, threads=1, name=None):
+        self.threads = threads
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+
+    def claim(self, limit):
+        """Захватывает до limit готовых задач.
+
+        Захват — UPDATE с условием на прежний статус: задачу получает
+        только тот обработчик, чей UPDATE изменил строку.
+
+        Живой обработчик продлевает захват (heartbeat), поэтому задача,
+        не продленная дольше TASKS_LOCK_TIMEOUT, потеряна вместе с ним.
+        Потерянный запуск считается неудачной попыткой: задача, роняющая
+        процесс, не повторяется бесконечно.
+        """
+        now = timezone.now()
+        stale = now - timedelta(seconds=settings.TASKS_LOCK_TIMEOUT)
+        lost = Job.objects.filter(status=Job.RUNNING, locked_at__lt=stale)
+        released = dict(
+            attempts=F('attempts') + 1,
+            last_error=LOCK_EXPIRED,
+            locked_at=None,
+            locked_by='',
+        )
+        lost.filter(attempts__gte=F('max_attempts') - 1).update(
+            status=Job.FAILED, finished=now, **released
+        )
+        lost.update(status=Job.QUEUED, **released)
+
+        candidates = Job.objects.filter(
+            status=Job.QUEUED, run_at__lte=now
+        ).order_by('run_at', 'id').values_list('pk', flat=True)[:limit]
+        claimed = []
+        for pk in candidates:
+            if Job.objects.filter(pk=pk, status=Job.QUEUED).update(
+                status=Job.RUNNING, locked_at=now, locked_by=self.name,
+            ):
+                claimed.append(pk)
+        return list(Job.objects.filter(pk__in=claimed))
+
+    def _beat(self, pk, stop):
+        try:
+            while not stop.wait(settings.TASKS_HEARTBEAT_INTERVAL):
+                Job.objects.filter(
+                    pk=pk, status=Job.RUNNING, locked_by=self.name
+                ).update(locked_at=timezone.now())
+        finally:
+            connections.close_all()
+
+    @contextmanager
+    def heartbeat(self, job):
+        """Продлевает захват задачи, пока она выполняется.
+
+        Без этого задача дольше TASKS_LOCK_TIMEOUT считалась бы
+        зависшей, и ее запустил бы второй обработчик.
+        """
+        stop = threading.Event()
+        beat = threading.Thread(
+            target=self._beat, args=(job.pk, stop), daemon=True)
+        beat.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            beat.join()
+
+    def execute(self, job):
+        job.attempts += 1
+        try:
+            data = json.loads(job.payload)
+            with self.heartbeat(job):
+                import_string(job.name)(*data['args'], **data['kwargs'])
+        except Exception:
+            job.last_error = traceback.format_exc()
+            if job.attempts < job.max_attempts:
+                job.status = Job.QUEUED
+                job.run_at = timezone.now() + backoff(job.attempts)
+            else:
+                job.status = Job.FAILED
+                job.finished = timezone.now()
+                logger.error('Задача %s не выполнена: %s', job, job.last_error)
+        else:
+            job.status = Job.DONE
+            job.finished = timezone.now()
+        job.locked_at = None
+        job.locked_by = ''
+        job.save(update_fields=(
+            'attempts', 'status', 'run_at', 'finished', 'last_error',
+            'locked_at', 'locked_by',
+        ))
+        return job
+
+    def _execute_in_thread(self, job):
+        try:
+            return self.execute(job)
+        finally:
+            connections.close_all()
+
+    def run_once(self):
+        """Выполняет одну пачку задач; возвращает их число."""
+        jobs = self.claim(self.threads)
+        if self.threads == 1:
+            for job in jobs:
+                self.execute(job)
+        elif jobs:
+            with ThreadPoolExecutor(self.threads) as executor:
+                list(executor.map(self._execute_in_thread, jobs))
+        return len(jobs)
+
+    def run(self, stop=None, burst=False, poll_interval=None):
+        """Работает до stop.set(); burst — до опустошения очереди."""
+        stop = stop or threading.Event()
+        if poll_interval is None:
+            poll_interval = settings.TASKS_POLL_INTERVAL
+        processed = 0
+        while not stop.is_set():
+            count = self.run_once()
+            processed += count
+            if not count:
+                if burst:
+                    break
+                stop.wait(poll_interval)
+        return processed
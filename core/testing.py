@@ -0,0 +1,34 @@
+"""Помощники тестов."""
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test.runner import DiscoverRunner
+
+
+class TestRunner(DiscoverRunner):
+    """Тесты выполняют фоновые задачи в своем процессе, без run_tasks."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        settings.TASKS_EAGER = True
+
+
+@contextmanager
+def on_commit_callbacks(using=DEFAULT_DB_ALIAS):
+    """Выполняет колбэки transaction.on_commit, поставленные в блоке.
+
+    TestCase не коммитит транзакцию теста, поэтому иначе они не
+    выполняются никогда. Колбэки, поставленные колбэками, тоже
+    выполняются; список выполненных отдается в as.
+    """
+    connection = connections[using]
+    start = len(connection.run_on_commit)
+    callbacks = []
+    yield callbacks
+    while len(connection.run_on_commit) > start:
+        pending = connection.run_on_commit[start:]
+        del connection.run_on_commit[start:]
+        for _, callback in pending:
+            callbacks.append(callback)
+            callback()
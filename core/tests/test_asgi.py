@@ -0,0 +1,33 @@
+import asyncio
+import time
+
+from django.test import SimpleTestCase
+
+from posts.benchmarks import asgi_get, asgi_throughput
+from ..asgi import ThreadPoolWsgiToAsgi
+
+SLOW_REQUEST_SECONDS = 0.2
+
+
+def slow_wsgi_application(environ, start_response):
+    time.sleep(SLOW_REQUEST_SECONDS)
+    start_response('200 OK', [('Content-Type', 'text/plain')])
+    return [environ['PATH_INFO'].encode()]
+
+
+class ThreadPoolWsgiToAsgiTests(SimpleTestCase):
+    def test_slow_requests_run_in_parallel(self):
+        """Медленные запросы выполняются в пуле потоков параллельно"""
+        application = ThreadPoolWsgiToAsgi(slow_wsgi_application, threads=4)
+        start = time.perf_counter()
+        result = asgi_throughput(application, '/', concurrency=4, total=4)
+        elapsed = time.perf_counter() - start
+        self.assertEqual(result['requests'], 4)
+        self.assertLess(elapsed, SLOW_REQUEST_SECONDS * 2)
+
+    def test_django_application(self):
+        """ASGI-приложение проекта отвечает страницей Django"""
+        from yatube.asgi import application
+
+        status = asyncio.run(asgi_get(application, '/about/author/'))
+        self.assertEqual(status, 200)
@@ -0,0 +1,85 @@
+import os
+import tempfile
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.backends.sqlite3.base import DatabaseWrapper
+from django.test import SimpleTestCase, TransactionTestCase
+
+from ..database import POOL_ENGINE, database_from_env
+
+
+class DatabaseFromEnvTests(SimpleTestCase):
+    def test_sqlite_by_default(self):
+        """Без переменных окружения используется SQLite-файл"""
+        database = database_from_env('/srv', environ={})
+        self.assertEqual(database['ENGINE'], 'django.db.backends.sqlite3')
+        self.assertEqual(database['NAME'], '/srv/db.sqlite3')
+        self.assertEqual(database['OPTIONS']['timeout'], 20)
+
+    def test_postgresql(self):
+        """PostgreSQL настраивается переменными DB_*"""
+        database = database_from_env('/srv', environ={
+            'DB_ENGINE': 'postgresql',
+            'DB_NAME': 'yatube',
+            'DB_HOST': 'db',
+            'DB_CONN_MAX_AGE': '300',
+        })
+        self.assertEqual(
+            database['ENGINE'], 'django.db.backends.postgresql'
+        )
+        self.assertEqual(database['HOST'], 'db')
+        self.assertEqual(database['CONN_MAX_AGE'], 300)
+        self.assertNotIn('POOL', database)
+
+    def test_postgresql_pool(self):
+        """DB_POOL включает пул и отключает постоянные соединения"""
+        database = database_from_env('/srv', environ={
+            'DB_ENGINE': 'postgresql',
+            'DB_POOL': 'true',
+            'DB_POOL_MAX_SIZE': '20',
+        })
+        self.assertEqual(database['ENGINE'], POOL_ENGINE)
+        self.assertEqual(database['CONN_MAX_AGE'], 0)
+        self.assertEqual(database['POOL'], {'MIN_SIZE': 1, 'MAX_SIZE': 20})
+
+    def test_unknown_engine(self):
+        """Неизвестный движок приводит к ошибке"""
+        with self.assertRaises(ValueError):
+            database_from_env('/srv', environ={'DB_ENGINE': 'oracle'})
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Прагмы SQLite')
+class SQLitePragmasTests(SimpleTestCase):
+    def test_file_database_uses_wal(self):
+        """Соединение с файлом SQLite переводится в WAL и NORMAL"""
+        with tempfile.TemporaryDirectory() as directory:
+            settings_dict = dict(
+                connection.settings_dict,
+                NAME=os.path.join(directory, 'db.sqlite3'),
+            )
+            file_connection = DatabaseWrapper(settings_dict, 'pragmas')
+            try:
+                with file_connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    self.assertEqual(cursor.fetchone()[0], 'wal')
+                    cursor.execute('PRAGMA synchronous')
+                    self.assertEqual(cursor.fetchone()[0], 1)
+            finally:
+                file_connection.close()
+
+
+@skipUnless(
+    connection.settings_dict['ENGINE'] == POOL_ENGINE,
+    'Тесты пула запускаются с DB_ENGINE=postgresql и DB_POOL=1',
+)
+class ConnectionPoolTests(TransactionTestCase):
+    def test_connection_returns_to_pool(self):
+        """После закрытия соединение возвращается в пул и переиспользуется"""
+        connection.ensure_connection()
+        raw_connection = connection.connection
+        pool = connection.pool
+        connection.close()
+        self.assertIn(raw_connection, pool._pool)
+        connection.ensure_connection()
+        self.assertIs(connection.connection, raw_connection)
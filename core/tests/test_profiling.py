@@ -0,0 +1,48 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from .. import profiling
+
+User = get_user_model()
+
+
+@override_settings(PROFILING_SAMPLE_RATE=1.0)
+class ProfilingMiddlewareTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        profiling.reset()
+        self.client = Client()
+
+    def test_request_metrics_are_aggregated_per_view(self):
+        """Метрики запросов собираются по каждой view"""
+        self.client.get(reverse('posts:index'))
+        self.client.get(reverse('posts:index'))
+
+        stats = profiling.snapshot()['posts:index']
+        self.assertEqual(stats['requests'], 2)
+        self.assertEqual(stats['latency_ms']['count'], 2)
+        self.assertGreater(stats['queries']['sum'], 0)
+        self.assertGreater(stats['template_time_ms']['sum'], 0)
+        self.assertEqual(stats['cache_hit_ratio'], 0.5)
+
+    @override_settings(PROFILING_SAMPLE_RATE=0.0)
+    def test_unsampled_requests_are_skipped(self):
+        """Запросы вне выборки не профилируются"""
+        Client().get(reverse('posts:index'))
+        self.assertEqual(profiling.snapshot(), {})
+
+    def test_metrics_endpoint_is_staff_only(self):
+        """Метрики доступны только персоналу"""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+        staff = User.objects.create_user(username='staff', is_staff=True)
+        self.client.force_login(staff)
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIn('posts:index', response.json())
@@ -0,0 +1,124 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+from unittest import skipUnless
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import Client, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from posts import views
+from posts.models import Post
+from .. import routers
+from ..testing import on_commit_callbacks
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class PrimaryReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+
+    def test_reads_go_to_replica(self):
+        """Чтение идет на реплику, запись и сессии в основную базу"""
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+        self.assertEqual(self.router.db_for_write(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+
+    def test_primary_after_write(self):
+        """После записи в том же запросе чтение идет в основную базу"""
+        state, token = routers.start()
+        try:
+            self.assertEqual(self.router.db_for_read(Post), 'replica')
+            self.router.db_for_write(Post)
+            self.assertTrue(state.wrote)
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        finally:
+            routers.stop(token)
+
+    def test_use_primary(self):
+        """Внутри use_primary чтение идет в основную базу"""
+        with routers.use_primary():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+        self.assertEqual(self.router.db_for_read(Post), 'replica')
+
+    def test_write_views_use_primary(self):
+        """Все пишущие views помечены для основной базы"""
+        for view in (views.post_create, views.post_edit, views.add_comment,
+                     views.profile_follow, views.profile_unfollow):
+            with self.subTest(view=view.__name__):
+                self.assertTrue(getattr(view, 'use_primary', False))
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Реплика копируется из SQLite')
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    """Основная база и отстающая реплика в отдельном файле SQLite."""
+
+    databases = {'default', 'replica'}
+
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.mkdtemp()
+        cls.author = User.objects.create_user(username='author')
+        # Реплика получает снимок базы до начала теста и дальше отстает.
+        connection.ensure_connection()
+        replica_name = os.path.join(cls.directory, 'replica.sqlite3')
+        with sqlite3.connect(replica_name) as replica:
+            connection.connection.backup(replica)
+        replica.close()
+        settings.DATABASES['replica'] = dict(
+            connection.settings_dict, NAME=replica_name,
+        )
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        connections['replica'].close()
+        del connections['replica']
+        del settings.DATABASES['replica']
+        cls.author.delete()
+        shutil.rmtree(cls.directory, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(ReplicaRoutingTests.author)
+
+    def test_reads_use_lagging_replica(self):
+        """Чтение без недавней записи видит только данные реплики"""
+        with on_commit_callbacks():
+            post = Post.objects.create(
+                author=ReplicaRoutingTests.author, text='Пост не на реплике',
+            )
+        url = reverse('posts:post_detail', args=(post.pk,))
+        # Сразу после инвалидации страница строится по основной базе.
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+        # Окно после инвалидации истекло.
+        cache.clear()
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_writer_reads_own_write(self):
+        """Автор после публикации видит свой пост, пока реплика отстает"""
+        response = self.author_client.post(
+            reverse('posts:post_create'), {'text': 'Свежий пост'},
+            follow=True,
+        )
+        self.assertIn(
+            settings.REPLICA_STICKY_COOKIE, self.author_client.cookies
+        )
+        self.assertContains(response, 'Свежий пост')
+
+        cache.clear()
+        reader = Client()
+        reader.force_login(ReplicaRoutingTests.author)
+        response = reader.get(reverse('posts:profile', args=('author',)))
+        self.assertNotContains(response, 'Свежий пост')
@@ -0,0 +1,186 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from posts import tasks as post_tasks
+from posts.models import Follow, Post, TimelineEntry
+from ..models import Job
+from ..testing import on_commit_callbacks
+from .. import routers, tasks
+
+User = get_user_model()
+
+calls = []
+
+
+@tasks.task
+def record(value):
+    calls.append(value)
+
+
+@tasks.task(max_attempts=2)
+def explode():
+    raise RuntimeError('Сбой задачи')
+
+
+@tasks.task
+def record_read_database():
+    calls.append(routers.PrimaryReplicaRouter().db_for_read(Post))
+
+
+@override_settings(TASKS_EAGER=False)
+class TaskQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+        self.worker = tasks.Worker()
+
+    def test_worker_runs_queued_job(self):
+        """Обработчик выполняет задачу из очереди и отмечает ее"""
+        job = tasks.enqueue(record, ('первая',))
+        self.assertEqual(self.worker.run(burst=True), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.DONE)
+        self.assertEqual(calls, ['первая'])
+
+    def test_failed_job_retried_with_backoff(self):
+        """Упавшая задача повторяется с задержкой, потом помечается failed"""
+        job = tasks.enqueue(explode)
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('Сбой задачи', job.last_error)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertEqual(self.worker.run_once(), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+
+    def test_backoff_doubles_up_to_limit(self):
+        """Пауза между повторами удваивается и ограничена сверху"""
+        with self.settings(TASKS_BACKOFF_SECONDS=10, TASKS_BACKOFF_MAX=30):
+            self.assertEqual(
+                [tasks.backoff(attempt).seconds for attempt in (1, 2, 3)],
+                [10, 20, 30],
+            )
+
+    def test_idempotency_key_deduplicates(self):
+        """Повторная постановка с тем же ключом не создает задачу"""
+        first = tasks.enqueue(record, ('раз',), key='record:1')
+        second = tasks.enqueue(record, ('два',), key='record:1')
+        self.assertEqual(first.pk, second.pk)
+        self.worker.run(burst=True)
+        self.assertEqual(calls, ['раз'])
+
+    def test_stale_running_job_reclaimed(self):
+        """Зависшая задача возвращается в очередь и выполняется"""
+        job = tasks.enqueue(record, ('зависшая',))
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING,
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+        self.worker.run(burst=True)
+        self.assertEqual(calls, ['зависшая'])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.DONE, 2))
+
+    def test_stale_job_without_attempts_left_fails(self):
+        """Потерянный запуск последней попытки помечает задачу failed"""
+        job = tasks.enqueue(explode)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING,
+            attempts=1,
+            locked_at=timezone.now() - timedelta(days=1),
+        )
+        self.assertEqual(self.worker.run_once(), 0)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
+        self.assertEqual(job.last_error, tasks.LOCK_EXPIRED)
+
+    def test_heartbeat_extends_lock(self):
+        """Пока задача выполняется, обработчик продлевает ее захват"""
+        job = tasks.enqueue(record, ('долгая',))
+        locked_at = timezone.now() - timedelta(days=1)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.RUNNING,
+            locked_at=locked_at,
+            locked_by=self.worker.name,
+        )
+        stop = mock.Mock(**{'wait.side_effect': [False, True]})
+        self.worker._beat(job.pk, stop)
+        job.refresh_from_db()
+        self.assertGreater(job.locked_at, locked_at)
+        self.assertEqual(self.worker.claim(1), [])
+
+    def test_run_tasks_command(self):
+        """run_tasks --burst выполняет очередь и завершается"""
+        tasks.enqueue(record, ('команда',))
+        stdout = StringIO()
+        call_command('run_tasks', burst=True, stdout=stdout)
+        self.assertEqual(calls, ['команда'])
+        self.assertIn('Выполнено задач: 1', stdout.getvalue())
+
+    @override_settings(DATABASE_REPLICAS=['replica'])
+    def test_worker_reads_primary(self):
+        """Задачи читают с основной базы, а не с отстающей реплики"""
+        tasks.enqueue(record_read_database)
+        self.worker.run(burst=True)
+        self.assertEqual(calls, ['default'])
+
+    def test_missing_post_is_retried(self):
+        """Задача по несуществующему посту не считается выполненной"""
+        job = tasks.enqueue(post_tasks.fan_out_post, (0,))
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+        self.assertIn('DoesNotExist', job.last_error)
+
+    def test_eager_runs_after_commit(self):
+        """С TASKS_EAGER задача выполняется после коммита без очереди"""
+        with self.settings(TASKS_EAGER=True), on_commit_callbacks():
+            record.delay('после коммита')
+            self.assertEqual(calls, [])
+        self.assertEqual(calls, ['после коммита'])
+        self.assertFalse(Job.objects.exists())
+
+
+@override_settings(TASKS_EAGER=False)
+class OnCommitEnqueueTests(TransactionTestCase):
+    def test_delay_waits_for_commit(self):
+        """delay ставит задачу только после коммита транзакции"""
+        with transaction.atomic():
+            record.delay('после коммита', key='commit')
+            self.assertFalse(Job.objects.exists())
+        self.assertTrue(Job.objects.filter(idempotency_key='commit').exists())
+
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                record.delay('откат', key='rollback')
+                raise RuntimeError
+        self.assertFalse(
+            Job.objects.filter(idempotency_key='rollback').exists())
+
+    def test_post_side_effects_run_in_worker(self):
+        """Лента и поисковый индекс нового поста строятся обработчиком"""
+        author = User.objects.create_user(username='author')
+        reader = User.objects.create_user(username='reader')
+        Follow.objects.create(user=reader, author=author)
+        Job.objects.all().delete()
+
+        post = Post.objects.create(author=author, text='Фоновый пост')
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+        self.assertEqual(set(Job.objects.values_list('name', flat=True)), {
+            'posts.tasks.fan_out_post', 'posts.tasks.index_post',
+        })
+
+        tasks.Worker().run(burst=True)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=reader, post=post).exists())
+        self.assertFalse(Job.objects.exclude(status=Job.DONE).exists())
@@ -1,5 +1,9 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 from django.shortcuts import render
 
+from . import profiling
+
 
 def page_not_found(request, exception):
     template = 'core/404.html'
@@ -12,3 +16,11 @@ def page_not_found(request, exception):
 def csrf_failure(request, reason=''):
     template = 'core/403csrf.html'
     return render(request, template)
+
+
+@staff_member_required
+def metrics(request):
+    return JsonResponse(
+        profiling.snapshot(),
+        json_dumps_params={'ensure_ascii': False, 'indent': 2},
+    )
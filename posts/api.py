@@ -0,0 +1,118 @@
+"""JSON API только для чтения: лента, группы, авторы, посты и подписки.
+
+Строки берутся .values()-проекциями без создания моделей и листаются
+тем же keyset-курсором, что и страницы. ?fields=id,text сужает
+выборку, ?limit= — размер страницы, ?format=msgpack отдает MessagePack,
+если установлен необязательный пакет msgpack.
+"""
+import json
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from . import constants
+from .utils import CursorPaginator
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+JSON = 'json'
+MSGPACK = 'msgpack'
+CONTENT_TYPES = {
+    JSON: 'application/json; charset=utf-8',
+    MSGPACK: 'application/msgpack',
+}
+
+# Имя поля в ответе -> поле проекции.
+POST_FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'created': 'created',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+    'comments_count': 'comments_count',
+}
+GROUP_FIELDS = ('slug', 'title', 'description')
+AUTHOR_FIELDS = {
+    'username': 'username',
+    'first_name': 'first_name',
+    'last_name': 'last_name',
+    'posts_count': 'stats__posts_count',
+    'followers_count': 'stats__followers_count',
+    'following_count': 'stats__following_count',
+}
+
+
+def selected_fields(request, available=POST_FIELDS):
+    """Поля из ?fields=; неизвестные пропускаются, пустой выбор — все."""
+    requested = request.GET.get('fields', '').split(',')
+    names = [name for name in requested if name in available]
+    return names or list(available)
+
+
+def page_size(request):
+    limit = request.GET.get('limit', '')
+    if not limit.isdigit() or not int(limit):
+        return constants.API_PAGE_SIZE
+    return min(int(limit), constants.API_MAX_PAGE_SIZE)
+
+
+def _plain(name, value):
+    if name == 'image':
+        return settings.MEDIA_URL + value if value else None
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def item(row, names, available=POST_FIELDS):
+    return {name: _plain(name, row[available[name]]) for name in names}
+
+
+def project(queryset, names, available=POST_FIELDS, extra=()):
+    """values() только с выбранными полями и полями сортировки."""
+    fields = {available[name] for name in names}
+    return queryset.values(*fields.union(extra))
+
+
+def post_page(request, queryset, ordering=('created', 'id')):
+    """Страница постов: results и курсоры next/previous."""
+    names = selected_fields(request)
+    paginator = CursorPaginator(
+        project(queryset, names, extra=ordering),
+        page_size(request),
+        ordering,
+    )
+    page = paginator.get_page(request.GET.get('cursor'))
+    return {
+        'results': [item(row, names) for row in page],
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    }
+
+
+def render(request, data, status=200):
+    """Компактный JSON или MessagePack по ?format=."""
+    data_format = request.GET.get('format', JSON)
+    if data_format == MSGPACK:
+        if msgpack is None:
+            return render_error(
+                'Формат msgpack недоступен: пакет не установлен', 406)
+        content = msgpack.packb(data, use_bin_type=True)
+    else:
+        data_format = JSON
+        content = json.dumps(
+            data, ensure_ascii=False, separators=(',', ':'))
+    return HttpResponse(
+        content, content_type=CONTENT_TYPES[data_format], status=status)
+
+
+def render_error(detail, status):
+    return HttpResponse(
+        json.dumps({'detail': detail}, ensure_ascii=False),
+        content_type=CONTENT_TYPES[JSON],
+        status=status,
+    )
@@ -0,0 +1,231 @@
+"""Пакетная запись постов, комментариев и подписок.
+
+Каждый элемент проверяется логикой PostForm/CommentForm, все
+упомянутые группы, посты и авторы подгружаются одним запросом на
+модель, а записи создаются bulk_create в одной транзакции. Ошибка
+одного элемента не мешает остальным: результат возвращается для
+каждого элемента по порядку.
+
+bulk_create не отправляет сигналы, поэтому их работа — счетчики,
+ленты, поисковый индекс, пути комментариев и сброс кеша — делается
+здесь же пакетно.
+"""
+from django.db import transaction
+
+from .cache import invalidate
+from .forms import BatchCommentForm, BatchPostForm
+from .models import Comment, Follow, Group, Post, User
+from . import constants, counters, digests, feed, search
+
+FOLLOW = 'follow'
+UNFOLLOW = 'unfollow'
+
+
+class BatchError(ValueError):
+    pass
+
+
+def check_items(items):
+    if not isinstance(items, list) or not items:
+        raise BatchError('Ожидается непустой список items')
+    if len(items) > constants.BATCH_MAX_ITEMS:
+        raise BatchError(
+            f'Не больше {constants.BATCH_MAX_ITEMS} элементов за раз')
+    if not all(isinstance(item, dict) for item in items):
+        raise BatchError('Каждый элемент должен быть объектом')
+
+
+def _is_id(value):
+    # bool — подкласс int: true не должен находить объект с pk 1.
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _ids(items, key):
+    """Целые id из items[key]; мусор отсеется при проверке элемента."""
+    values = (item.get(key) for item in items)
+    return {value for value in values if _is_id(value)}
+
+
+def _lookup(objects, value):
+    return objects.get(value) if _is_id(value) else None
+
+
+def _failed(errors):
+    return {'ok': False, 'errors': errors}
+
+
+def _assign_pks(model, objects):
+    """Проставляет id созданным объектам, если база их не вернула.
+
+    SQLite не возвращает id из bulk_create, но внутри транзакции он
+    заблокирован на запись, поэтому последние len(objects) строк
+    таблицы — наши и идут в порядке вставки.
+    """
+    if not objects or objects[0].pk is not None:
+        return
+    pks = sorted(model.objects.order_by('-pk').values_list(
+        'pk', flat=True)[:len(objects)])
+    for obj, pk in zip(objects, pks):
+        obj.pk = pk
+
+
+def create_posts(author, items):
+    """Создает посты author; элемент — {'text': ..., 'group': id}."""
+    check_items(items)
+    groups = Group.objects.only('pk', 'slug').in_bulk(_ids(items, 'group'))
+
+    results, posts = [], []
+    for item in items:
+        form = BatchPostForm({'text': item.get('text')})
+        group_id = item.get('group')
+        group = _lookup(groups, group_id)
+        if not form.is_valid():
+            results.append(_failed(form.errors.get_json_data()))
+        elif group_id is not None and group is None:
+            results.append(_failed({'group': 'Группа не найдена'}))
+        else:
+            post = form.save(commit=False)
+            post.author = author
+            post.group = group
+            posts.append(post)
+            results.append(post)
+
+    with transaction.atomic():
+        Post.objects.bulk_create(posts, constants.BATCH_SIZE)
+        _assign_pks(Post, posts)
+        counters.posts_added(posts)
+        feed.fan_out_posts(posts)
+        search.get_backend().index_new(posts)
+
+    if posts:
+        invalidate('index', f'profile:{author.username}', *{
+            f'group:{post.group.slug}' for post in posts if post.group
+        })
+    return [
+        {'ok': True, 'id': result.pk} if isinstance(result, Post) else result
+        for result in results
+    ]
+
+
+def create_comments(author, items):
+    """Создает комментарии; элемент — {'post': id, 'text', 'parent': id}."""
+    check_items(items)
+    posts = Post.objects.only('pk').in_bulk(_ids(items, 'post'))
+    parents = Comment.objects.only(
+        'pk', 'post_id', 'parent_id', 'path'
+    ).in_bulk(_ids(items, 'parent'))
+
+    results, comments = [], []
+    for item in items:
+        form = BatchCommentForm({'text': item.get('text')})
+        post_id, parent_id = item.get('post'), item.get('parent')
+        parent = _lookup(parents, parent_id)
+        if not form.is_valid():
+            results.append(_failed(form.errors.get_json_data()))
+        elif _lookup(posts, post_id) is None:
+            results.append(_failed({'post': 'Пост не найден'}))
+        elif parent_id is not None and (
+            parent is None or parent.post_id != post_id
+        ):
+            results.append(_failed({'parent': 'Комментарий не найден'}))
+        else:
+            comment = form.save(commit=False)
+            comment.author = author
+            comment.post_id = post_id
+            comment.path = ''
+            if parent is not None:
+                # Как и в CommentForm: слишком глубокий ответ встает
+                # рядом с родителем.
+                if parent.depth >= constants.COMMENT_MAX_DEPTH - 1:
+                    comment.parent_id = parent.parent_id
+                    comment.path = parent.path[
+                        :-constants.COMMENT_PATH_STEP]
+                else:
+                    comment.parent_id = parent.pk
+                    comment.path = parent.path
+            comments.append(comment)
+            results.append(comment)
+
+    with transaction.atomic():
+        Comment.objects.bulk_create(comments, constants.BATCH_SIZE)
+        _assign_pks(Comment, comments)
+        for comment in comments:
+            comment.path += str(comment.pk).zfill(
+                constants.COMMENT_PATH_STEP)
+        Comment.objects.bulk_update(
+            comments, ('path',), constants.BATCH_SIZE)
+        counters.comments_added(comments)
+
+    if comments:
+        invalidate(*{f'post:{comment.post_id}' for comment in comments})
+    return [
+        {'ok': True, 'id': result.pk} if isinstance(result, Comment)
+        else result
+        for result in results
+    ]
+
+
+def change_follows(user, items):
+    """Подписки user; элемент — {'author': username, 'action': ...}."""
+    check_items(items)
+    usernames = {
+        item.get('author') for item in items
+        if isinstance(item.get('author'), str)
+    }
+    authors = {
+        author.username: author for author in User.objects.filter(
+            username__in=usernames
+        ).only('pk', 'username')
+    }
+    followed = set(Follow.objects.filter(
+        user=user, author__in=authors.values()
+    ).values_list('author_id', flat=True))
+
+    # Для каждого автора побеждает последнее действие в пакете.
+    results, wanted = [], {}
+    for item in items:
+        username = item.get('author')
+        author = authors.get(username) if isinstance(username, str) else None
+        action = item.get('action', FOLLOW)
+        if action not in (FOLLOW, UNFOLLOW):
+            results.append(_failed({'action': 'Неизвестное действие'}))
+        elif author is None:
+            results.append(_failed({'author': 'Автор не найден'}))
+        elif author == user:
+            results.append(_failed({'author': 'Нельзя подписаться на себя'}))
+        else:
+            wanted[author] = action == FOLLOW
+            results.append({'ok': True})
+
+    follows = [
+        Follow(user=user, author=author)
+        for author, follow in wanted.items()
+        if follow and author.pk not in followed
+    ]
+    unfollow_ids = {
+        author.pk for author, follow in wanted.items()
+        if not follow and author.pk in followed
+    }
+
+    with transaction.atomic():
+        if unfollow_ids:
+            # Отписки — обычный delete(): сигналы сами поправят счетчики
+            # и ленты.
+            Follow.objects.filter(
+                user=user, author_id__in=unfollow_ids).delete()
+        # Параллельный запрос мог уже подписать user на тех же авторов.
+        Follow.objects.bulk_create(
+            follows, constants.BATCH_SIZE, ignore_conflicts=True)
+        if follows:
+            counters.recount_follows(
+                {user.pk, *(follow.author_id for follow in follows)})
+            digests.start_watermark(user.pk)
+        for follow in follows:
+            feed.stop_fanout(follow.author_id)
+            feed.backfill_timeline(user.pk, follow.author_id)
+
+    if follows:
+        invalidate(f'profile:{user.username}', *{
+            f'profile:{follow.author.username}' for follow in follows
+        })
+    return results
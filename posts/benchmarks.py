@@ -0,0 +1,393 @@
+"""Генератор синтетических данных и замеры задержки views."""
+import asyncio
+import io
+import json
+import random
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.test import Client
+from django.urls import reverse
+from faker import Faker
+
+from .models import Comment, Follow, Group, Post, User
+from .utils import QueryCounter, count_queries
+from . import constants, counters, feed, search, threads
+
+SEED_BATCH_SIZE = 500
+
+
+def _bulk_create(model, objects):
+    model.objects.bulk_create(objects, batch_size=SEED_BATCH_SIZE)
+
+
+def seed(users, groups, posts, comments, follows, seed=None):
+    """Заполняет базу данными объемом, заданным аргументами.
+
+    Строки вставляются bulk_create без сигналов, поэтому счетчики,
+    ленты и поисковый индекс после вставки перестраиваются целиком.
+    """
+    fake = Faker('ru_RU')
+    fake.seed_instance(seed)
+    rng = random.Random(seed)
+    prefix = f'bench{int(time.time())}'
+    password = make_password(None)
+
+    _bulk_create(User, [
+        User(
+            username=f'{prefix}-user{index}',
+            first_name=fake.first_name(),
+            last_name=fake.last_name(),
+            password=password,
+        )
+        for index in range(users)
+    ])
+    _bulk_create(Group, [
+        Group(
+            title=fake.sentence(nb_words=3)[:200],
+            slug=f'{prefix}-group{index}',
+            description=fake.paragraph(),
+        )
+        for index in range(groups)
+    ])
+    user_ids = list(User.objects.filter(
+        username__startswith=prefix).values_list('pk', flat=True))
+    group_ids = list(Group.objects.filter(
+        slug__startswith=prefix).values_list('pk', flat=True))
+
+    _bulk_create(Post, [
+        Post(
+            author_id=rng.choice(user_ids),
+            group_id=rng.choice(group_ids) if group_ids else None,
+            text=fake.text(),
+        )
+        for _ in range(posts)
+    ])
+    post_ids = list(Post.objects.filter(
+        author_id__in=user_ids).values_list('pk', flat=True))
+
+    _bulk_create(Comment, [
+        Comment(
+            post_id=rng.choice(post_ids),
+            author_id=rng.choice(user_ids),
+            text=fake.sentence(),
+        )
+        for _ in range(comments if post_ids else 0)
+    ])
+
+    pairs = set()
+    max_pairs = len(user_ids) * (len(user_ids) - 1)
+    while len(pairs) < min(follows, max_pairs):
+        user_id, author_id = rng.sample(user_ids, 2)
+        pairs.add((user_id, author_id))
+    _bulk_create(Follow, [
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in pairs
+    ])
+
+    counters.reconcile()
+    feed.rebuild_timelines()
+    threads.fill_paths()
+    search.get_backend().rebuild()
+    return prefix
+
+
+def dataset_size():
+    return {
+        'users': User.objects.count(),
+        'groups': Group.objects.count(),
+        'posts': Post.objects.count(),
+        'comments': Comment.objects.count(),
+        'follows': Follow.objects.count(),
+    }
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(request, iterations, cold=False):
+    """Выполняет запрос iterations раз; задержки в миллисекундах."""
+    latencies = []
+    queries = []
+    for _ in range(iterations):
+        if cold:
+            cache.clear()
+        counter = QueryCounter()
+        start = time.perf_counter()
+        with count_queries(counter):
+            response = request()
+        latencies.append((time.perf_counter() - start) * 1000)
+        queries.append(counter.count)
+        if response.status_code >= 400:
+            raise RuntimeError(f'Ответ {response.status_code}')
+    return {
+        'iterations': iterations,
+        'p50_ms': round(percentile(latencies, 0.5), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+        'mean_ms': round(statistics.mean(latencies), 3),
+        'queries_mean': round(statistics.mean(queries), 2),
+        'queries_max': max(queries),
+    }
+
+
+def read_paths():
+    """Адреса читающих views для анонимного посетителя."""
+    author = User.objects.filter(posts__isnull=False).values_list(
+        'username', flat=True).first()
+    group = Group.objects.filter(posts__isnull=False).first()
+    post = Post.objects.filter(comments__isnull=False).first()
+    if not all((author, group, post)):
+        raise ValueError('Недостаточно данных: сначала выполните seed_data')
+    return {
+        'index': reverse('posts:index'),
+        'group_posts': reverse('posts:group_list', args=(group.slug,)),
+        'profile': reverse('posts:profile', args=(author,)),
+        'post_detail': reverse('posts:post_detail', args=(post.pk,)),
+    }
+
+
+# Адрес не из INTERNAL_IPS, чтобы не включалась debug-панель.
+BENCHMARK_CLIENT = ('192.0.2.1', 50000)
+
+
+def wsgi_get(application, path):
+    environ = {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'REMOTE_ADDR': BENCHMARK_CLIENT[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': io.BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    body = application(environ, start_response)
+    try:
+        for _ in body:
+            pass
+    finally:
+        if hasattr(body, 'close'):
+            body.close()
+    return statuses[0]
+
+
+async def asgi_get(application, path):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'query_string': b'',
+        'root_path': '',
+        'headers': [(b'host', b'localhost')],
+        'client': BENCHMARK_CLIENT,
+        'server': ('localhost', 80),
+    }
+    statuses = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        if message['type'] == 'http.response.start':
+            statuses.append(message['status'])
+
+    await application(scope, receive, send)
+    return statuses[0]
+
+
+def _throughput_result(latencies, statuses, elapsed):
+    errors = sum(status >= 400 for status in statuses)
+    if errors:
+        raise RuntimeError(f'Ошибочных ответов: {errors}')
+    return {
+        'requests': len(latencies),
+        'requests_per_second': round(len(latencies) / elapsed, 2),
+        'p50_ms': round(percentile(latencies, 0.5), 3),
+        'p95_ms': round(percentile(latencies, 0.95), 3),
+        'p99_ms': round(percentile(latencies, 0.99), 3),
+    }
+
+
+def wsgi_throughput(application, path, concurrency, total):
+    """Как многопоточный WSGI-сервер с concurrency потоками."""
+    def timed(_):
+        start = time.perf_counter()
+        status = wsgi_get(application, path)
+        return (time.perf_counter() - start) * 1000, status
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(timed, range(total)))
+    elapsed = time.perf_counter() - start
+    latencies, statuses = zip(*results)
+    return _throughput_result(latencies, statuses, elapsed)
+
+
+def asgi_throughput(application, path, concurrency, total):
+    """Как ASGI-сервер с concurrency одновременными соединениями."""
+    async def main():
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def timed():
+            async with semaphore:
+                start = time.perf_counter()
+                status = await asgi_get(application, path)
+                return (time.perf_counter() - start) * 1000, status
+
+        return await asyncio.gather(*(timed() for _ in range(total)))
+
+    start = time.perf_counter()
+    results = asyncio.run(main())
+    elapsed = time.perf_counter() - start
+    latencies, statuses = zip(*results)
+    return _throughput_result(latencies, statuses, elapsed)
+
+
+def run_concurrent(concurrency, total, names=None, paths=None):
+    """Пропускная способность читающих views под WSGI и под ASGI."""
+    from django.core.wsgi import get_wsgi_application
+    from yatube.asgi import application as asgi_application
+
+    wsgi_application = get_wsgi_application()
+    paths = paths or read_paths()
+    return {
+        name: {
+            'wsgi': wsgi_throughput(
+                wsgi_application, path, concurrency, total),
+            'asgi': asgi_throughput(
+                asgi_application, path, concurrency, total),
+        }
+        for name, path in paths.items()
+        if not names or name in names
+    }
+
+
+def scenarios():
+    """Сценарии нагрузки: имя -> функция(client), выполняющая запрос."""
+    user = User.objects.filter(follower__isnull=False).first()
+    author = Follow.objects.filter(user=user).values_list(
+        'author__username', flat=True).first()
+    group = Group.objects.filter(posts__isnull=False).first()
+    post = Post.objects.filter(comments__isnull=False).first()
+    if not all((user, author, group, post)):
+        raise ValueError('Недостаточно данных: сначала выполните seed_data')
+
+    def toggle_follow(client):
+        followed = Follow.objects.filter(
+            user=user, author__username=author).exists()
+        name = 'posts:profile_unfollow' if followed else 'posts:profile_follow'
+        return client.get(reverse(name, args=(author,)))
+
+    return user, {
+        'index': lambda client: client.get(reverse('posts:index')),
+        'group_posts': lambda client: client.get(
+            reverse('posts:group_list', args=(group.slug,))),
+        'profile': lambda client: client.get(
+            reverse('posts:profile', args=(author,))),
+        'post_detail': lambda client: client.get(
+            reverse('posts:post_detail', args=(post.pk,))),
+        'follow_index': lambda client: client.get(
+            reverse('posts:follow_index')),
+        'api_index': lambda client: client.get(reverse('posts:api_index')),
+        'api_group': lambda client: client.get(
+            reverse('posts:api_group', args=(group.slug,))),
+        'api_profile': lambda client: client.get(
+            reverse('posts:api_profile', args=(author,))),
+        'api_post': lambda client: client.get(
+            reverse('posts:api_post', args=(post.pk,))),
+        'api_follow': lambda client: client.get(
+            reverse('posts:api_follow')),
+        'post_create': lambda client: client.post(
+            reverse('posts:post_create'), {'text': 'Нагрузочный пост'}),
+        'add_comment': lambda client: client.post(
+            reverse('posts:add_comment', args=(post.pk,)),
+            {'text': 'Нагрузочный комментарий'}),
+        'profile_follow_toggle': toggle_follow,
+    }
+
+
+def run(iterations, names=None, cold=False):
+    user, available = scenarios()
+    client = Client()
+    client.force_login(user)
+    return {
+        name: measure(lambda: scenario(client), iterations, cold)
+        for name, scenario in available.items()
+        if not names or name in names
+    }
+
+
+def _items_per_second(items, send):
+    start = time.perf_counter()
+    for response in send():
+        if response.status_code >= 400:
+            raise RuntimeError(f'Ответ {response.status_code}')
+    return round(items / (time.perf_counter() - start), 1)
+
+
+def batch_throughput(items):
+    """Элементов в секунду: по одному через обычные views и пакетами."""
+    user, _ = scenarios()
+    post = Post.objects.filter(comments__isnull=False).first()
+    client = Client()
+    client.force_login(user)
+
+    def one_by_one(name, args, data):
+        for number in range(items):
+            yield client.post(reverse(name, args=args), data(number))
+
+    def batched(name, item):
+        for start in range(0, items, constants.BATCH_MAX_ITEMS):
+            stop = min(start + constants.BATCH_MAX_ITEMS, items)
+            yield client.post(
+                reverse(name),
+                json.dumps({'items': [
+                    item(number) for number in range(start, stop)
+                ]}),
+                content_type='application/json',
+            )
+
+    def post_data(number):
+        return {'text': f'Нагрузочный пост {number}'}
+
+    def comment_data(number):
+        return {'post': post.pk, 'text': f'Нагрузочный комментарий {number}'}
+
+    return {
+        'posts': {
+            'single': _items_per_second(items, lambda: one_by_one(
+                'posts:post_create', (), post_data)),
+            'batch': _items_per_second(items, lambda: batched(
+                'posts:api_batch_posts', post_data)),
+        },
+        'comments': {
+            'single': _items_per_second(items, lambda: one_by_one(
+                'posts:add_comment', (post.pk,), comment_data)),
+            'batch': _items_per_second(items, lambda: batched(
+                'posts:api_batch_comments', comment_data)),
+        },
+    }
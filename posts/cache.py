@@ -0,0 +1,254 @@
+import functools
+import hashlib
+import math
+import random
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+
+from core import profiling, routers
+from . import constants
+
+GENERATION_KEY = 'cache_generation:{}'
+RECENT_KEY = '{}:recent'
+CHANGED_KEY = '{}:changed'
+TAGS_ATTRIBUTE = '_cache_tags'
+PAGE_KEY = 'view_cache:{}:{}'
+
+
+def _new_generation():
+    # После вытеснения счетчика из кеша поколение не должно совпасть
+    # со старым, поэтому начальное значение берется из времени.
+    return time.time_ns()
+
+
+def _generation_key(tag):
+    return GENERATION_KEY.format(hashlib.md5(tag.encode()).hexdigest())
+
+
+def get_generations(tags):
+    keys = [_generation_key(tag) for tag in tags]
+    generations = cache.get_many(keys)
+    for key in keys:
+        if key not in generations:
+            cache.add(key, _new_generation(), None)
+            generations[key] = cache.get(key)
+    return [generations[key] for key in keys]
+
+
+def invalidate(*tags):
+    """Делает недействительными все страницы с указанными тегами.
+
+    Еще REPLICA_STICKY_SECONDS реплика может не видеть изменения,
+    поэтому в это окно страницы с этими тегами читаются с основной базы.
+    Время инвалидации — Last-Modified страниц, см. last_changed.
+    """
+    recent, changed = {}, {}
+    now = time.time()
+    for tag in set(tags):
+        key = _generation_key(tag)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_generation(), None)
+        recent[RECENT_KEY.format(key)] = 1
+        changed[CHANGED_KEY.format(key)] = now
+    cache.set_many(changed, None)
+    cache.set_many(recent, settings.REPLICA_STICKY_SECONDS)
+
+
+def last_changed(tags):
+    """Время последней инвалидации тегов (timestamp) или None без тегов.
+
+    В отличие от дат в строках его сдвигают и удаления, и подписки.
+    Вытесненное из кеша время считается текущим.
+    """
+    keys = [CHANGED_KEY.format(_generation_key(tag)) for tag in tags]
+    changed = cache.get_many(keys)
+    for key in keys:
+        if key not in changed:
+            cache.add(key, time.time(), None)
+            changed[key] = cache.get(key)
+    return max(changed.values(), default=None)
+
+
+def recently_invalidated(tags):
+    keys = [RECENT_KEY.format(_generation_key(tag)) for tag in tags]
+    return bool(keys) and bool(cache.get_many(keys))
+
+
+@contextmanager
+def reads_after_invalidation(tags):
+    """Читает с основной базы, пока реплика могла отстать от инвалидации."""
+    if recently_invalidated(tags):
+        with routers.use_primary():
+            yield
+    else:
+        yield
+
+
+def resolve_tags(tags, request, kwargs):
+    """Теги страницы; функции-теги вызываются один раз на запрос."""
+    if not hasattr(request, TAGS_ATTRIBUTE):
+        setattr(request, TAGS_ATTRIBUTE, {})
+    resolved = getattr(request, TAGS_ATTRIBUTE)
+    if tags not in resolved:
+        resolved[tags] = []
+        for tag in tags:
+            if callable(tag):
+                resolved[tags].extend(tag(request, **kwargs))
+            else:
+                resolved[tags].append(tag.format(**kwargs))
+    return resolved[tags]
+
+
+def visitor_key(request):
+    """Кому отдается страница: пользователь с сессией или аноним."""
+    if request.user.is_authenticated:
+        return f'{request.user.pk}:{request.session.session_key}'
+    return 'anonymous'
+
+
+def _page_key(request, view_name):
+    signature = f'{request.get_full_path()}|{visitor_key(request)}'
+    digest = hashlib.md5(signature.encode()).hexdigest()
+    return PAGE_KEY.format(view_name, digest)
+
+
+def _freeze(response, generations, fresh_for, delta):
+    return {
+        'content': response.content,
+        'status': response.status_code,
+        'content_type': response['Content-Type'],
+        'generations': generations,
+        'fresh_until': time.time() + fresh_for,
+        'delta': delta,
+    }
+
+
+def _thaw(frozen):
+    return HttpResponse(
+        frozen['content'],
+        status=frozen['status'],
+        content_type=frozen['content_type'],
+    )
+
+
+def _is_fresh(frozen, generations):
+    """Проверка свежести с вероятностным досрочным истечением (XFetch).
+
+    Чем дольше считалась страница и чем ближе срок, тем вероятнее
+    один из запросов пересчитает ее заранее, не дожидаясь лавины.
+    """
+    if frozen['generations'] != generations:
+        return False
+    early = (
+        frozen['delta']
+        * constants.VIEW_CACHE_EARLY_EXPIRATION_BETA
+        * -math.log(1.0 - random.random())
+    )
+    return time.time() + early < frozen['fresh_until']
+
+
+_metrics = Counter()
+_metrics_lock = threading.Lock()
+
+
+def _record(view_name, outcome):
+    with _metrics_lock:
+        _metrics[view_name, outcome] += 1
+    if outcome == 'miss':
+        profiling.record_cache(misses=1)
+    else:
+        profiling.record_cache(hits=1)
+
+
+def cache_metrics():
+    """Счетчики hit/miss/stale по view текущего процесса."""
+    with _metrics_lock:
+        return dict(_metrics)
+
+
+def reset_cache_metrics():
+    with _metrics_lock:
+        _metrics.clear()
+
+
+def _wait_for_entry(key):
+    deadline = time.monotonic() + constants.VIEW_CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(constants.VIEW_CACHE_LOCK_POLL)
+        frozen = cache.get(key)
+        if frozen is not None:
+            return frozen
+    return None
+
+
+def cached_view(*tags, timeout=constants.VIEW_CACHE_TIMEOUT):
+    """Кеширует GET-ответ до изменения данных, помеченных тегами.
+
+    Теги — строки-шаблоны, заполняемые аргументами view,
+    либо функции (request, **kwargs), возвращающие список тегов.
+    Авторизованные пользователи получают собственную копию страницы.
+
+    Пересчет устаревшей страницы выполняет только тот запрос, который
+    взял блокировку в кеше; остальные получают устаревшую копию
+    или коротко ждут первую.
+    """
+    def decorator(view):
+        view_name = view.__name__
+
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method != 'GET':
+                return view(request, *args, **kwargs)
+
+            resolved_tags = resolve_tags(tags, request, kwargs)
+            generations = get_generations(resolved_tags)
+            key = _page_key(request, view_name)
+            frozen = cache.get(key)
+            if frozen is not None and _is_fresh(frozen, generations):
+                _record(view_name, 'hit')
+                return _thaw(frozen)
+
+            lock_key = f'{key}:lock'
+            locked = cache.add(
+                lock_key, 1, constants.VIEW_CACHE_LOCK_TIMEOUT)
+            if not locked:
+                if frozen is None:
+                    frozen = _wait_for_entry(key)
+                if frozen is not None:
+                    _record(view_name, 'stale')
+                    return _thaw(frozen)
+
+            try:
+                started = time.monotonic()
+                # Копия живет до часа: сразу после инвалидации ее нельзя
+                # строить по отставшей реплике.
+                with reads_after_invalidation(resolved_tags):
+                    response = view(request, *args, **kwargs)
+                if response.status_code == 200 and not response.streaming:
+                    cache.set(
+                        key,
+                        _freeze(
+                            response,
+                            generations,
+                            timeout,
+                            time.monotonic() - started,
+                        ),
+                        timeout + constants.VIEW_CACHE_STALE_TIMEOUT,
+                    )
+            finally:
+                if locked:
+                    cache.delete(lock_key)
+            _record(view_name, 'miss')
+            return response
+
+        wrapper.cache_tags = tags
+        return wrapper
+    return decorator
@@ -0,0 +1,119 @@
+"""Валидаторы ETag и Last-Modified для условных GET-запросов.
+
+Состояние страницы — одна агрегирующая выборка: время последнего
+изменения и число постов (комментариев) плюс выведенные на странице
+поля. К нему добавляется время последней инвалидации тегов cached_view:
+его сдвигают и удаления, и подписки, которых не видно по датам строк.
+Страница целиком не строится, если клиент прислал актуальный
+If-None-Match или If-Modified-Since.
+"""
+import hashlib
+from datetime import datetime
+from functools import wraps
+
+from django.db.models import Count, Exists, Max, OuterRef
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .cache import (
+    last_changed, reads_after_invalidation, resolve_tags, visitor_key,
+)
+from .models import Follow, Group, Post, User
+
+STATE_ATTRIBUTE = '_conditional_state'
+
+
+def conditional_view(state_func):
+    """Отвечает 304 Not Modified, пока state_func(request, **kwargs) прежний.
+
+    state_func возвращает словарь значений, от которых зависит
+    страница, или None, если объекта нет (тогда view отработает сама).
+    Если view закеширована cached_view, сразу после инвалидации ее тегов
+    состояние читается с основной базы, а не с отставшей реплики.
+    """
+    def decorator(view):
+        tags = getattr(view, 'cache_tags', ())
+
+        def state(request, *args, **kwargs):
+            if not hasattr(request, STATE_ATTRIBUTE):
+                resolved = resolve_tags(tags, request, kwargs)
+                with reads_after_invalidation(resolved):
+                    values = state_func(request, **kwargs)
+                if values is not None and resolved:
+                    values['changed'] = last_changed(resolved)
+                setattr(request, STATE_ATTRIBUTE, values)
+            return getattr(request, STATE_ATTRIBUTE)
+
+        def etag(request, *args, **kwargs):
+            values = state(request, *args, **kwargs)
+            if values is None:
+                return None
+            signature = '|'.join((
+                request.get_full_path(),
+                visitor_key(request),
+                repr(sorted(values.items())),
+            ))
+            return hashlib.md5(signature.encode()).hexdigest()
+
+        def last_modified(request, *args, **kwargs):
+            values = state(request, *args, **kwargs)
+            if values is None:
+                return None
+            changed = values.get('changed')
+            return _latest(
+                values.get('last_modified'),
+                changed and datetime.fromtimestamp(changed, timezone.utc),
+            )
+
+        return wraps(view)(condition(etag, last_modified)(view))
+
+    return decorator
+
+
+def _latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def index_state(request, **kwargs):
+    # Без COUNT по всей таблице: удаления видны по времени инвалидации.
+    return Post.objects.aggregate(last_modified=Max('modified'))
+
+
+def group_state(request, slug, **kwargs):
+    return Group.objects.filter(slug=slug).values(
+        'pk', 'title', 'description',
+    ).annotate(
+        last_modified=Max('posts__modified'),
+        count=Count('posts'),
+    ).first()
+
+
+def profile_state(request, username, **kwargs):
+    fields = [
+        'pk', 'first_name', 'last_name',
+        'stats__followers_count', 'stats__following_count',
+    ]
+    queryset = User.objects.filter(username=username)
+    if request.user.is_authenticated:
+        queryset = queryset.annotate(is_following=Exists(Follow.objects.filter(
+            user=request.user, author=OuterRef('pk'),
+        )))
+        fields.append('is_following')
+    return queryset.values(*fields).annotate(
+        last_modified=Max('posts__modified'),
+        count=Count('posts'),
+    ).first()
+
+
+def post_state(request, post_id, **kwargs):
+    values = Post.objects.filter(pk=post_id).values(
+        'modified', 'comments_count', 'author__stats__posts_count',
+    ).annotate(
+        comments_modified=Max('comments__modified'),
+    ).first()
+    if values is not None:
+        values['last_modified'] = _latest(
+            values.pop('modified'), values['comments_modified']
+        )
+    return values
@@ -15,3 +15,58 @@ BYTE_IMAGE = (b'\x47\x49\x46\x38\x39\x61\x02\x00'
               b'\x02\x00\x01\x00\x00\x02\x02\x0C'
               b'\x0A\x00\x3B'
               )
+
+
+FEED_FANOUT_FOLLOWERS_LIMIT = 1000
+# Обратно на fan-out автор переходит с запасом, чтобы колебания числа
+# подписчиков у порога не перестраивали ленты раз за разом.
+FEED_FANOUT_RESUME_LIMIT = 800
+FEED_BATCH_SIZE = 500
+
+
+POST_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+VIEW_CACHE_TIMEOUT = 60 * 60
+VIEW_CACHE_STALE_TIMEOUT = 60 * 5
+VIEW_CACHE_LOCK_TIMEOUT = 10
+VIEW_CACHE_LOCK_WAIT = 0.5
+VIEW_CACHE_LOCK_POLL = 0.05
+VIEW_CACHE_EARLY_EXPIRATION_BETA = 1.0
+
+
+SEARCH_MAX_RESULTS = 1000
+SEARCH_BATCH_SIZE = 500
+# Строк в одном INSERT индекса: по два параметра на строку, а старые
+# сборки SQLite принимают не больше 999 параметров в запросе.
+SEARCH_INSERT_ROWS = 400
+
+
+THUMBNAIL_PENDING_TIMEOUT = 60 * 5
+
+
+TRANSFER_BATCH_SIZE = 500
+TRANSFER_CHUNK_SIZE = 2000
+EXPORT_BUFFER_SIZE = 64 * 1024
+AUTHOR_EXPORT_RECORDS = ('posts', 'comments')
+
+
+SYNDICATION_FEED_ITEMS = 20
+SYNDICATION_TITLE_LENGTH = 60
+
+
+COMMENTS_PER_PAGE = 20
+COMMENT_PATH_STEP = 10
+COMMENT_MAX_DEPTH = 5
+COMMENT_REPLIES_PER_ROOT = 20
+
+
+API_PAGE_SIZE = NUMBER_OF_RECENT_POSTS
+API_MAX_PAGE_SIZE = 100
+
+BATCH_MAX_ITEMS = 500
+BATCH_SIZE = 500
+
+DIGEST_BATCH_SIZE = 200
+DIGEST_MAX_POSTS = 20
+# Граница рассылки отстает от текущего момента: пост с меньшим id может
+# закоммититься позже поста с большим и иначе пропасть из дайджестов.
+DIGEST_SETTLE_SECONDS = 60
@@ -0,0 +1,130 @@
+from collections import Counter
+
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from .models import Comment, Follow, Post, User, UserStats
+from . import constants
+
+
+def _increment(model, pk, field, count=1):
+    updated = model.objects.filter(pk=pk).update(**{field: F(field) + count})
+    if not updated and model is UserStats:
+        UserStats.objects.get_or_create(user_id=pk)
+        UserStats.objects.filter(pk=pk).update(**{field: F(field) + count})
+
+
+def _decrement(model, pk, field):
+    model.objects.filter(
+        pk=pk, **{f'{field}__gt': 0}
+    ).update(**{field: F(field) - 1})
+
+
+def post_added(post):
+    _increment(UserStats, post.author_id, 'posts_count')
+
+
+def posts_added(posts):
+    for author_id, count in Counter(
+        post.author_id for post in posts
+    ).items():
+        _increment(UserStats, author_id, 'posts_count', count)
+
+
+def post_removed(post):
+    _decrement(UserStats, post.author_id, 'posts_count')
+
+
+def comment_added(comment):
+    _increment(Post, comment.post_id, 'comments_count')
+
+
+def comments_added(comments):
+    for post_id, count in Counter(
+        comment.post_id for comment in comments
+    ).items():
+        _increment(Post, post_id, 'comments_count', count)
+
+
+def comment_removed(comment):
+    _decrement(Post, comment.post_id, 'comments_count')
+
+
+def follow_added(follow):
+    _increment(UserStats, follow.author_id, 'followers_count')
+    _increment(UserStats, follow.user_id, 'following_count')
+
+
+def follow_removed(follow):
+    _decrement(UserStats, follow.author_id, 'followers_count')
+    _decrement(UserStats, follow.user_id, 'following_count')
+
+
+def followers_count(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id
+    ).values_list('followers_count', flat=True).first() or 0
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                total=Count('pk')
+            ).values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def recount_follows(user_ids):
+    """Пересчитывает счетчики подписок пользователей по таблице Follow.
+
+    Пакетная подписка вставляет строки с ignore_conflicts и не знает,
+    какие из них успел вставить параллельный запрос, поэтому счетчики
+    не увеличиваются, а пересчитываются по фактически созданным строкам.
+    """
+    UserStats.objects.bulk_create(
+        (UserStats(user_id=user_id) for user_id in user_ids),
+        ignore_conflicts=True,
+    )
+    UserStats.objects.filter(pk__in=user_ids).update(
+        followers_count=_count(Follow, 'author'),
+        following_count=_count(Follow, 'user'),
+    )
+
+
+def reconcile():
+    """Пересчитывает счетчики по исходным таблицам.
+
+    Возвращает количество исправленных записей для каждого счетчика.
+    """
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id)
+            for user_id in User.objects.filter(
+                stats__isnull=True
+            ).values_list('pk', flat=True).iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+    counters = (
+        (UserStats, 'posts_count', _count(Post, 'author')),
+        (UserStats, 'followers_count', _count(Follow, 'author')),
+        (UserStats, 'following_count', _count(Follow, 'user')),
+        (Post, 'comments_count', _count(Comment, 'post')),
+    )
+    fixed = {}
+    for model, field, actual in counters:
+        fixed[field] = model.objects.exclude(
+            **{field: actual}
+        ).update(**{field: actual})
+    fixed['fanout'] = UserStats.objects.filter(
+        fanout=True,
+        followers_count__gt=constants.FEED_FANOUT_FOLLOWERS_LIMIT,
+    ).update(fanout=False)
+    return fixed
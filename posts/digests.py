@@ -0,0 +1,132 @@
+"""Письма-дайджесты о новых постах авторов, на которых подписан читатель.
+
+У каждого подписчика есть водяной знак DigestState.last_post_id; он
+ставится на последний пост в момент первой подписки. Рассылка идет
+пачками подписчиков: новые посты всей пачки выбираются одним запросом
+по Follow и Post, письма собираются одним шаблоном и уходят через одно
+соединение EMAIL_BACKEND на весь запуск. После отправки пачки ее
+водяные знаки сдвигаются одним UPDATE, поэтому каждый запуск рассылает
+только то, что появилось после прошлого.
+
+Граница запуска — последний пост старше DIGEST_SETTLE_SECONDS: id
+выдаются при вставке, а видны после коммита, и пост с меньшим id,
+закоммиченный позже, не должен оказаться ниже уже сдвинутого знака.
+"""
+from datetime import timedelta
+from itertools import groupby
+
+from django.conf import settings
+from django.core import mail
+from django.db.models import F, Max
+from django.template.loader import get_template
+from django.utils import timezone
+
+from .models import DigestState, Follow, Post
+from . import constants
+
+TEMPLATE = 'posts/email/digest.txt'
+
+
+def start_watermark(user_id):
+    """Знак подписчика на последнем посте: пишем о том, что выйдет после."""
+    if not DigestState.objects.filter(user_id=user_id).exists():
+        DigestState.objects.bulk_create(
+            [DigestState(
+                user_id=user_id,
+                last_post_id=Post.objects.aggregate(
+                    last=Max('pk'))['last'] or 0,
+            )],
+            ignore_conflicts=True,
+        )
+
+
+def start_watermarks(last_post_id):
+    """Знаки подписчиков, подписанных в обход сигналов, например импортом."""
+    user_ids = Follow.objects.filter(
+        user__digest_state__isnull=True
+    ).values_list('user_id', flat=True).distinct()
+    DigestState.objects.bulk_create(
+        (
+            DigestState(user_id=user_id, last_post_id=last_post_id)
+            for user_id in user_ids.iterator()
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def pending_posts(user_ids, last_post_id):
+    """Новые посты для пачки подписчиков: (user_id, [пост, ...])."""
+    rows = Follow.objects.filter(
+        user_id__in=user_ids,
+        author__posts__pk__gt=F('user__digest_state__last_post_id'),
+        author__posts__pk__lte=last_post_id,
+    ).values_list(
+        'user_id', 'author__posts__pk', 'author__username',
+        'author__posts__text', 'author__posts__created',
+    ).order_by('user_id', '-author__posts__pk')
+    for user_id, posts in groupby(rows, key=lambda row: row[0]):
+        yield user_id, [
+            {'id': pk, 'author': author, 'text': text, 'created': created}
+            for _, pk, author, text, created in posts
+        ]
+
+
+def build_message(template, user, posts):
+    context = {
+        'user': user,
+        'posts': posts[:constants.DIGEST_MAX_POSTS],
+        'total': len(posts),
+        'site_url': settings.SITE_URL,
+    }
+    message = mail.EmailMessage(
+        subject=f'Новые посты в ваших подписках: {len(posts)}',
+        body=template.render(context),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[user.email],
+    )
+    message.user_id = user.pk
+    return message
+
+
+def settled_post_id():
+    """Последний пост, чья транзакция наверняка завершилась."""
+    settled = timezone.now() - timedelta(
+        seconds=constants.DIGEST_SETTLE_SECONDS)
+    return Post.objects.filter(
+        created__lte=settled
+    ).aggregate(last=Max('pk'))['last'] or 0
+
+
+def send_digests(batch_size=constants.DIGEST_BATCH_SIZE, connection=None):
+    """Рассылает дайджесты; возвращает число отправленных писем."""
+    last_post_id = settled_post_id()
+    start_watermarks(last_post_id)
+    template = get_template(TEMPLATE)
+    connection = connection or mail.get_connection()
+    states = DigestState.objects.filter(
+        last_post_id__lt=last_post_id
+    ).select_related('user').only(
+        'last_post_id', 'user__username', 'user__email',
+    ).order_by('user_id')
+
+    sent, after = 0, 0
+    with connection:
+        while True:
+            batch = list(states.filter(user_id__gt=after)[:batch_size])
+            if not batch:
+                break
+            users = {state.user_id: state.user for state in batch}
+            messages = [
+                build_message(template, users[user_id], posts)
+                for user_id, posts in pending_posts(list(users), last_post_id)
+                if users[user_id].email
+            ]
+            if messages:
+                sent += connection.send_messages(messages) or 0
+                DigestState.objects.filter(
+                    user_id__in=[message.user_id for message in messages]
+                ).update(sent=timezone.now())
+            DigestState.objects.filter(user_id__in=list(users)).update(
+                last_post_id=last_post_id)
+            after = batch[-1].user_id
+    return sent
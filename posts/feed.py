@@ -0,0 +1,162 @@
+from django.db.models import F, Q
+
+from .models import Follow, Post, TimelineEntry, UserStats
+from . import constants
+
+
+def is_fanout_author(author_id):
+    """True, если посты автора раскладываются по лентам подписчиков.
+
+    Посты авторов с огромной аудиторией (False) читаются при запросе
+    ленты. Режим хранится в UserStats.fanout и переключается с
+    гистерезисом: stop_fanout выше FEED_FANOUT_FOLLOWERS_LIMIT,
+    resume_fanout — только ниже FEED_FANOUT_RESUME_LIMIT.
+    """
+    return not UserStats.objects.filter(
+        user_id=author_id, fanout=False
+    ).exists()
+
+
+def stop_fanout(author_id):
+    """Переводит автора на чтение при запросе, если он перерос порог."""
+    UserStats.objects.filter(
+        user_id=author_id,
+        fanout=True,
+        followers_count__gt=constants.FEED_FANOUT_FOLLOWERS_LIMIT,
+    ).update(fanout=False)
+
+
+def needs_fanout_resume(author_id):
+    return UserStats.objects.filter(
+        user_id=author_id,
+        fanout=False,
+        followers_count__lte=constants.FEED_FANOUT_RESUME_LIMIT,
+    ).exists()
+
+
+def resume_fanout(author_id):
+    """Возвращает автора к fan-out и заполняет ленты его подписчиков.
+
+    Режим переключается условным UPDATE, поэтому ленты заполняет только
+    первый из повторных вызовов.
+    """
+    if UserStats.objects.filter(
+        user_id=author_id,
+        fanout=False,
+        followers_count__lte=constants.FEED_FANOUT_RESUME_LIMIT,
+    ).update(fanout=True):
+        backfill_followers(author_id)
+
+
+def _insert_entries(entries):
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) >= constants.FEED_BATCH_SIZE:
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out_post(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if not is_fanout_author(post.author_id):
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _insert_entries(
+        TimelineEntry(user_id=user_id, post=post, created=post.created)
+        for user_id in follower_ids.iterator()
+    )
+
+
+def fan_out_posts(posts):
+    """Раскладывает пачку новых постов одним запросом подписчиков."""
+    posts_by_author = {}
+    for post in posts:
+        posts_by_author.setdefault(post.author_id, []).append(post)
+    posts_by_author = {
+        author_id: author_posts
+        for author_id, author_posts in posts_by_author.items()
+        if is_fanout_author(author_id)
+    }
+    if not posts_by_author:
+        return
+    follows = Follow.objects.filter(
+        author_id__in=posts_by_author
+    ).values_list('user_id', 'author_id')
+    _insert_entries(
+        TimelineEntry(user_id=user_id, post=post, created=post.created)
+        for user_id, author_id in follows.iterator()
+        for post in posts_by_author[author_id]
+    )
+
+
+def backfill_timeline(user_id, author_id):
+    """Добавляет в ленту нового подписчика уже написанные посты автора."""
+    if not is_fanout_author(author_id):
+        return
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('pk', 'created')
+    _insert_entries(
+        TimelineEntry(user_id=user_id, post_id=post_id, created=created)
+        for post_id, created in posts.iterator()
+    )
+
+
+def backfill_followers(author_id):
+    """Заполняет ленты всех подписчиков, когда автор снова стал обычным."""
+    for user_id in Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True).iterator():
+        backfill_timeline(user_id, author_id)
+
+
+def prune_timeline(user_id, author_id):
+    TimelineEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+FEED_ORDERING = ('feed_created', 'feed_post')
+
+
+def get_follow_feed(user):
+    """Лента подписок: материализованные записи плюс посты «звезд».
+
+    Пагинировать ее нужно по FEED_ORDERING.
+    """
+    pulled_authors = list(UserStats.objects.filter(
+        user__in=Follow.objects.filter(user=user).values('author'),
+        fanout=False,
+    ).values_list('pk', flat=True))
+
+    if not pulled_authors:
+        # Аннотации переиспользуют join из filter(), поэтому сортировка
+        # по ним идет по индексу (user, created, post) ленты.
+        return Post.objects.filter(
+            timeline_entries__user=user
+        ).annotate(
+            feed_created=F('timeline_entries__created'),
+            feed_post=F('timeline_entries__post'),
+        )
+
+    return Post.objects.filter(
+        Q(pk__in=TimelineEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=pulled_authors)
+    ).annotate(
+        feed_created=F('created'),
+        feed_post=F('pk'),
+    )
+
+
+def rebuild_timelines():
+    """Перестраивает все ленты, например после bulk-загрузки подписок."""
+    TimelineEntry.objects.all().delete()
+    for user_id, author_id in Follow.objects.values_list(
+        'user_id', 'author_id'
+    ).iterator():
+        backfill_timeline(user_id, author_id)
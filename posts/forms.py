@@ -1,5 +1,6 @@
 from django import forms
 
+from . import constants
 from .models import Post, Comment
 
 
@@ -28,9 +29,47 @@ class PostForm(forms.ModelForm):
 
 
 class CommentForm(forms.ModelForm):
+    def __init__(self, *args, post=None, **kwargs):
+        super(CommentForm, self).__init__(*args, **kwargs)
+        if 'parent' in self.fields:
+            queryset = Comment.objects.none()
+            if post is not None:
+                queryset = post.comments.only('id', 'parent_id', 'path')
+            self.fields['parent'].queryset = queryset
+
     class Meta():
         model = Comment
 
+        fields = (
+            'text',
+            'parent',
+        )
+        widgets = {
+            'parent': forms.HiddenInput,
+        }
+
+    def clean_parent(self):
+        parent = self.cleaned_data['parent']
+
+        # Слишком глубокий ответ встает рядом с комментарием,
+        # а не под него: путь не длиннее COMMENT_MAX_DEPTH звеньев.
+        if parent and parent.depth >= constants.COMMENT_MAX_DEPTH - 1:
+            parent = parent.parent
+
+        return parent
+
+
+class BatchPostForm(PostForm):
+    """Проверка поста из пакета; группу пакет ищет сам, одним запросом."""
+    class Meta(PostForm.Meta):
+        fields = (
+            'text',
+        )
+
+
+class BatchCommentForm(CommentForm):
+    """Проверка комментария из пакета; пост и родителя ищет пакет."""
+    class Meta(CommentForm.Meta):
         fields = (
             'text',
         )
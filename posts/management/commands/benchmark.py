@@ -0,0 +1,133 @@
+import json
+import subprocess
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+
+from posts import benchmarks
+
+COMPARED_METRICS = ('p50_ms', 'p95_ms', 'p99_ms', 'queries_max')
+
+
+def current_commit():
+    try:
+        return subprocess.run(
+            ('git', 'rev-parse', '--short', 'HEAD'),
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Замеряет p50/p95/p99 задержки и число запросов основных views '
+        'и сохраняет результат в JSON'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument(
+            '--scenario', action='append', dest='scenarios',
+            help='Замерить только указанный сценарий (можно повторять)',
+        )
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кеш перед каждым запросом',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=0,
+            help='Дополнительно сравнить пропускную способность WSGI и ASGI '
+                 'при таком числе одновременных запросов',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=200,
+            help='Запросов на сценарий при замере пропускной способности',
+        )
+        parser.add_argument(
+            '--batch', type=int, default=0,
+            help='Дополнительно сравнить запись такого числа постов и '
+                 'комментариев по одному и пакетным API',
+        )
+        parser.add_argument('--label', default='')
+        parser.add_argument('--output', help='Файл для JSON с результатами')
+        parser.add_argument(
+            '--compare',
+            help='JSON прошлого запуска для сравнения с текущим',
+        )
+
+    def handle(self, *args, **options):
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare'], encoding='utf-8') as file:
+                    baseline = json.load(file)['results']
+            except (OSError, ValueError, KeyError) as error:
+                raise CommandError(f'Не удалось прочитать базу: {error}')
+        # Тестовый клиент обращается к приложению через testserver.
+        with override_settings(ALLOWED_HOSTS=['testserver']):
+            try:
+                results = benchmarks.run(
+                    options['iterations'],
+                    names=options['scenarios'],
+                    cold=options['cold'],
+                )
+            except (ValueError, RuntimeError) as error:
+                raise CommandError(error)
+        report = {
+            'label': options['label'],
+            'commit': current_commit(),
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'dataset': benchmarks.dataset_size(),
+            'results': results,
+        }
+        if options['concurrency']:
+            try:
+                report['concurrency'] = benchmarks.run_concurrent(
+                    options['concurrency'],
+                    options['requests'],
+                    names=options['scenarios'],
+                )
+            except (ValueError, RuntimeError) as error:
+                raise CommandError(error)
+        if options['batch']:
+            with override_settings(ALLOWED_HOSTS=['testserver']):
+                try:
+                    report['batch'] = benchmarks.batch_throughput(
+                        options['batch'])
+                except (ValueError, RuntimeError) as error:
+                    raise CommandError(error)
+        for name, result in results.items():
+            line = ' '.join(
+                f'{metric}={result[metric]}' for metric in COMPARED_METRICS
+            )
+            if baseline and name in baseline:
+                line += ' | ' + ' '.join(
+                    f'{metric}:{self.delta(baseline[name], result, metric)}'
+                    for metric in COMPARED_METRICS
+                )
+            self.stdout.write(f'{name}: {line}')
+        for name, interfaces in report.get('concurrency', {}).items():
+            line = ', '.join(
+                f'{interface} {result["requests_per_second"]} запр/с '
+                f'p95_ms={result["p95_ms"]}'
+                for interface, result in interfaces.items()
+            )
+            self.stdout.write(f'{name} x{options["concurrency"]}: {line}')
+        for name, modes in report.get('batch', {}).items():
+            self.stdout.write(
+                f'{name} x{options["batch"]}: по одному '
+                f'{modes["single"]} эл/с, пакетом {modes["batch"]} эл/с'
+            )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2)
+            self.stdout.write(f'Результаты сохранены в {options["output"]}')
+
+    @staticmethod
+    def delta(before, after, metric):
+        if not before.get(metric):
+            return 'n/a'
+        change = (after[metric] - before[metric]) / before[metric] * 100
+        return f'{change:+.1f}%'
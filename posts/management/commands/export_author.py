@@ -0,0 +1,57 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import constants, transfer
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Потоково выгружает посты или комментарии одного автора'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument(
+            '--records', choices=constants.AUTHOR_EXPORT_RECORDS,
+            default=constants.AUTHOR_EXPORT_RECORDS[0],
+        )
+        parser.add_argument(
+            '--format', dest='data_format', choices=transfer.FORMATS,
+            default=transfer.NDJSON,
+        )
+        parser.add_argument(
+            '--after', type=int, default=None,
+            help='Продолжить выгрузку после записи с этим id',
+        )
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument(
+            '--output', help='Файл для выгрузки, по умолчанию stdout',
+        )
+
+    def handle(self, *args, **options):
+        author_id = User.objects.filter(
+            username=options['username']
+        ).values_list('pk', flat=True).first()
+        if author_id is None:
+            raise CommandError('Пользователь не найден')
+
+        chunks = transfer.author_export(
+            author_id, options['records'], options['data_format'],
+            options['after'],
+        )
+        if options['gzip']:
+            chunks = transfer.gzipped(chunks)
+
+        if not options['output']:
+            if options['gzip']:
+                sys.stdout.buffer.writelines(chunks)
+            else:
+                for chunk in chunks:
+                    self.stdout.write(chunk, ending='')
+        elif options['gzip']:
+            with open(options['output'], 'wb') as file:
+                file.writelines(chunks)
+        else:
+            with open(options['output'], 'w', encoding='utf-8',
+                      newline='') as file:
+                file.writelines(chunks)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает группы, посты, комментарии и подписки в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--format', dest='data_format', choices=transfer.FORMATS,
+            default=transfer.NDJSON,
+        )
+        parser.add_argument(
+            '--model', action='append', dest='names',
+            choices=tuple(transfer.MODELS),
+            help='Выгрузить только указанную модель (можно повторять)',
+        )
+
+    def handle(self, *args, **options):
+        transfer.export_data(
+            options['directory'],
+            data_format=options['data_format'],
+            names=options['names'],
+            report=self.report,
+        )
+
+    def report(self, name, rows, seconds):
+        speed = rows / seconds if seconds else rows
+        self.stdout.write(f'{name}: {rows} строк, {speed:.0f} строк/с')
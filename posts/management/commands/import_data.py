@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from posts import constants, transfer
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает группы, посты, комментарии и подписки из NDJSON или CSV '
+        'пачками bulk_create и пересчитывает счетчики, ленты и поиск'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('directory')
+        parser.add_argument(
+            '--format', dest='data_format', choices=transfer.FORMATS,
+            default=transfer.NDJSON,
+        )
+        parser.add_argument(
+            '--model', action='append', dest='names',
+            choices=tuple(transfer.MODELS),
+            help='Загрузить только указанную модель (можно повторять)',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=constants.TRANSFER_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванный импорт с сохраненной отметки',
+        )
+
+    def handle(self, *args, **options):
+        transfer.import_data(
+            options['directory'],
+            data_format=options['data_format'],
+            names=options['names'],
+            resume=options['resume'],
+            batch_size=options['batch_size'],
+            report=self.report,
+        )
+        self.stdout.write('Счетчики, ленты и поисковый индекс пересчитаны')
+
+    def report(self, name, rows, seconds):
+        speed = rows / seconds if seconds else rows
+        self.stdout.write(f'{name}: {rows} строк, {speed:.0f} строк/с')
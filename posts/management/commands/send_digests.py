@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts import constants, digests
+
+
+class Command(BaseCommand):
+    help = (
+        'Рассылает подписчикам дайджесты новых постов с прошлого запуска'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=constants.DIGEST_BATCH_SIZE,
+            help='Подписчиков в одной пачке',
+        )
+
+    def handle(self, *args, **options):
+        sent = digests.send_digests(batch_size=options['batch_size'])
+        self.stdout.write(f'Отправлено писем: {sent}')
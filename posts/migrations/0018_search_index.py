@@ -0,0 +1,43 @@
+from django.db import migrations
+
+from posts.stemming import stem_text
+
+
+def create_search_index(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            'CREATE VIRTUAL TABLE posts_post_fts USING fts5('
+            "body, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        Post = apps.get_model('posts', 'Post')
+        for pk, text in Post.objects.using(db_alias).values_list('pk', 'text').iterator():
+            schema_editor.execute(
+                'INSERT INTO posts_post_fts (rowid, body) VALUES (%s, %s)',
+                [pk, stem_text(text)],
+            )
+    elif vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX posts_post_text_fts ON posts_post USING GIN '
+            "(to_tsvector('russian'::regconfig, COALESCE(text, '')))"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+    elif vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS posts_post_text_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:26
+
+from django.db import migrations, models
+from django.db.models import Count, F, Min
+import django.db.models.expressions
+
+
+def deduplicate_follows(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+
+    removed, _ = Follow.objects.using(db_alias).filter(user=F('author')).delete()
+    duplicates = Follow.objects.using(db_alias).values('user', 'author').annotate(
+        first_id=Min('pk'),
+        total=Count('pk'),
+    ).filter(total__gt=1)
+    for duplicate in duplicates.iterator():
+        deleted, _ = Follow.objects.using(db_alias).filter(
+            user=duplicate['user'],
+            author=duplicate['author'],
+        ).exclude(pk=duplicate['first_id']).delete()
+        removed += deleted
+    if not removed:
+        return
+
+    followers = dict(Follow.objects.using(db_alias).order_by().values_list(
+        'author').annotate(total=Count('pk')))
+    following = dict(Follow.objects.using(db_alias).order_by().values_list(
+        'user').annotate(total=Count('pk')))
+    for stats in UserStats.objects.using(db_alias).iterator():
+        UserStats.objects.using(db_alias).filter(pk=stats.pk).update(
+            followers_count=followers.get(stats.pk, 0),
+            following_count=following.get(stats.pk, 0),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(deduplicate_follows, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='follow',
+            index=models.Index(fields=['author', 'user'], name='follow_author_user_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-created', '-id'], name='post_author_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-created', '-id'], name='post_group_created_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.CheckConstraint(check=models.Q(_negated=True, user=django.db.models.expressions.F('author')), name='no_self_follow'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.2.16 on 2026-10-18 02:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0021_comment_threads'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DigestState',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='digest_state', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+                ('last_post_id', models.PositiveIntegerField(default=0, verbose_name='Последний разосланный пост')),
+                ('sent', models.DateTimeField(blank=True, null=True, verbose_name='Дата последнего письма')),
+            ],
+        ),
+    ]
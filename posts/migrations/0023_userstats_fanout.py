@@ -0,0 +1,27 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:02
+
+from django.db import migrations, models
+
+
+def stop_popular_fanout(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    UserStats = apps.get_model('posts', 'UserStats')
+    UserStats.objects.using(db_alias).filter(
+        followers_count__gt=1000
+    ).update(fanout=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_digest_state'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='fanout',
+            field=models.BooleanField(default=True, verbose_name='Посты раскладываются по лентам'),
+        ),
+        migrations.RunPython(stop_popular_fanout, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0023_userstats_fanout'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='feed_key',
+            field=models.PositiveIntegerField(default=0, verbose_name='Версия ссылки на ленту подписок'),
+        ),
+    ]
@@ -1,7 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth import get_user_model
 
-from core.models import CreatedModel
+from core.models import ModifiedModel
 from . import constants
 
 User = get_user_model()
@@ -16,7 +16,7 @@ class Group(models.Model):
         return self.title
 
 
-class Post(CreatedModel):
+class Post(ModifiedModel):
     text = models.TextField(
         verbose_name='Текст поста',
         help_text='Введите текст поста',
@@ -41,12 +41,47 @@ class Post(CreatedModel):
         upload_to='posts/',
         blank=True,
     )
+    comments_count = models.PositiveIntegerField(
+        'Количество комментариев',
+        default=0,
+        editable=False,
+    )
+    version = models.PositiveIntegerField(
+        'Версия',
+        default=0,
+        editable=False,
+    )
+
+    class Meta(ModifiedModel.Meta):
+        indexes = (
+            models.Index(
+                fields=('author', '-created', '-id'),
+                name='post_author_created_idx',
+            ),
+            models.Index(
+                fields=('group', '-created', '-id'),
+                name='post_group_created_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:constants.NUMBER_OF_FIRST_LETTERS]
 
+    def save(self, *args, **kwargs):
+        # Версия считается от строки в базе под блокировкой: иначе
+        # параллельный bump_post_versions (миниатюры, переименование
+        # автора) потеряется, и правка получит уже занятый номер.
+        with transaction.atomic():
+            if self.pk is not None:
+                version = Post.objects.select_for_update().filter(
+                    pk=self.pk
+                ).values_list('version', flat=True).first()
+                if version is not None:
+                    self.version = version + 1
+            super().save(*args, **kwargs)
+
 
-class Comment(CreatedModel):
+class Comment(ModifiedModel):
     post = models.ForeignKey(
         Post,
         on_delete=models.CASCADE,
@@ -63,10 +98,57 @@ class Comment(CreatedModel):
         verbose_name='Текст комментария',
         help_text='Введите текст комментария',
     )
+    parent = models.ForeignKey(
+        'self',
+        blank=True,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name='replies',
+        verbose_name='Ответ на комментарий',
+    )
+    path = models.CharField(
+        'Путь в ветке',
+        max_length=constants.COMMENT_PATH_STEP * constants.COMMENT_MAX_DEPTH,
+        blank=True,
+        editable=False,
+    )
+
+    class Meta(ModifiedModel.Meta):
+        indexes = (
+            models.Index(
+                fields=('post', 'parent', '-created', '-id'),
+                name='comment_post_root_idx',
+            ),
+            models.Index(
+                fields=('post', 'path'),
+                name='comment_post_path_idx',
+            ),
+        )
 
     def __str__(self):
         return self.text[:constants.NUMBER_OF_FIRST_LETTERS]
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        if not self.path:
+            # Путь — id предков и свой id фиксированной ширины:
+            # ветка целиком выбирается по префиксу одним запросом.
+            prefix = self.parent.path if self.parent_id else ''
+            self.path = prefix + str(self.pk).zfill(
+                constants.COMMENT_PATH_STEP
+            )
+            Comment.objects.filter(pk=self.pk).update(path=self.path)
+
+    @property
+    def depth(self):
+        return len(self.path) // constants.COMMENT_PATH_STEP - 1
+
+    def subtree(self):
+        """Комментарий со всеми ответами в порядке обхода ветки."""
+        return Comment.objects.filter(
+            post_id=self.post_id, path__startswith=self.path
+        ).order_by('path')
+
 
 class Follow(models.Model):
     user = models.ForeignKey(
@@ -82,5 +164,106 @@ class Follow(models.Model):
         verbose_name='Автор',
     )
 
+    class Meta:
+        constraints = (
+            models.UniqueConstraint(
+                fields=('user', 'author'),
+                name='unique_follow',
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F('author')),
+                name='no_self_follow',
+            ),
+        )
+        indexes = (
+            models.Index(
+                fields=('author', 'user'),
+                name='follow_author_user_idx',
+            ),
+        )
+
     def __str__(self):
         return f'Подписка пользователя {self.user} на автора {self.author}'
+
+
+class TimelineEntry(models.Model):
+    """Пост в материализованной ленте подписчика (fan-out on write)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Подписчик',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост',
+    )
+    created = models.DateTimeField('Дата создания поста')
+
+    class Meta:
+        unique_together = ('user', 'post')
+        indexes = (
+            models.Index(
+                fields=('user', '-created', '-post'),
+                name='timeline_user_created_idx',
+            ),
+        )
+
+    def __str__(self):
+        return f'Пост {self.post_id} в ленте пользователя {self.user_id}'
+
+
+class UserStats(models.Model):
+    """Денормализованные счетчики пользователя."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь',
+    )
+    posts_count = models.PositiveIntegerField('Количество постов', default=0)
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+    )
+    following_count = models.PositiveIntegerField(
+        'Количество подписок',
+        default=0,
+    )
+    fanout = models.BooleanField(
+        'Посты раскладываются по лентам',
+        default=True,
+    )
+    feed_key = models.PositiveIntegerField(
+        'Версия ссылки на ленту подписок',
+        default=0,
+    )
+
+    def __str__(self):
+        return f'Счетчики пользователя {self.user_id}'
+
+
+class DigestState(models.Model):
+    """Водяной знак рассылки: посты с id выше уже не попали в письма."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='digest_state',
+        verbose_name='Подписчик',
+    )
+    last_post_id = models.PositiveIntegerField(
+        'Последний разосланный пост',
+        default=0,
+    )
+    sent = models.DateTimeField(
+        'Дата последнего письма',
+        blank=True,
+        null=True,
+    )
+
+    def __str__(self):
+        return f'Дайджест пользователя {self.user_id}'
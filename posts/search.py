@@ -0,0 +1,130 @@
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from .models import Post
+from .stemming import WORD, stem, stem_text
+from . import constants
+
+FTS_TABLE = 'posts_post_fts'
+
+
+class SQLiteSearchBackend:
+    """Индекс FTS5 с основами слов, полученными русским стеммером."""
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES (%s, %s)',
+                [post.pk, stem_text(post.text)],
+            )
+
+    def index_new(self, posts):
+        """Индексирует только что созданные посты пакетными INSERT."""
+        with connection.cursor() as cursor:
+            self._insert(cursor, [
+                (post.pk, stem_text(post.text)) for post in posts
+            ])
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            rows = Post.objects.values_list('pk', 'text').iterator()
+            batch = []
+            for pk, text in rows:
+                batch.append((pk, stem_text(text)))
+                if len(batch) >= constants.SEARCH_BATCH_SIZE:
+                    self._insert(cursor, batch)
+                    batch = []
+            if batch:
+                self._insert(cursor, batch)
+
+    @staticmethod
+    def _insert(cursor, rows):
+        """Многострочный INSERT вместо executemany.
+
+        Обертка курсора debug_toolbar при DEBUG не умеет executemany
+        и падает с TypeError на форматировании запроса.
+        """
+        for start in range(0, len(rows), constants.SEARCH_INSERT_ROWS):
+            chunk = rows[start:start + constants.SEARCH_INSERT_ROWS]
+            values = ', '.join(['(%s, %s)'] * len(chunk))
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, body) VALUES {values}',
+                [value for row in chunk for value in row],
+            )
+
+    def search(self, query, limit):
+        terms = [stem(word) for word in WORD.findall(query)]
+        if not terms:
+            return []
+        match = ' '.join(f'"{term}"*' for term in terms)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY rank LIMIT %s',
+                [match, limit],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+
+class PostgresSearchBackend:
+    """Полнотекстовый поиск PostgreSQL с конфигурацией russian.
+
+    Вектор считается выражением, для которого миграция строит GIN-индекс,
+    поэтому отдельная синхронизация не нужна.
+    """
+
+    def index(self, post):
+        pass
+
+    def index_new(self, posts):
+        pass
+
+    def remove(self, post_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, limit):
+        from django.contrib.postgres.search import (
+            SearchQuery, SearchRank, SearchVector
+        )
+
+        vector = SearchVector('text', config='russian')
+        search_query = SearchQuery(query, config='russian')
+        return list(Post.objects.annotate(
+            search=vector,
+            rank=SearchRank(vector, search_query),
+        ).filter(
+            search=search_query
+        ).order_by('-rank', '-created').values_list('pk', flat=True)[:limit])
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'POSTS_SEARCH_BACKEND', None)
+        if path is None:
+            path = (
+                'posts.search.PostgresSearchBackend'
+                if connection.vendor == 'postgresql'
+                else 'posts.search.SQLiteSearchBackend'
+            )
+        _backend = import_string(path)()
+    return _backend
+
+
+def search_post_ids(query, limit=constants.SEARCH_MAX_RESULTS):
+    return get_backend().search(query, limit)
@@ -0,0 +1,175 @@
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import (
+    post_delete, post_save, pre_delete, pre_save
+)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import cache
+from .models import Comment, Follow, Group, Post, User, UserStats
+from . import counters, digests, feed, search, tasks, thumbnails
+
+CARD_USER_FIELDS = frozenset(('username', 'first_name', 'last_name'))
+
+
+def bump_post_versions(**lookup):
+    """Сбрасывает закешированные карточки и валидаторы страниц постов."""
+    Post.objects.filter(**lookup).update(
+        version=F('version') + 1,
+        modified=timezone.now(),
+    )
+
+
+def invalidate(*tags):
+    """Сбрасывает страницы после коммита записи.
+
+    Иначе GET, пришедший до коммита, построит страницу по старым строкам
+    и положит ее в кеш уже под новым поколением.
+    """
+    transaction.on_commit(lambda: cache.invalidate(*tags))
+
+
+def post_cache_tags(post):
+    tags = ['index', f'post:{post.pk}', f'profile:{post.author.username}']
+    if post.group_id is not None:
+        tags.append(f'group:{post.group.slug}')
+    return tags
+
+
+def changes_card(update_fields):
+    return update_fields is None or bool(CARD_USER_FIELDS & set(update_fields))
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, raw=False, update_fields=None,
+                      **kwargs):
+    if instance.pk is not None and not raw and changes_card(update_fields):
+        instance._previous_cache_tags = [
+            f'profile:{username}' for username in User.objects.filter(
+                pk=instance.pk
+            ).values_list('username', flat=True)
+        ]
+
+
+@receiver(post_save, sender=User)
+def on_user_saved(sender, instance, created, raw=False, update_fields=None,
+                  **kwargs):
+    if raw:
+        return
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+    elif changes_card(update_fields):
+        bump_post_versions(author=instance)
+        invalidate(
+            'index',
+            'groups',
+            f'profile:{instance.username}',
+            *getattr(instance, '_previous_cache_tags', ()),
+        )
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        instance._previous_cache_tags = [
+            f'group:{slug}' for slug in Group.objects.filter(
+                pk=instance.pk
+            ).values_list('slug', flat=True)
+        ]
+
+
+@receiver(post_save, sender=Group)
+def on_group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if not created:
+        bump_post_versions(group=instance)
+    invalidate(
+        'index',
+        'groups',
+        f'group:{instance.slug}',
+        *getattr(instance, '_previous_cache_tags', ()),
+    )
+
+
+@receiver(pre_delete, sender=Group)
+def on_group_deleted(sender, instance, **kwargs):
+    bump_post_versions(group=instance)
+    invalidate('index', 'groups', f'group:{instance.slug}')
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, raw=False, **kwargs):
+    if instance.pk is not None and not raw:
+        instance._previous_cache_tags = [
+            f'group:{slug}' for slug in Post.objects.filter(
+                pk=instance.pk, group__isnull=False
+            ).values_list('group__slug', flat=True)
+        ]
+
+
+@receiver(post_save, sender=Post)
+def on_post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.post_added(instance)
+        tasks.fan_out_post.delay(
+            instance.pk, key=f'fan_out_post:{instance.pk}')
+    tasks.index_post.delay(
+        instance.pk, key=f'index_post:{instance.pk}:{instance.version}')
+    thumbnails.get_variants(instance)
+    invalidate(
+        *post_cache_tags(instance),
+        *getattr(instance, '_previous_cache_tags', ()),
+    )
+
+
+@receiver(post_delete, sender=Post)
+def on_post_deleted(sender, instance, **kwargs):
+    counters.post_removed(instance)
+    search.get_backend().remove(instance.pk)
+    invalidate(*post_cache_tags(instance))
+
+
+@receiver(post_save, sender=Comment)
+def on_comment_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.comment_added(instance)
+    invalidate(f'post:{instance.post_id}')
+
+
+@receiver(post_delete, sender=Comment)
+def on_comment_deleted(sender, instance, **kwargs):
+    counters.comment_removed(instance)
+    invalidate(f'post:{instance.post_id}')
+
+
+def follow_cache_tags(follow):
+    return (
+        f'profile:{follow.author.username}',
+        f'profile:{follow.user.username}',
+    )
+
+
+@receiver(post_save, sender=Follow)
+def on_follow_created(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.follow_added(instance)
+        feed.stop_fanout(instance.author_id)
+        feed.backfill_timeline(instance.user_id, instance.author_id)
+        digests.start_watermark(instance.user_id)
+        invalidate(*follow_cache_tags(instance))
+
+
+@receiver(post_delete, sender=Follow)
+def on_follow_deleted(sender, instance, **kwargs):
+    counters.follow_removed(instance)
+    feed.prune_timeline(instance.user_id, instance.author_id)
+    if feed.needs_fanout_resume(instance.author_id):
+        # Заполнение лент всех подписчиков не должно задерживать отписку.
+        tasks.resume_fanout.delay(instance.author_id)
+    invalidate(*follow_cache_tags(instance))
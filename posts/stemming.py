@@ -0,0 +1,81 @@
+"""Стеммер Портера (Snowball) для русского языка."""
+import re
+
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND = re.compile(
+    r'((?<=[ая])(в|вши|вшись)|(ив|ивши|ившись|ыв|ывши|ывшись))$'
+)
+REFLEXIVE = re.compile(r'(ся|сь)$')
+ADJECTIVE = (
+    r'(ее|ие|ые|ое|ими|ыми|ей|ий|ый|ой|ем|им|ым|ом|его|ого|ему|ому'
+    r'|их|ых|ую|юю|ая|яя|ою|ею)'
+)
+PARTICIPLE = r'((?<=[ая])(ем|нн|вш|ющ|щ)|(ивш|ывш|ующ))'
+ADJECTIVAL = re.compile(f'({PARTICIPLE}?{ADJECTIVE})$')
+VERB = re.compile(
+    r'((?<=[ая])(ла|на|ете|йте|ли|й|л|ем|н|ло|но|ет|ют|ны|ть|ешь|нно)'
+    r'|(ила|ыла|ена|ейте|уйте|ите|или|ыли|ей|уй|ил|ыл|им|ым|ен|ило'
+    r'|ыло|ено|ят|ует|уют|ит|ыт|ены|ить|ыть|ишь|ую|ю))$'
+)
+NOUN = re.compile(
+    r'(а|ев|ов|ие|ье|е|иями|ями|ами|еи|ии|и|ией|ей|ой|ий|й|иям|ям|ием'
+    r'|ем|ам|ом|о|у|ах|иях|ях|ы|ь|ию|ью|ю|ия|ья|я)$'
+)
+DERIVATIONAL = re.compile(r'ость?$')
+SUPERLATIVE = re.compile(r'(ейше|ейш)$')
+WORD = re.compile(r'\w+')
+
+
+def _region(word, start=0):
+    for index in range(start + 1, len(word)):
+        if word[index - 1] in VOWELS and word[index] not in VOWELS:
+            return index + 1
+    return len(word)
+
+
+def _cut(pattern, text):
+    return pattern.sub('', text, 1)
+
+
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv_start = next(
+        (index + 1 for index, char in enumerate(word) if char in VOWELS),
+        len(word),
+    )
+    head, rv = word[:rv_start], word[rv_start:]
+
+    stemmed = _cut(PERFECTIVE_GERUND, rv)
+    if stemmed == rv:
+        rv = _cut(REFLEXIVE, rv)
+        stemmed = _cut(ADJECTIVAL, rv)
+        if stemmed == rv:
+            stemmed = _cut(VERB, rv)
+            if stemmed == rv:
+                stemmed = _cut(NOUN, rv)
+    rv = stemmed
+
+    if rv.endswith('и'):
+        rv = rv[:-1]
+
+    r2_start = _region(word, _region(word))
+    match = DERIVATIONAL.search(rv)
+    if match and rv_start + match.start() >= r2_start:
+        rv = rv[:match.start()]
+
+    if rv.endswith('нн'):
+        rv = rv[:-1]
+    else:
+        stemmed = _cut(SUPERLATIVE, rv)
+        if stemmed != rv:
+            rv = stemmed[:-1] if stemmed.endswith('нн') else stemmed
+        elif rv.endswith('ь'):
+            rv = rv[:-1]
+
+    return head + rv
+
+
+def stem_text(text):
+    """Приводит текст к последовательности основ слов."""
+    return ' '.join(stem(word) for word in WORD.findall(text))
@@ -0,0 +1,231 @@
+"""RSS, Atom и JSON Feed для ленты, групп, авторов и подписок.
+
+Ленты строятся на тех же querysets, что и страницы, ограничены
+SYNDICATION_FEED_ITEMS постами и не обращаются к картинкам.
+"""
+import json
+
+from django.contrib.syndication.views import Feed
+from django.core import signing
+from django.db.models import Count, F, Max
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import feedgenerator
+from django.utils.text import Truncator
+
+from .feed import FEED_ORDERING, get_follow_feed
+from .models import Follow, Group, Post, User, UserStats
+from . import constants
+
+FOLLOW_FEED_SALT = 'posts.follow-feed'
+
+# Поля, которые нужны элементам ленты; картинка не загружается.
+ITEM_FIELDS = (
+    'text', 'created', 'modified',
+    'author__username', 'author__first_name', 'author__last_name',
+    'group__title',
+)
+
+
+class JSONFeed(feedgenerator.SyndicationFeed):
+    """JSON Feed 1.1 (https://jsonfeed.org/version/1.1)."""
+
+    content_type = 'application/feed+json; charset=utf-8'
+
+    def write(self, outfile, encoding):
+        feed = {
+            'version': 'https://jsonfeed.org/version/1.1',
+            'title': self.feed['title'],
+            'home_page_url': self.feed['link'],
+            'feed_url': self.feed['feed_url'],
+            'description': self.feed['description'],
+            'language': self.feed['language'],
+            'items': [self.item(item) for item in self.items],
+        }
+        outfile.write(json.dumps(feed, ensure_ascii=False))
+
+    @staticmethod
+    def item(item):
+        data = {
+            'id': item['unique_id'] or item['link'],
+            'url': item['link'],
+            'title': item['title'],
+            'content_text': item['description'],
+            'date_published': item['pubdate'].isoformat(),
+            'authors': [{'name': item['author_name']}],
+        }
+        if item['updateddate']:
+            data['date_modified'] = item['updateddate'].isoformat()
+        if item['categories']:
+            data['tags'] = list(item['categories'])
+        return data
+
+
+FEED_TYPES = {
+    'rss': feedgenerator.Rss201rev2Feed,
+    'atom': feedgenerator.Atom1Feed,
+    'json': JSONFeed,
+}
+
+
+class FeedFormatConverter:
+    regex = '|'.join(FEED_TYPES)
+
+    def to_python(self, value):
+        return value
+
+    def to_url(self, value):
+        return value
+
+
+def _feed_key(user_id):
+    return UserStats.objects.filter(pk=user_id).values_list(
+        'feed_key', flat=True
+    ).first() or 0
+
+
+def follow_feed_token(user):
+    """Ссылка на личную ленту: id читателя и версия его ключа ленты."""
+    return signing.dumps(
+        [user.pk, _feed_key(user.pk)], salt=FOLLOW_FEED_SALT, compress=True
+    )
+
+
+def rotate_follow_feed_token(user):
+    """Отзывает выданные ссылки на ленту, например утекшую."""
+    UserStats.objects.get_or_create(user_id=user.pk)
+    UserStats.objects.filter(pk=user.pk).update(feed_key=F('feed_key') + 1)
+
+
+def user_from_token(request, token):
+    """Владелец личной ленты; запоминается на время запроса."""
+    if not hasattr(request, '_follow_feed_user'):
+        try:
+            payload = signing.loads(token, salt=FOLLOW_FEED_SALT)
+        except signing.BadSignature:
+            raise Http404('Неверная ссылка на ленту')
+        # Ссылки без версии выданы до ключа и действуют до первой смены.
+        user_id, key = payload if isinstance(payload, list) else (payload, 0)
+        user = get_object_or_404(
+            User.objects.select_related('stats'), pk=user_id
+        )
+        stats = getattr(user, 'stats', None)
+        if key != (stats.feed_key if stats else 0):
+            raise Http404('Ссылка на ленту отозвана')
+        request._follow_feed_user = user
+    return request._follow_feed_user
+
+
+class PostsFeed(Feed):
+    """Общая часть лент; подклассы определяют posts(obj) — посты ленты."""
+    description = 'Новые посты Yatube'
+
+    def __init__(self, feed_format):
+        super().__init__()
+        self.feed_type = FEED_TYPES[feed_format]
+
+    def items(self, obj):
+        return self.posts(obj).select_related(
+            'author', 'group',
+        ).only(*ITEM_FIELDS)[:constants.SYNDICATION_FEED_ITEMS]
+
+    def item_title(self, post):
+        return Truncator(post.text).chars(constants.SYNDICATION_TITLE_LENGTH)
+
+    def item_description(self, post):
+        return post.text
+
+    def item_link(self, post):
+        return reverse('posts:post_detail', args=(post.pk,))
+
+    def item_pubdate(self, post):
+        return post.created
+
+    def item_updateddate(self, post):
+        return post.modified
+
+    def item_author_name(self, post):
+        return post.author.get_full_name() or post.author.username
+
+    def item_categories(self, post):
+        return (post.group.title,) if post.group_id else ()
+
+
+class IndexFeed(PostsFeed):
+    title = 'Yatube: последние посты'
+
+    def link(self):
+        return reverse('posts:index')
+
+    def posts(self, obj):
+        return Post.objects.all()
+
+
+class GroupFeed(PostsFeed):
+    def get_object(self, request, slug):
+        return get_object_or_404(Group, slug=slug)
+
+    def title(self, group):
+        return f'Yatube: группа {group.title}'
+
+    def link(self, group):
+        return reverse('posts:group_list', args=(group.slug,))
+
+    def description(self, group):
+        return group.description
+
+    def posts(self, group):
+        return group.posts.all()
+
+
+class ProfileFeed(PostsFeed):
+    def get_object(self, request, username):
+        return get_object_or_404(User, username=username)
+
+    def title(self, author):
+        return f'Yatube: посты {author.get_full_name() or author.username}'
+
+    def link(self, author):
+        return reverse('posts:profile', args=(author.username,))
+
+    def posts(self, author):
+        return author.posts.all()
+
+
+class FollowFeed(PostsFeed):
+    title = 'Yatube: мои подписки'
+
+    def get_object(self, request, token):
+        return user_from_token(request, token)
+
+    def link(self):
+        return reverse('posts:follow_index')
+
+    def posts(self, user):
+        return get_follow_feed(user).order_by(
+            *(f'-{field}' for field in FEED_ORDERING)
+        )
+
+
+def serve(feed_class, request, feed_format, **kwargs):
+    return feed_class(feed_format)(request, **kwargs)
+
+
+def follow_state(request, token, **kwargs):
+    return get_follow_feed(user_from_token(request, token)).aggregate(
+        last_modified=Max('modified'),
+        count=Count('pk'),
+    )
+
+
+def follow_cache_tags(request, token, **kwargs):
+    """Лента подписок меняется с постами авторов и подписками читателя."""
+    user = user_from_token(request, token)
+    authors = Follow.objects.filter(user=user).values_list(
+        'author__username', flat=True
+    )
+    return [
+        f'profile:{user.username}',
+        *(f'profile:{username}' for username in authors),
+    ]
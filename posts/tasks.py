@@ -0,0 +1,31 @@
+"""Фоновые задачи постов: ленты, поисковый индекс и дайджесты.
+
+Пост читается через get(): если его нет, задача падает и повторяется,
+а не отмечается выполненной без работы.
+"""
+from core.tasks import task
+
+from .models import Post
+from . import digests, feed, search
+
+
+@task
+def fan_out_post(post_id):
+    feed.fan_out_post(
+        Post.objects.only('pk', 'author_id', 'created').get(pk=post_id))
+
+
+@task
+def resume_fanout(author_id):
+    feed.resume_fanout(author_id)
+
+
+@task
+def index_post(post_id):
+    search.get_backend().index(
+        Post.objects.only('pk', 'text').get(pk=post_id))
+
+
+@task
+def send_digests():
+    digests.send_digests()
@@ -0,0 +1,37 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from core import profiling
+from posts import constants
+
+register = template.Library()
+
+CARD_TEMPLATE = 'posts/includes/article.html'
+CARD_SEPARATOR = '\n<hr>\n'
+
+
+def card_cache_key(post, show_group):
+    return f'post_card:{post.pk}:{post.version}:{int(show_group)}'
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts, show_group=True):
+    """Карточки постов страницы: один get_many и рендер только промахов."""
+    keys = {card_cache_key(post, show_group): post for post in posts}
+    cards = cache.get_many(keys)
+
+    missing = {
+        key: render_to_string(
+            CARD_TEMPLATE,
+            {'post': post, 'show_group': show_group},
+        )
+        for key, post in keys.items() if key not in cards
+    }
+    profiling.record_cache(hits=len(cards), misses=len(missing))
+    if missing:
+        cache.set_many(missing, constants.POST_CARD_CACHE_TIMEOUT)
+        cards.update(missing)
+
+    return mark_safe(CARD_SEPARATOR.join(cards[key] for key in keys))
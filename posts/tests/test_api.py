@@ -0,0 +1,130 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post, User
+from .. import api
+
+
+class ReadApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.posts = [
+            Post.objects.create(
+                author=ReadApiTests.author,
+                text=f'Пост {number}',
+                group=ReadApiTests.group,
+            )
+            for number in range(3)
+        ]
+        cls.comment = Comment.objects.create(
+            post=ReadApiTests.posts[0],
+            author=ReadApiTests.reader,
+            text='Комментарий',
+        )
+        Follow.objects.create(
+            user=ReadApiTests.reader, author=ReadApiTests.author
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(ReadApiTests.reader)
+
+    def test_index_lists_posts_newest_first(self):
+        """Лента API отдает посты от новых к старым"""
+        data = self.client.get(reverse('posts:api_index')).json()
+        self.assertEqual(
+            [item['id'] for item in data['results']],
+            [post.pk for post in reversed(ReadApiTests.posts)],
+        )
+        self.assertEqual(data['results'][0]['author'], 'author')
+        self.assertEqual(data['results'][0]['group'], 'test-slug')
+        self.assertIsNone(data['next'])
+
+    def test_fields_narrow_projection(self):
+        """?fields= оставляет в ответе только выбранные поля"""
+        data = self.client.get(
+            reverse('posts:api_index'), {'fields': 'id,text,unknown'}
+        ).json()
+        self.assertEqual(set(data['results'][0]), {'id', 'text'})
+
+    def test_cursor_pages_through_posts(self):
+        """Курсор next продолжает выдачу со следующего поста"""
+        url = reverse('posts:api_index')
+        first = self.client.get(url, {'limit': 2}).json()
+        second = self.client.get(
+            url, {'limit': 2, 'cursor': first['next']}).json()
+        self.assertEqual(
+            [item['id'] for item in first['results'] + second['results']],
+            [post.pk for post in reversed(ReadApiTests.posts)],
+        )
+        self.assertIsNone(second['next'])
+
+    def test_group_and_profile(self):
+        """Группа и автор отдаются вместе с постами"""
+        group = self.client.get(
+            reverse('posts:api_group', args=('test-slug',))).json()
+        self.assertEqual(group['group']['title'], 'Тестовая группа')
+        self.assertEqual(len(group['results']), len(ReadApiTests.posts))
+
+        profile = self.reader_client.get(
+            reverse('posts:api_profile', args=('author',))).json()
+        self.assertEqual(profile['author']['posts_count'], 3)
+        self.assertTrue(profile['author']['following'])
+
+    def test_post_includes_comments(self):
+        """Пост отдается с первой страницей комментариев"""
+        data = self.client.get(
+            reverse('posts:api_post', args=(ReadApiTests.posts[0].pk,))
+        ).json()
+        self.assertEqual(data['post']['text'], 'Пост 0')
+        self.assertEqual(
+            [comment['id'] for comment in data['comments']],
+            [ReadApiTests.comment.pk],
+        )
+
+    def test_follow_requires_login(self):
+        """Лента подписок API доступна только авторизованным"""
+        url = reverse('posts:api_follow')
+        self.assertEqual(self.client.get(url).status_code, 401)
+        data = self.reader_client.get(url).json()
+        self.assertEqual(len(data['results']), len(ReadApiTests.posts))
+
+    def test_missing_objects_return_404(self):
+        """Несуществующие объекты отдают 404 в JSON"""
+        for url in (
+            reverse('posts:api_group', args=('missing',)),
+            reverse('posts:api_profile', args=('missing',)),
+            reverse('posts:api_post', args=(0,)),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 404)
+                self.assertIn('detail', response.json())
+
+    def test_msgpack_format(self):
+        """?format=msgpack упаковывает ответ или отвечает 406 без пакета"""
+        url = reverse('posts:api_index')
+        with mock.patch.object(api, 'msgpack', None):
+            self.assertEqual(
+                self.client.get(url, {'format': 'msgpack'}).status_code, 406)
+
+        packer = mock.Mock()
+        packer.packb.return_value = b'\x80'
+        cache.clear()
+        with mock.patch.object(api, 'msgpack', packer):
+            response = self.client.get(url, {'format': 'msgpack'})
+        self.assertEqual(response['Content-Type'], 'application/msgpack')
+        self.assertEqual(response.content, b'\x80')
+        self.assertIn('results', packer.packb.call_args[0][0])
@@ -0,0 +1,192 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from ..models import (
+    Comment, DigestState, Follow, Group, Post, TimelineEntry, User,
+)
+from .. import constants
+from ..search import search_post_ids
+
+
+class BatchApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=BatchApiTests.author,
+            text='Тестовый пост',
+        )
+        Follow.objects.create(
+            user=BatchApiTests.follower, author=BatchApiTests.user
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(BatchApiTests.user)
+
+    def post_items(self, name, items):
+        url = reverse(name)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.post(
+                url, json.dumps({'items': items}),
+                content_type='application/json',
+            )
+        self.assertLessEqual(len(queries), resolve(url).func.query_budget)
+        return response
+
+    def test_posts_created_with_per_item_results(self):
+        """Пакет постов создает валидные и сообщает об ошибках остальных"""
+        response = self.post_items('posts:api_batch_posts', [
+            {'text': 'Первый пакетный', 'group': BatchApiTests.group.pk},
+            {'text': ''},
+            {'text': 'Второй пакетный', 'group': 0},
+            {'text': 'Третий пакетный'},
+        ])
+        results = response.json()['results']
+        self.assertEqual(
+            [result['ok'] for result in results], [True, False, False, True])
+        self.assertIn('text', results[1]['errors'])
+        self.assertIn('group', results[2]['errors'])
+
+        created = Post.objects.get(pk=results[0]['id'])
+        self.assertEqual(created.text, 'Первый пакетный')
+        self.assertEqual(created.group, BatchApiTests.group)
+        self.assertEqual(created.author, BatchApiTests.user)
+        self.assertEqual(
+            Post.objects.get(pk=results[3]['id']).text, 'Третий пакетный')
+
+    def test_posts_side_effects(self):
+        """Пакет постов обновляет счетчик, ленты подписчиков и поиск"""
+        results = self.post_items('posts:api_batch_posts', [
+            {'text': 'Пакетный снегирь'}, {'text': 'Пакетный пост'},
+        ]).json()['results']
+        ids = {result['id'] for result in results}
+        BatchApiTests.user.stats.refresh_from_db()
+        self.assertEqual(BatchApiTests.user.stats.posts_count, 2)
+        self.assertEqual(set(TimelineEntry.objects.filter(
+            user=BatchApiTests.follower
+        ).values_list('post_id', flat=True)), ids)
+        self.assertEqual(search_post_ids('снегирь'), [results[0]['id']])
+
+    def test_comments_with_replies(self):
+        """Пакет комментариев строит пути ответов и счетчики поста"""
+        root = Comment.objects.create(
+            post=BatchApiTests.post,
+            author=BatchApiTests.author,
+            text='Корень',
+        )
+        results = self.post_items('posts:api_batch_comments', [
+            {'post': BatchApiTests.post.pk, 'text': 'Новый'},
+            {'post': BatchApiTests.post.pk, 'text': 'Ответ',
+             'parent': root.pk},
+            {'post': 0, 'text': 'Мимо'},
+        ]).json()['results']
+        self.assertEqual(
+            [result['ok'] for result in results], [True, True, False])
+        reply = Comment.objects.get(pk=results[1]['id'])
+        self.assertEqual(reply.parent, root)
+        self.assertEqual(
+            reply.path,
+            root.path + str(reply.pk).zfill(constants.COMMENT_PATH_STEP),
+        )
+        self.assertEqual(
+            Comment.objects.get(pk=results[0]['id']).depth, 0)
+        BatchApiTests.post.refresh_from_db()
+        self.assertEqual(BatchApiTests.post.comments_count, 3)
+
+    def test_follows_last_action_wins(self):
+        """Пакет подписок применяет последнее действие по каждому автору"""
+        results = self.post_items('posts:api_batch_follows', [
+            {'author': 'author'},
+            {'author': 'follower', 'action': 'follow'},
+            {'author': 'follower', 'action': 'unfollow'},
+            {'author': 'auth'},
+            {'author': 'missing'},
+        ]).json()['results']
+        self.assertEqual(
+            [result['ok'] for result in results],
+            [True, True, True, False, False],
+        )
+        self.assertEqual(list(Follow.objects.filter(
+            user=BatchApiTests.user
+        ).values_list('author__username', flat=True)), ['author'])
+        BatchApiTests.author.stats.refresh_from_db()
+        self.assertEqual(BatchApiTests.author.stats.followers_count, 1)
+        self.assertTrue(
+            DigestState.objects.filter(user=BatchApiTests.user).exists())
+
+        self.post_items('posts:api_batch_follows', [
+            {'author': 'author', 'action': 'unfollow'},
+        ])
+        self.assertFalse(
+            Follow.objects.filter(user=BatchApiTests.user).exists())
+
+    def test_concurrent_follow_not_counted_twice(self):
+        """Подписка, созданная параллельным запросом, не ломает пакет"""
+        bulk_create = Follow.objects.bulk_create
+
+        def follow_concurrently(objs, *args, **kwargs):
+            Follow.objects.create(
+                user=BatchApiTests.user, author=BatchApiTests.author)
+            return bulk_create(objs, *args, **kwargs)
+
+        with mock.patch.object(
+            Follow.objects, 'bulk_create', side_effect=follow_concurrently
+        ):
+            response = self.authorized_client.post(
+                reverse('posts:api_batch_follows'),
+                json.dumps({'items': [{'author': 'author'}]}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.json()['results'], [{'ok': True}])
+        BatchApiTests.author.stats.refresh_from_db()
+        BatchApiTests.user.stats.refresh_from_db()
+        self.assertEqual(BatchApiTests.author.stats.followers_count, 1)
+        self.assertEqual(BatchApiTests.user.stats.following_count, 1)
+
+    def test_rejects_bool_ids(self):
+        """true не принимается за id 1"""
+        self.assertEqual(BatchApiTests.group.pk, 1)
+        results = self.post_items('posts:api_batch_posts', [
+            {'text': 'Пост', 'group': True},
+            {'text': 'Пост', 'group': [1]},
+        ]).json()['results']
+        self.assertEqual(results, [
+            {'ok': False, 'errors': {'group': 'Группа не найдена'}},
+        ] * 2)
+        self.assertFalse(Post.objects.filter(group__isnull=False).exists())
+
+    def test_rejects_bad_requests(self):
+        """Пакет без авторизации, без списка или сверх лимита отклоняется"""
+        url = reverse('posts:api_batch_posts')
+        body = json.dumps({'items': [{'text': 'Пост'}]})
+        self.assertEqual(self.client.post(
+            url, body, content_type='application/json').status_code, 401)
+        for body in (
+            'не json',
+            json.dumps([{'text': 'Пост'}]),
+            json.dumps({'items': {'text': 'Пост'}}),
+            json.dumps({'items': []}),
+            json.dumps({'items': [{}] * (constants.BATCH_MAX_ITEMS + 1)}),
+        ):
+            with self.subTest(body=body[:20]):
+                response = self.authorized_client.post(
+                    url, body, content_type='application/json')
+                self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            self.authorized_client.get(url).status_code, 405)
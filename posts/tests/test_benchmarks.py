@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase
+
+from ..models import Comment, Follow, Post, TimelineEntry, User
+
+
+class BenchmarkCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed_data', users=5, groups=2, posts=20, comments=10,
+            follows=6, seed=1, stdout=StringIO(),
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_seed_data_creates_dataset(self):
+        """seed_data создает заданный объем данных и перестраивает ленты"""
+        self.assertEqual(User.objects.count(), 5)
+        self.assertEqual(Post.objects.count(), 20)
+        self.assertEqual(Comment.objects.count(), 10)
+        self.assertEqual(Follow.objects.count(), 6)
+        self.assertTrue(TimelineEntry.objects.exists())
+        author = Post.objects.first().author
+        self.assertEqual(
+            author.stats.posts_count,
+            Post.objects.filter(author=author).count(),
+        )
+
+    def test_benchmark_writes_report(self):
+        """benchmark сохраняет перцентили и число запросов в JSON"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'report.json')
+            call_command(
+                'benchmark', iterations=2, output=output, stdout=StringIO(),
+            )
+            with open(output, encoding='utf-8') as file:
+                report = json.load(file)
+            self.assertEqual(report['dataset']['posts'], Post.objects.count())
+            for name in ('index', 'group_posts', 'profile', 'post_detail',
+                         'follow_index', 'post_create', 'add_comment'):
+                with self.subTest(name=name):
+                    result = report['results'][name]
+                    self.assertEqual(result['iterations'], 2)
+                    self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+            stdout = StringIO()
+            call_command(
+                'benchmark', iterations=1, scenarios=['index'],
+                compare=output, stdout=stdout,
+            )
+            self.assertIn('p50_ms:', stdout.getvalue())
+
+    def test_benchmark_compares_batch_writes(self):
+        """benchmark --batch сравнивает запись по одному и пакетом"""
+        posts_before = Post.objects.count()
+        stdout = StringIO()
+        call_command(
+            'benchmark', iterations=1, scenarios=['index'], batch=3,
+            stdout=stdout,
+        )
+        self.assertEqual(Post.objects.count(), posts_before + 6)
+        self.assertIn('posts x3: по одному', stdout.getvalue())
+        self.assertIn('comments x3: по одному', stdout.getvalue())
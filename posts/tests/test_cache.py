@@ -0,0 +1,108 @@
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+
+from core.routers import PrimaryReplicaRouter
+from ..conditional import conditional_view
+from ..models import Post
+from .. import cache as view_cache
+
+
+class CachedViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        view_cache.reset_cache_metrics()
+        self.calls = 0
+
+        @view_cache.cached_view('test-tag')
+        def counted_view(request):
+            self.calls += 1
+            return HttpResponse(f'Рендер {self.calls}')
+
+        self.view = counted_view
+
+    def get(self):
+        request = RequestFactory().get('/cached/')
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def lock_page(self):
+        request = RequestFactory().get('/cached/')
+        request.user = AnonymousUser()
+        key = view_cache._page_key(request, 'counted_view')
+        cache.add(f'{key}:lock', 1)
+
+    def test_hit_after_miss(self):
+        """Повторный запрос отдается из кеша"""
+        first = self.get()
+        second = self.get()
+        self.assertEqual(first.content, second.content)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(view_cache.cache_metrics(), {
+            ('counted_view', 'miss'): 1,
+            ('counted_view', 'hit'): 1,
+        })
+
+    def test_invalidation_recomputes_page(self):
+        """Инвалидация тега приводит к пересчету страницы"""
+        self.get()
+        view_cache.invalidate('test-tag')
+        self.assertEqual(self.get().content.decode(), 'Рендер 2')
+
+    def test_stale_copy_is_served_while_locked(self):
+        """Пока другой запрос пересчитывает страницу, отдается старая копия"""
+        self.get()
+        view_cache.invalidate('test-tag')
+        self.lock_page()
+
+        self.assertEqual(self.get().content.decode(), 'Рендер 1')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(
+            view_cache.cache_metrics()[('counted_view', 'stale')], 1)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaLagTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        router = PrimaryReplicaRouter()
+        self.reads = []
+
+        def state(request):
+            self.reads.append(('state', router.db_for_read(Post)))
+            return {}
+
+        @conditional_view(state)
+        @view_cache.cached_view('test-tag')
+        def lagging_view(request):
+            self.reads.append(('view', router.db_for_read(Post)))
+            return HttpResponse('Страница')
+
+        self.view = lagging_view
+
+    def get(self, path):
+        request = RequestFactory().get(path)
+        request.user = AnonymousUser()
+        return self.view(request)
+
+    def test_reads_primary_after_invalidation(self):
+        """После инвалидации страница и валидаторы читают основную базу"""
+        self.get('/first/')
+        self.assertEqual(
+            self.reads, [('state', 'replica'), ('view', 'replica')])
+
+        self.reads.clear()
+        view_cache.invalidate('test-tag')
+        self.get('/second/')
+        self.assertEqual(
+            self.reads, [('state', 'default'), ('view', 'default')])
+
+        self.reads.clear()
+        cache.delete_many([
+            view_cache.RECENT_KEY.format(
+                view_cache._generation_key('test-tag'))
+        ])
+        self.get('/third/')
+        self.assertEqual(
+            self.reads, [('state', 'replica'), ('view', 'replica')])
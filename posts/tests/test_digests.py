@@ -0,0 +1,105 @@
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core import mail
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from ..models import DigestState, Follow, Post, User
+from .. import constants, digests
+
+
+@override_settings(
+    EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+@mock.patch.object(constants, 'DIGEST_SETTLE_SECONDS', 0)
+class DigestTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.other = User.objects.create_user(username='other')
+        cls.readers = [
+            User.objects.create_user(
+                username=f'reader-{number}',
+                email=f'reader-{number}@example.com',
+            )
+            for number in range(3)
+        ]
+        cls.silent = User.objects.create_user(username='silent')
+        Post.objects.create(author=DigestTests.author, text='Старый пост')
+        for reader in DigestTests.readers + [DigestTests.silent]:
+            Follow.objects.create(user=reader, author=DigestTests.author)
+
+    def test_follow_sets_watermark_without_archive(self):
+        """Подписка ставит водяной знак, старые посты не рассылаются"""
+        self.assertEqual(DigestState.objects.count(), 4)
+        self.assertEqual(digests.send_digests(), 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_posts_before_first_run_are_sent(self):
+        """Посты между подпиской и первым запуском попадают в письмо"""
+        reader = User.objects.create_user(
+            username='newcomer', email='newcomer@example.com')
+        Follow.objects.create(user=reader, author=DigestTests.other)
+        Post.objects.create(author=DigestTests.other, text='После подписки')
+
+        self.assertEqual(digests.send_digests(), 1)
+        self.assertEqual(mail.outbox[0].to, ['newcomer@example.com'])
+        self.assertIn('После подписки', mail.outbox[0].body)
+
+    def test_recent_posts_wait_for_settle_window(self):
+        """Свежие посты ждут DIGEST_SETTLE_SECONDS, но не теряются"""
+        post = Post.objects.create(author=DigestTests.author, text='Свежий')
+        with mock.patch.object(constants, 'DIGEST_SETTLE_SECONDS', 60):
+            self.assertEqual(digests.send_digests(), 0)
+            Post.objects.filter(pk=post.pk).update(
+                created=timezone.now() - timedelta(minutes=2))
+            self.assertEqual(digests.send_digests(), 3)
+
+    def test_incremental_digests(self):
+        """Каждый запуск шлет только посты, вышедшие после прошлого"""
+        digests.send_digests()
+        Post.objects.create(author=DigestTests.author, text='Первый новый')
+        Post.objects.create(author=DigestTests.other, text='Чужой пост')
+        Post.objects.create(author=DigestTests.author, text='Второй новый')
+
+        self.assertEqual(digests.send_digests(batch_size=2), 3)
+        self.assertEqual(
+            sorted(message.to[0] for message in mail.outbox),
+            [reader.email for reader in DigestTests.readers],
+        )
+        body = mail.outbox[0].body
+        self.assertIn('Второй новый', body)
+        self.assertIn('Первый новый', body)
+        self.assertNotIn('Чужой пост', body)
+        self.assertNotIn('Старый пост', body)
+
+        mail.outbox.clear()
+        self.assertEqual(digests.send_digests(), 0)
+        self.assertEqual(len(mail.outbox), 0)
+
+    def test_batch_queries_and_single_connection(self):
+        """Пачка подписчиков — постоянное число запросов и одно соединение"""
+        digests.send_digests()
+        Post.objects.create(author=DigestTests.author, text='Новый пост')
+        backend = mail.get_connection()
+        with mock.patch.object(
+            backend, 'open', wraps=backend.open
+        ) as opened, CaptureQueriesContext(connection) as queries:
+            digests.send_digests(connection=backend)
+        opened.assert_called_once()
+        # граница запуска, водяные знаки подписанных в обход сигналов,
+        # пачка, посты пачки, два UPDATE и пустая следующая пачка.
+        self.assertEqual(len(queries), 7)
+
+    def test_send_digests_command(self):
+        """send_digests сообщает число отправленных писем"""
+        digests.send_digests()
+        Post.objects.create(author=DigestTests.author, text='Новый пост')
+        stdout = StringIO()
+        call_command('send_digests', stdout=stdout)
+        self.assertIn('Отправлено писем: 3', stdout.getvalue())
@@ -1,11 +1,13 @@
 import shutil
 import tempfile
+from unittest import mock
 
 from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 
+from ..forms import PostForm
 from ..models import Post, Group, User, Comment
 from ..constants import BYTE_IMAGE
 
@@ -107,6 +109,25 @@ class TaskCreateFormTests(TestCase):
         self.assertEqual(
             new_group_response.context['page_obj'].paginator.count, 1)
 
+    def test_edit_keeps_concurrent_comment_count(self):
+        """Правка поста не затирает комментарий, добавленный во время нее"""
+        post = TaskCreateFormTests.post
+        is_valid = PostForm.is_valid
+
+        def comment_meanwhile(form):
+            Comment.objects.create(
+                post=post, author=TaskCreateFormTests.user, text='Пока')
+            return is_valid(form)
+
+        with mock.patch.object(PostForm, 'is_valid', comment_meanwhile):
+            self.authorized_client.post(
+                reverse('posts:post_edit', args=(post.id,)),
+                data={'text': 'Правка'},
+            )
+        post.refresh_from_db()
+        self.assertEqual(post.text, 'Правка')
+        self.assertEqual(post.comments_count, post.comments.count())
+
     def test_create_comment(self):
         """После успешной отправки комментарий появляется на странице поста"""
         form_data = {
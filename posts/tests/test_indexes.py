@@ -0,0 +1,100 @@
+from unittest import skipUnless
+
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase
+from django.utils import timezone
+
+from ..feed import FEED_ORDERING, get_follow_feed
+from ..models import Follow, Group, Post, User
+from ..utils import CursorPaginator
+
+
+@skipUnless(connection.vendor == 'sqlite', 'Планы EXPLAIN в формате SQLite')
+class QueryPlanTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        Follow.objects.create(
+            user=QueryPlanTests.user, author=QueryPlanTests.author)
+
+    def assertPlanUsesIndex(self, queryset, ordering, index_name):
+        paginator = CursorPaginator(queryset, 10, ordering)
+        pages = (
+            paginator.page_queryset(),
+            paginator.page_queryset('n', timezone.now(), 1),
+        )
+        for page in pages:
+            plan = page.explain()
+            self.assertIn(index_name, plan)
+            self.assertNotIn('TEMP B-TREE', plan)
+
+    def test_list_views_use_index_scan(self):
+        """Списки постов читаются по индексу без сортировки"""
+        querysets = {
+            'index': (
+                Post.objects.select_related('author', 'group'),
+                ('created', 'pk'),
+                'posts_post_created',
+            ),
+            'group_posts': (
+                QueryPlanTests.group.posts.select_related('author', 'group'),
+                ('created', 'pk'),
+                'post_group_created_idx',
+            ),
+            'profile': (
+                QueryPlanTests.author.posts.select_related('author', 'group'),
+                ('created', 'pk'),
+                'post_author_created_idx',
+            ),
+            'follow_index': (
+                get_follow_feed(QueryPlanTests.user).select_related(
+                    'author', 'group'),
+                FEED_ORDERING,
+                'timeline_user_created_idx',
+            ),
+        }
+        for view, (queryset, ordering, index_name) in querysets.items():
+            with self.subTest(view=view):
+                self.assertPlanUsesIndex(queryset, ordering, index_name)
+
+    def test_following_check_uses_unique_index(self):
+        """Проверка подписки использует уникальный индекс"""
+        plan = Follow.objects.filter(
+            user=QueryPlanTests.user, author=QueryPlanTests.author
+        ).explain()
+        self.assertIn('COVERING INDEX', plan)
+
+
+class FollowConstraintTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+
+    def test_duplicate_follow_is_rejected(self):
+        """Повторная подписка на автора запрещена на уровне БД"""
+        Follow.objects.create(
+            user=FollowConstraintTests.user,
+            author=FollowConstraintTests.author,
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(
+                user=FollowConstraintTests.user,
+                author=FollowConstraintTests.author,
+            )
+
+    def test_self_follow_is_rejected(self):
+        """Подписка на самого себя запрещена на уровне БД"""
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(
+                user=FollowConstraintTests.user,
+                author=FollowConstraintTests.user,
+            )
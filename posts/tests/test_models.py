@@ -1,7 +1,11 @@
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
 
-from ..models import Group, Post, User
+from ..models import Comment, Follow, Group, Post, User, UserStats
 from .. import constants
+from ..signals import bump_post_versions
 
 
 class PostModelTests(TestCase):
@@ -54,3 +58,69 @@ class PostModelTests(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     post._meta.get_field(field).help_text, expected_value)
+
+
+class PostVersionTests(TestCase):
+    def test_save_keeps_concurrent_version_bump(self):
+        """Правка не теряет параллельное увеличение версии"""
+        author = User.objects.create_user(username='author')
+        post = Post.objects.create(author=author, text='Пост')
+        stale = Post.objects.get(pk=post.pk)
+        bump_post_versions(pk=post.pk)
+
+        stale.text = 'Правка'
+        stale.save()
+        self.assertEqual(stale.version, 2)
+        post.refresh_from_db()
+        self.assertEqual(post.version, 2)
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+
+    def get_stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_creates_and_deletes(self):
+        """Счетчики меняются при создании и удалении объектов."""
+        post = Post.objects.create(
+            text='Тестовый пост', author=CountersTests.author)
+        comment = Comment.objects.create(
+            text='Комментарий', post=post, author=CountersTests.user)
+        follow = Follow.objects.create(
+            user=CountersTests.user, author=CountersTests.author)
+
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(self.get_stats(CountersTests.author).posts_count, 1)
+        self.assertEqual(
+            self.get_stats(CountersTests.author).followers_count, 1)
+        self.assertEqual(
+            self.get_stats(CountersTests.user).following_count, 1)
+
+        comment.delete()
+        follow.delete()
+        post.refresh_from_db()
+        self.assertEqual(post.comments_count, 0)
+        self.assertEqual(
+            self.get_stats(CountersTests.author).followers_count, 0)
+        self.assertEqual(
+            self.get_stats(CountersTests.user).following_count, 0)
+
+        post.delete()
+        self.assertEqual(self.get_stats(CountersTests.author).posts_count, 0)
+
+    def test_reconcile_counters_fixes_drift(self):
+        """Команда reconcile_counters исправляет расхождения."""
+        Post.objects.bulk_create([
+            Post(text='Без сигналов', author=CountersTests.author),
+            Post(text='Без сигналов', author=CountersTests.author),
+        ])
+        self.assertEqual(self.get_stats(CountersTests.author).posts_count, 0)
+
+        call_command('reconcile_counters', stdout=StringIO())
+        self.assertEqual(self.get_stats(CountersTests.author).posts_count, 2)
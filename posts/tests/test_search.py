@@ -0,0 +1,92 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db.backends.utils import CursorWrapper
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core.testing import on_commit_callbacks
+from ..models import Post, User
+from ..search import search_post_ids
+from .. import constants, search
+from ..stemming import stem
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        with on_commit_callbacks():
+            cls.post = Post.objects.create(
+                author=SearchTests.user,
+                text='Интересные книги о программировании',
+            )
+            cls.other_post = Post.objects.create(
+                author=SearchTests.user,
+                text='Прогулка по весеннему лесу',
+            )
+
+    def setUp(self):
+        cache.clear()
+
+    def test_stemmer(self):
+        """Стеммер приводит словоформы к общей основе"""
+        self.assertEqual(stem('книги'), stem('книгами'))
+        self.assertEqual(stem('программированию'), 'программирован')
+
+    def test_search_finds_word_forms(self):
+        """Поиск находит пост по другой форме слова"""
+        self.assertEqual(
+            search_post_ids('книгами программирования'),
+            [SearchTests.post.pk]
+        )
+        self.assertEqual(search_post_ids('лес'), [SearchTests.other_post.pk])
+        self.assertEqual(search_post_ids('рыбалка'), [])
+
+    def test_index_follows_edits_and_deletes(self):
+        """Индекс обновляется при правке и удалении поста"""
+        with on_commit_callbacks():
+            post = Post.objects.create(author=SearchTests.user, text='Котики')
+            post.text = 'Собаки'
+            post.save()
+        self.assertEqual(search_post_ids('котики'), [])
+        self.assertEqual(search_post_ids('собака'), [post.pk])
+
+        post.delete()
+        self.assertEqual(search_post_ids('собака'), [])
+
+    def test_index_new_without_executemany(self):
+        """Пакетная индексация не использует executemany"""
+        posts = [
+            Post.objects.create(author=SearchTests.user, text='Черновик')
+            for _ in range(3)
+        ]
+        backend = search.get_backend()
+        for post in posts:
+            backend.remove(post.pk)
+            post.text = 'Ромашки'
+        with mock.patch.object(constants, 'SEARCH_INSERT_ROWS', 2):
+            with mock.patch.object(
+                CursorWrapper, 'executemany', side_effect=TypeError
+            ):
+                backend.index_new(posts)
+        self.assertEqual(
+            sorted(search_post_ids('ромашка')), [post.pk for post in posts])
+
+    def test_search_page(self):
+        """Страница поиска выводит найденные посты"""
+        response = self.client.get(reverse('posts:search'), {'q': 'книга'})
+        self.assertEqual(list(response.context['page_obj']),
+                         [SearchTests.post])
+
+    def test_admin_uses_index(self):
+        """Поиск в админке использует полнотекстовый индекс"""
+        admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(
+            reverse('admin:posts_post_changelist'), {'q': 'книгами'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [SearchTests.post])
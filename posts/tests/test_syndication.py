@@ -0,0 +1,117 @@
+import json
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase
+from django.urls import reverse
+
+from core.testing import on_commit_callbacks
+from ..models import Follow, Group, Post, User
+from .. import constants
+from ..syndication import IndexFeed, follow_cache_tags, follow_feed_token
+
+
+class SyndicationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=SyndicationTests.author,
+            text='Пост в группе',
+            group=SyndicationTests.group,
+        )
+        cls.other_post = Post.objects.create(
+            author=SyndicationTests.reader,
+            text='Пост читателя',
+        )
+        Follow.objects.create(
+            user=SyndicationTests.reader, author=SyndicationTests.author
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.token = follow_feed_token(SyndicationTests.reader)
+
+    def test_feed_formats(self):
+        """Лента отдается в RSS, Atom и JSON Feed"""
+        content_types = {
+            'rss': 'application/rss+xml; charset=utf-8',
+            'atom': 'application/atom+xml; charset=utf-8',
+            'json': 'application/feed+json; charset=utf-8',
+        }
+        for feed_format, content_type in content_types.items():
+            with self.subTest(feed_format=feed_format):
+                response = self.client.get(
+                    reverse('posts:index_feed', args=(feed_format,))
+                )
+                self.assertEqual(response['Content-Type'], content_type)
+                self.assertContains(response, 'Пост в группе')
+                self.assertContains(response, 'Пост читателя')
+
+    def test_feeds_follow_page_querysets(self):
+        """Ленты группы, автора и подписок содержат посты своих страниц"""
+        urls = (
+            reverse('posts:group_feed', args=('test-slug', 'json')),
+            reverse('posts:profile_feed', args=('author', 'json')),
+            reverse('posts:follow_feed', args=(self.token, 'json')),
+        )
+        for url in urls:
+            with self.subTest(url=url):
+                items = json.loads(self.client.get(url).content)['items']
+                self.assertEqual(
+                    [item['content_text'] for item in items],
+                    ['Пост в группе']
+                )
+
+    def test_follow_feed_token(self):
+        """Личная лента недоступна по поддельной ссылке"""
+        response = self.client.get(
+            reverse('posts:follow_feed', args=(self.token + 'x', 'rss'))
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_rotated_follow_feed_token_is_revoked(self):
+        """После смены ссылки старая личная лента отдает 404"""
+        client = self.client
+        client.force_login(SyndicationTests.reader)
+        response = client.post(reverse('posts:follow_feed_rotate'))
+        self.assertRedirects(response, reverse('posts:follow_index'))
+        token = follow_feed_token(SyndicationTests.reader)
+        self.assertNotEqual(token, self.token)
+        old = client.get(
+            reverse('posts:follow_feed', args=(self.token, 'rss')))
+        new = client.get(reverse('posts:follow_feed', args=(token, 'rss')))
+        self.assertEqual(old.status_code, 404)
+        self.assertEqual(new.status_code, 200)
+
+    def test_follow_feed_depends_on_followed_authors(self):
+        """Кэш личной ленты сбрасывают только посты ее авторов"""
+        tags = follow_cache_tags(RequestFactory().get('/'), self.token)
+        self.assertEqual(tags, ['profile:reader', 'profile:author'])
+
+    def test_feed_items_are_bounded(self):
+        """Лента ограничена по числу постов и не загружает картинки"""
+        with mock.patch.object(constants, 'SYNDICATION_FEED_ITEMS', 1):
+            items = list(IndexFeed('rss').items(None))
+        self.assertEqual(len(items), 1)
+        self.assertIn('image', items[0].get_deferred_fields())
+
+    def test_conditional_get(self):
+        """Неизмененная лента отдается ответом 304"""
+        url = reverse('posts:profile_feed', args=('author', 'atom'))
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        with on_commit_callbacks():
+            Post.objects.create(author=SyndicationTests.author, text='Новый')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Новый')
@@ -0,0 +1,187 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Post, User
+from .. import constants, threads
+
+
+class CommentThreadsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            author=CommentThreadsTests.user,
+            text='Тестовый пост',
+        )
+        cls.root = Comment.objects.create(
+            post=CommentThreadsTests.post,
+            author=CommentThreadsTests.user,
+            text='Корень',
+        )
+        cls.reply = Comment.objects.create(
+            post=CommentThreadsTests.post,
+            author=CommentThreadsTests.user,
+            parent=CommentThreadsTests.root,
+            text='Ответ',
+        )
+        cls.later_root = Comment.objects.create(
+            post=CommentThreadsTests.post,
+            author=CommentThreadsTests.user,
+            text='Новый корень',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(CommentThreadsTests.user)
+
+    def test_path_contains_ancestors(self):
+        """Путь ответа начинается с пути родителя"""
+        root = CommentThreadsTests.root
+        reply = CommentThreadsTests.reply
+        self.assertEqual(len(root.path), constants.COMMENT_PATH_STEP)
+        self.assertTrue(reply.path.startswith(root.path))
+        self.assertEqual((root.depth, reply.depth), (0, 1))
+        self.assertEqual(list(root.subtree()), [root, reply])
+
+    def test_page_keeps_replies_under_root(self):
+        """Страница веток выводит ответы сразу под корнем за два запроса"""
+        with CaptureQueriesContext(connection) as queries:
+            page = threads.get_thread_page(CommentThreadsTests.post.pk)
+            comments = list(page)
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(comments, [
+            CommentThreadsTests.later_root,
+            CommentThreadsTests.root,
+            CommentThreadsTests.reply,
+        ])
+
+    def test_load_more_continues_from_cursor(self):
+        """Следующая пачка веток продолжается с курсора"""
+        url = reverse(
+            'posts:comment_list', args=(CommentThreadsTests.post.pk,)
+        )
+        with mock.patch.object(constants, 'COMMENTS_PER_PAGE', 1):
+            first = self.client.get(url, {'format': 'json'}).json()
+            second = self.client.get(url, {
+                'format': 'json', 'cursor': first['next_cursor'],
+            }).json()
+        self.assertEqual(
+            [item['id'] for item in first['comments']],
+            [CommentThreadsTests.later_root.pk],
+        )
+        self.assertEqual(
+            [item['id'] for item in second['comments']],
+            [CommentThreadsTests.root.pk, CommentThreadsTests.reply.pk],
+        )
+        self.assertIsNone(second['next_cursor'])
+
+    def test_replies_are_capped_per_root(self):
+        """Под корнем выводится не больше предела ответов и курсор ветки"""
+        extra = Comment.objects.create(
+            post=CommentThreadsTests.post,
+            author=CommentThreadsTests.user,
+            parent=CommentThreadsTests.root,
+            text='Второй ответ',
+        )
+        with mock.patch.object(constants, 'COMMENT_REPLIES_PER_ROOT', 1):
+            with CaptureQueriesContext(connection) as queries:
+                comments = list(threads.get_thread_page(
+                    CommentThreadsTests.post.pk
+                ))
+            self.assertEqual(len(queries), 2)
+            self.assertEqual(comments, [
+                CommentThreadsTests.later_root,
+                CommentThreadsTests.root,
+                CommentThreadsTests.reply,
+            ])
+            cursor = comments[-1].more_replies
+            self.assertEqual(cursor, CommentThreadsTests.reply.path)
+            more = self.client.get(reverse(
+                'posts:comment_list', args=(CommentThreadsTests.post.pk,)
+            ), {'format': 'json', 'replies': cursor}).json()
+        self.assertEqual(
+            [item['id'] for item in more['comments']], [extra.pk]
+        )
+        self.assertIsNone(more['comments'][0]['more_replies'])
+        self.assertIsNone(more['next_cursor'])
+
+    def test_broken_replies_cursor_returns_404(self):
+        """Битый курсор ответов отдает 404"""
+        response = self.client.get(reverse(
+            'posts:comment_list', args=(CommentThreadsTests.post.pk,)
+        ), {'replies': 'abc'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_partial_renders_comments(self):
+        """Частичный шаблон веток отдается без обертки страницы"""
+        response = self.client.get(reverse(
+            'posts:comment_list', args=(CommentThreadsTests.post.pk,)
+        ))
+        self.assertTemplateUsed(response, 'posts/includes/comments.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertContains(response, 'Ответ')
+
+    def test_unknown_post_returns_404(self):
+        """Ветки несуществующего поста отдают 404"""
+        response = self.client.get(
+            reverse('posts:comment_list', args=(0,)), {'format': 'json'}
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_reply_is_attached_to_parent(self):
+        """Ответ из формы сохраняется в ветке родителя"""
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=(CommentThreadsTests.post.pk,)),
+            {'text': 'Еще ответ', 'parent': CommentThreadsTests.reply.pk},
+        )
+        comment = Comment.objects.get(text='Еще ответ')
+        self.assertEqual(comment.parent, CommentThreadsTests.reply)
+        self.assertEqual(comment.depth, 2)
+
+    def test_deep_reply_stays_within_max_depth(self):
+        """Ответ глубже предела встает рядом с родителем"""
+        parent = CommentThreadsTests.root
+        for level in range(1, constants.COMMENT_MAX_DEPTH):
+            parent = Comment.objects.create(
+                post=CommentThreadsTests.post,
+                author=CommentThreadsTests.user,
+                parent=parent,
+                text=f'Уровень {level}',
+            )
+        self.authorized_client.post(
+            reverse('posts:add_comment', args=(CommentThreadsTests.post.pk,)),
+            {'text': 'Слишком глубоко', 'parent': parent.pk},
+        )
+        comment = Comment.objects.get(text='Слишком глубоко')
+        self.assertEqual(comment.parent_id, parent.parent_id)
+        self.assertEqual(comment.depth, constants.COMMENT_MAX_DEPTH - 1)
+
+    def test_bulk_created_roots_get_paths(self):
+        """fill_paths проставляет путь корням из bulk_create"""
+        Comment.objects.bulk_create([Comment(
+            post=CommentThreadsTests.post,
+            author=CommentThreadsTests.user,
+            text='Импорт',
+        )])
+        threads.fill_paths()
+        comment = Comment.objects.get(text='Импорт')
+        self.assertEqual(comment.path, str(comment.pk).zfill(
+            constants.COMMENT_PATH_STEP))
+
+    def test_reply_link_prefills_parent(self):
+        """Ссылка «Ответить» подставляет родителя в форму"""
+        response = self.authorized_client.get(
+            reverse('posts:post_detail', args=(CommentThreadsTests.post.pk,)),
+            {'reply_to': CommentThreadsTests.root.pk},
+        )
+        self.assertEqual(
+            response.context['form']['parent'].value(),
+            str(CommentThreadsTests.root.pk),
+        )
@@ -0,0 +1,77 @@
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.testing import on_commit_callbacks
+from ..models import Post, User
+from .. import constants, thumbnails
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+@override_settings(
+    MEDIA_ROOT=TEMP_MEDIA_ROOT,
+    THUMBNAIL_PREGENERATE_ASYNC=False,
+)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=ThumbnailTests.user,
+            image=SimpleUploadedFile(
+                name='small.gif',
+                content=constants.BYTE_IMAGE,
+                content_type='image/gif'
+            ),
+        )
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def get_profile(self):
+        return self.client.get(
+            reverse('posts:profile', args=('auth',))).content.decode()
+
+    def test_placeholder_until_thumbnails_are_ready(self):
+        """Пока миниатюры не готовы, выводится заглушка"""
+        content = self.get_profile()
+        self.assertIn('img/placeholder.svg', content)
+        self.assertIsNone(thumbnails.get_variants(ThumbnailTests.post))
+
+    def test_generated_thumbnails_replace_placeholder(self):
+        """После генерации страница ссылается на готовые миниатюры"""
+        self.get_profile()
+        post = ThumbnailTests.post
+        urls = thumbnails.generate(post.pk, post.image.name)
+
+        self.assertIn('card', urls)
+        self.assertIn('small', urls)
+        content = self.get_profile()
+        self.assertNotIn('img/placeholder.svg', content)
+        self.assertIn(urls['card'], content)
+
+    def test_failed_generation_is_not_retried_on_every_render(self):
+        """Упавшая генерация не повторяется при каждом показе страницы"""
+        post = ThumbnailTests.post
+        with mock.patch.object(
+            thumbnails, 'get_thumbnail', side_effect=OSError
+        ) as get_thumbnail:
+            self.assertIsNone(thumbnails.generate(post.pk, post.image.name))
+            calls = get_thumbnail.call_count
+            with on_commit_callbacks():
+                thumbnails.get_variants(post)
+            self.assertEqual(get_thumbnail.call_count, calls)
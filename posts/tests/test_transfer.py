@@ -0,0 +1,171 @@
+import gzip
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import (
+    Comment, Follow, Group, Post, TimelineEntry, User, UserStats
+)
+from ..search import search_post_ids
+from ..transfer import CHECKPOINT_NAME
+
+
+class TransferCommandsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.created = timezone.now() - timedelta(days=30)
+        self.post = Post.objects.create(
+            author=self.author, group=self.group,
+            text='Текст, с "кавычками"\nи переносом',
+        )
+        Post.objects.filter(pk=self.post.pk).update(created=self.created)
+        self.other_post = Post.objects.create(
+            author=self.author, text='Прогулка по лесу',
+        )
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий',
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def export_and_clear(self, directory, data_format):
+        call_command(
+            'export_data', directory, data_format=data_format,
+            stdout=StringIO(),
+        )
+        Group.objects.all().delete()
+        Post.objects.all().delete()
+        Follow.objects.all().delete()
+
+    def test_round_trip(self):
+        """Импорт восстанавливает выгрузку и пересчитывает зависимые данные"""
+        for data_format in ('ndjson', 'csv'):
+            with self.subTest(data_format=data_format):
+                with tempfile.TemporaryDirectory() as directory:
+                    self.export_and_clear(directory, data_format)
+                    stdout = StringIO()
+                    call_command(
+                        'import_data', directory, data_format=data_format,
+                        stdout=stdout,
+                    )
+                    self.assertIn('строк/с', stdout.getvalue())
+                    self.assertFalse(os.path.exists(
+                        os.path.join(directory, CHECKPOINT_NAME)
+                    ))
+                post = Post.objects.get(pk=self.post.pk)
+                self.assertEqual(post.text, self.post.text)
+                self.assertEqual(post.group, self.group)
+                self.assertEqual(post.created, self.created)
+                self.assertEqual(post.comments_count, 1)
+                self.assertEqual(
+                    UserStats.objects.get(user=self.author).followers_count, 1
+                )
+                self.assertEqual(
+                    TimelineEntry.objects.filter(user=self.reader).count(), 2
+                )
+                self.assertEqual(
+                    search_post_ids('лес'), [self.other_post.pk]
+                )
+
+    def test_resume_skips_loaded_rows(self):
+        """С --resume уже загруженные строки файла пропускаются"""
+        with tempfile.TemporaryDirectory() as directory:
+            self.export_and_clear(directory, 'ndjson')
+            with open(os.path.join(directory, CHECKPOINT_NAME), 'w') as file:
+                json.dump({'posts': 1}, file)
+            call_command(
+                'import_data', directory, resume=True,
+                names=['groups', 'posts'], stdout=StringIO(),
+            )
+        self.assertFalse(Post.objects.filter(pk=self.post.pk).exists())
+        self.assertTrue(Post.objects.filter(pk=self.other_post.pk).exists())
+        new_post = Post.objects.create(author=self.author, text='Новый')
+        self.assertGreater(new_post.pk, self.other_post.pk)
+
+
+class AuthorExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.posts = [
+            Post.objects.create(author=cls.author, text=f'Пост {index}')
+            for index in range(3)
+        ]
+        Post.objects.create(author=cls.reader, text='Чужой пост')
+        Comment.objects.create(
+            post=cls.posts[0], author=cls.author, text='Комментарий',
+        )
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(AuthorExportTests.author)
+        self.url = reverse('posts:author_export', args=('author',))
+
+    def read_ndjson(self, response):
+        content = b''.join(response.streaming_content).decode()
+        return [json.loads(line) for line in content.splitlines()]
+
+    def test_export_streams_author_posts(self):
+        """Выгрузка отдает только посты автора и продолжается с курсора"""
+        response = self.author_client.get(self.url)
+        self.assertTrue(response.streaming)
+        rows = self.read_ndjson(response)
+        self.assertEqual(
+            [row['id'] for row in rows],
+            [post.pk for post in AuthorExportTests.posts]
+        )
+        response = self.author_client.get(self.url, {'after': rows[0]['id']})
+        self.assertEqual(len(self.read_ndjson(response)), 2)
+
+        response = self.author_client.get(
+            self.url, {'records': 'comments', 'format': 'csv'}
+        )
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(
+            lines[0], 'id,post_id,author_id,parent_id,path,text,created'
+        )
+        self.assertEqual(len(lines), 2)
+
+    def test_export_gzip(self):
+        """Выгрузка сжимается gzip на лету"""
+        response = self.author_client.get(self.url, {'gzip': '1'})
+        self.assertEqual(response['Content-Type'],
+                         'application/gzip; charset=utf-8')
+        content = gzip.decompress(b''.join(response.streaming_content))
+        self.assertEqual(len(content.decode().splitlines()), 3)
+
+    def test_export_is_private(self):
+        """Чужую выгрузку получить нельзя"""
+        client = Client()
+        client.force_login(AuthorExportTests.reader)
+        response = client.get(self.url)
+        self.assertRedirects(
+            response, reverse('posts:profile', args=('author',))
+        )
+
+    def test_export_author_command(self):
+        """Команда export_author пишет выгрузку в файл"""
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'posts.ndjson.gz')
+            call_command('export_author', 'author', gzip=True, output=output)
+            with gzip.open(output, 'rt', encoding='utf-8') as file:
+                rows = [json.loads(line) for line in file]
+        self.assertEqual(len(rows), 3)
@@ -1,15 +1,27 @@
 import shutil
 import tempfile
-
-from django.test import Client, TestCase, override_settings
-from django.urls import reverse
+import time
+from unittest import mock
+
+from django.db import connection
+from django.test import (
+    Client, RequestFactory, TestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.core.cache import cache
-
-from ..models import Post, Group, User, Follow
-from .. import constants
+from django.http import StreamingHttpResponse
+
+from core.testing import on_commit_callbacks
+from ..models import Comment, Post, Group, User, Follow, TimelineEntry
+from .. import cache as view_cache
+from .. import constants, feed, tasks, utils
+from .. import urls as posts_urls
+from ..syndication import follow_feed_token
+from ..utils import QueryBudgetExceeded, query_budget
 from . import helpers
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -161,11 +173,12 @@ class PostPagesTests(TestCase):
         )
 
         response = self.client.get(reverse('posts:index'))
-        Post.objects.get(id=new_post.id).delete()
-        response_after_delete_post = self.client.get(reverse('posts:index'))
+        Post.objects.filter(id=new_post.id).update(text='Без сигналов')
+        response_after_silent_update = self.client.get(
+            reverse('posts:index'))
         self.assertEqual(
             response.content,
-            response_after_delete_post.content
+            response_after_silent_update.content
         )
 
         cache.clear()
@@ -175,6 +188,45 @@ class PostPagesTests(TestCase):
             response_after_clear_cache.content
         )
 
+    def test_cache_is_invalidated_by_changes(self):
+        """Изменения данных сразу сбрасывают кеш страниц"""
+        pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=(PostPagesTests.group.slug,)),
+            reverse('posts:profile', args=(PostPagesTests.user.username,)),
+        )
+        responses = {page: self.client.get(page) for page in pages}
+        with on_commit_callbacks():
+            new_post = Post.objects.create(
+                text='Свежий пост',
+                author=PostPagesTests.user,
+                group=PostPagesTests.group,
+            )
+        for page, response in responses.items():
+            with self.subTest(page=page):
+                self.assertNotEqual(
+                    response.content, self.client.get(page).content)
+
+        detail = reverse('posts:post_detail', args=(new_post.id,))
+        response = self.authorized_client.get(detail)
+        with on_commit_callbacks():
+            self.authorized_client.post(
+                reverse('posts:add_comment', args=(new_post.id,)),
+                {'text': 'Новый комментарий'}
+            )
+        self.assertNotEqual(
+            response.content, self.authorized_client.get(detail).content)
+
+    def test_cache_is_invalidated_after_commit(self):
+        """Кеш сбрасывается после коммита, а не внутри транзакции записи"""
+        page = reverse('posts:index')
+        response = self.client.get(page)
+        with on_commit_callbacks():
+            Post.objects.create(text='Еще не закоммичен',
+                                author=PostPagesTests.user)
+            self.assertEqual(response.content, self.client.get(page).content)
+        self.assertNotEqual(response.content, self.client.get(page).content)
+
     def test_page_404_use_custom_templage(self):
         """Страница 404 выдает кастомный шаблон"""
         response = self.client.get('/unexisting_page/')
@@ -260,6 +312,42 @@ class PaginatorViewsTests(TestCase):
             constants.NUMBER_OF_SECOND_PAGE_RECORDS
         )
 
+    def test_cursor_pages_follow_each_other(self):
+        """Курсор ведет на следующую страницу и обратно"""
+        first_page = self.client.get(
+            reverse('posts:index')).context['page_obj']
+        self.assertFalse(first_page.has_previous())
+
+        second_page = self.client.get(
+            reverse('posts:index'),
+            {'cursor': first_page.next_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            len(second_page),
+            constants.NUMBER_OF_SECOND_PAGE_RECORDS
+        )
+        self.assertFalse(second_page.has_next())
+        self.assertFalse(
+            set(p.pk for p in first_page) & set(p.pk for p in second_page))
+
+        previous_page = self.client.get(
+            reverse('posts:index'),
+            {'cursor': second_page.previous_cursor}
+        ).context['page_obj']
+        self.assertEqual(
+            [p.pk for p in previous_page],
+            [p.pk for p in first_page]
+        )
+
+    def test_invalid_cursor_returns_first_page(self):
+        """Битый курсор отдает первую страницу"""
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'broken'})
+        self.assertEqual(
+            len(response.context['page_obj']),
+            constants.NUMBER_OF_FIRST_PAGE_RECORS
+        )
+
 
 class OnCreatePostTests(TestCase):
     @classmethod
@@ -350,3 +438,353 @@ class OnCreatePostTests(TestCase):
         response = self.authorized_not_follower_client.get(
             reverse('posts:follow_index'))
         self.assertEqual(len(response.context.get('page_obj')), 0)
+
+
+class FollowFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='follower')
+        cls.author = User.objects.create_user(username='author')
+        cls.old_post = Post.objects.create(
+            author=FollowFeedTests.author,
+            text='Пост до подписки',
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FollowFeedTests.user)
+
+    def get_feed(self):
+        response = self.authorized_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_prunes_timeline(self):
+        """Подписка переносит старые посты в ленту, отписка убирает их"""
+        self.authorized_client.get(
+            reverse('posts:profile_follow', args=('author',)))
+        self.assertEqual(self.get_feed(), [FollowFeedTests.old_post])
+
+        self.authorized_client.get(
+            reverse('posts:profile_unfollow', args=('author',)))
+        self.assertEqual(self.get_feed(), [])
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=FollowFeedTests.user).exists())
+
+    def test_new_post_is_pushed_to_followers(self):
+        """Новый пост автора попадает в ленты подписчиков при записи"""
+        Follow.objects.create(
+            user=FollowFeedTests.user, author=FollowFeedTests.author)
+        with on_commit_callbacks():
+            new_post = Post.objects.create(
+                author=FollowFeedTests.author,
+                text='Пост после подписки',
+            )
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=FollowFeedTests.user, post=new_post).exists())
+        self.assertEqual(self.get_feed()[0], new_post)
+
+    def test_popular_author_posts_are_read_on_demand(self):
+        """Посты авторов с огромной аудиторией читаются без fan-out"""
+        with mock.patch.object(constants, 'FEED_FANOUT_FOLLOWERS_LIMIT', 0):
+            Follow.objects.create(
+                user=FollowFeedTests.user, author=FollowFeedTests.author)
+            new_post = Post.objects.create(
+                author=FollowFeedTests.author,
+                text='Пост популярного автора',
+            )
+            self.assertFalse(TimelineEntry.objects.exists())
+            self.assertEqual(
+                self.get_feed(), [new_post, FollowFeedTests.old_post])
+
+    @mock.patch.object(constants, 'FEED_FANOUT_RESUME_LIMIT', 1)
+    @mock.patch.object(constants, 'FEED_FANOUT_FOLLOWERS_LIMIT', 2)
+    def test_fanout_resumes_below_lower_limit_in_task(self):
+        """Fan-out возвращается ниже нижнего порога фоновой задачей"""
+        author = FollowFeedTests.author
+        others = [
+            User.objects.create_user(username=f'other{number}')
+            for number in range(2)
+        ]
+        for user in (*others, FollowFeedTests.user):
+            Follow.objects.create(user=user, author=author)
+        self.assertFalse(feed.is_fanout_author(author.pk))
+
+        with mock.patch.object(tasks.resume_fanout, 'delay') as delay:
+            Follow.objects.get(user=others[0], author=author).delete()
+            delay.assert_not_called()
+            self.assertFalse(feed.is_fanout_author(author.pk))
+
+            Follow.objects.get(user=others[1], author=author).delete()
+            delay.assert_called_once_with(author.pk)
+        self.assertFalse(TimelineEntry.objects.filter(
+            user=FollowFeedTests.user).exists())
+
+        tasks.resume_fanout(author.pk)
+        self.assertTrue(feed.is_fanout_author(author.pk))
+        self.assertTrue(TimelineEntry.objects.filter(
+            user=FollowFeedTests.user, post=FollowFeedTests.old_post
+        ).exists())
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=PostCardCacheTests.user,
+            text='Исходный текст',
+            group=PostCardCacheTests.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_profile(self):
+        return self.client.get(
+            reverse('posts:profile', args=('auth',))).content.decode()
+
+    def test_card_is_served_from_cache(self):
+        """Карточка поста берется из кеша, пока версия не изменилась"""
+        self.get_profile()
+        Post.objects.filter(pk=PostCardCacheTests.post.pk).update(
+            text='Текст в обход версии')
+        self.assertIn('Исходный текст', self.get_profile())
+
+    def test_card_is_rerendered_after_post_or_group_change(self):
+        """Правка поста или группы инвалидирует карточку"""
+        self.get_profile()
+        post = Post.objects.get(pk=PostCardCacheTests.post.pk)
+        post.text = 'Новый текст'
+        with on_commit_callbacks():
+            post.save()
+        self.assertIn('Новый текст', self.get_profile())
+
+        group = PostCardCacheTests.group
+        group.title = 'Переименованная группа'
+        with on_commit_callbacks():
+            group.save()
+        self.assertIn('Переименованная группа', self.get_profile())
+
+
+@override_settings(QUERY_BUDGET_STRICT=True)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        for _ in range(constants.NUMBER_OF_RECORS):
+            cls.post = Post.objects.create(
+                author=QueryBudgetTests.author,
+                text='Тестовый пост',
+                group=QueryBudgetTests.group,
+            )
+        cls.own_post = Post.objects.create(
+            author=QueryBudgetTests.user,
+            text='Свой пост',
+        )
+        commenters = [
+            User.objects.create_user(username=f'commenter-{i}')
+            for i in range(5)
+        ]
+        for commenter in commenters:
+            Comment.objects.create(
+                post=QueryBudgetTests.post,
+                author=commenter,
+                text='Комментарий',
+            )
+        Follow.objects.create(
+            user=QueryBudgetTests.user, author=QueryBudgetTests.author)
+
+    def setUp(self):
+        cache.clear()
+        self.authorized_client = Client()
+        self.authorized_client.force_login(QueryBudgetTests.user)
+
+    def test_every_view_declares_budget(self):
+        """У каждой view приложения posts объявлен бюджет запросов"""
+        for pattern in posts_urls.urlpatterns:
+            with self.subTest(view=pattern.name):
+                self.assertTrue(hasattr(pattern.callback, 'query_budget'))
+
+    def test_budget_counts_every_connection(self):
+        """Бюджет суммирует запросы всех соединений, а не только default"""
+        @query_budget(1)
+        def view(request):
+            return list(Group.objects.all())
+
+        request = RequestFactory().get('/')
+        view(request)
+        with mock.patch.object(
+            utils.connections, 'all', return_value=[connection, connection]
+        ):
+            with self.assertRaises(QueryBudgetExceeded):
+                view(request)
+
+    def test_budget_covers_streaming_content(self):
+        """Запросы потокового ответа входят в бюджет при его отдаче"""
+        @query_budget(0)
+        def view(request):
+            return StreamingHttpResponse(
+                group.title for group in Group.objects.all())
+
+        response = view(RequestFactory().get('/'))
+        with self.assertRaises(QueryBudgetExceeded):
+            b''.join(response.streaming_content)
+
+    def test_views_fit_budget(self):
+        """Views укладываются в объявленный бюджет запросов"""
+        post_id = QueryBudgetTests.post.id
+        own_post_id = QueryBudgetTests.own_post.id
+        requests = (
+            ('get', reverse('posts:index'), {}, 200),
+            ('get', reverse('posts:group_list', args=('test-slug',)), {},
+             200),
+            ('get', reverse('posts:profile', args=('author',)), {}, 200),
+            ('get', reverse('posts:post_detail', args=(post_id,)), {}, 200),
+            ('get', reverse('posts:comment_list', args=(post_id,)), {}, 200),
+            ('get', reverse('posts:comment_list', args=(post_id,)),
+             {'format': 'json'}, 200),
+            ('get', reverse('posts:follow_index'), {}, 200),
+            ('get', reverse('posts:search'), {'q': 'Тестовый пост'}, 200),
+            ('get', reverse('posts:post_create'), {}, 200),
+            ('post', reverse('posts:post_create'), {'text': 'Новый'}, 302),
+            ('get', reverse('posts:post_edit', args=(own_post_id,)), {},
+             200),
+            ('post', reverse('posts:post_edit', args=(own_post_id,)),
+             {'text': 'Правка'}, 302),
+            ('post', reverse('posts:add_comment', args=(post_id,)),
+             {'text': 'Комментарий'}, 302),
+            ('get', reverse('posts:profile_unfollow', args=('author',)), {},
+             302),
+            ('get', reverse('posts:profile_follow', args=('author',)), {},
+             302),
+            ('get', reverse('posts:author_export', args=('auth',)), {}, 200),
+            ('get', reverse('posts:index_feed', args=('rss',)), {}, 200),
+            ('get', reverse('posts:group_feed', args=('test-slug', 'rss')),
+             {}, 200),
+            ('get', reverse('posts:profile_feed', args=('author', 'rss')),
+             {}, 200),
+            ('get', reverse('posts:follow_feed', args=(
+                follow_feed_token(QueryBudgetTests.user), 'rss')), {}, 200),
+            ('get', reverse('posts:api_index'), {}, 200),
+            ('get', reverse('posts:api_group', args=('test-slug',)), {},
+             200),
+            ('get', reverse('posts:api_profile', args=('author',)), {}, 200),
+            ('get', reverse('posts:api_post', args=(post_id,)), {}, 200),
+            ('get', reverse('posts:api_follow'), {}, 200),
+            ('post', reverse('posts:follow_feed_rotate'), {}, 302),
+        )
+        for method, url, data, status in requests:
+            with self.subTest(method=method, url=url):
+                cache.clear()
+                budget = resolve(url).func.query_budget
+                with CaptureQueriesContext(connection) as queries:
+                    response = getattr(self.authorized_client, method)(
+                        url, data)
+                    if response.streaming:
+                        b''.join(response.streaming_content)
+                self.assertEqual(response.status_code, status)
+                self.assertLessEqual(len(queries), budget)
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Тестовая группа',
+            slug='test-slug',
+            description='Тестовое описание',
+        )
+        cls.post = Post.objects.create(
+            author=ConditionalGetTests.author,
+            text='Тестовый пост',
+            group=ConditionalGetTests.group,
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(ConditionalGetTests.reader)
+        self.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', args=('test-slug',)),
+            reverse('posts:profile', args=('author',)),
+            reverse('posts:post_detail', args=(ConditionalGetTests.post.pk,)),
+        )
+
+    def assertNotModified(self, url, etag, modified=False):
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200 if modified else 304)
+        return response
+
+    def test_unchanged_pages_answer_304(self):
+        """Неизмененная страница отдается ответом 304 без тела"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertIn('ETag', response)
+                self.assertIn('Last-Modified', response)
+                response = self.assertNotModified(url, response['ETag'])
+                self.assertEqual(response.content, b'')
+
+    def test_changes_update_validators(self):
+        """Изменения данных страницы меняют ее ETag"""
+        etags = {url: self.reader_client.get(url)['ETag'] for url in self.urls}
+        Comment.objects.create(
+            post=ConditionalGetTests.post,
+            author=ConditionalGetTests.reader,
+            text='Комментарий',
+        )
+        self.assertNotModified(self.urls[0], etags[self.urls[0]])
+        self.assertNotModified(self.urls[3], etags[self.urls[3]], True)
+
+        Follow.objects.create(
+            user=ConditionalGetTests.reader, author=ConditionalGetTests.author
+        )
+        self.assertNotModified(self.urls[2], etags[self.urls[2]], True)
+
+        author = ConditionalGetTests.author
+        author.first_name = 'Лев'
+        author.save()
+        for url in self.urls[:2]:
+            with self.subTest(url=url):
+                self.assertNotModified(url, etags[url], True)
+
+    def test_deletion_moves_last_modified(self):
+        """Удаление поста сдвигает Last-Modified: нет ложного 304"""
+        post = Post.objects.create(
+            author=ConditionalGetTests.author, text='Удаляемый пост')
+        url = self.urls[0]
+        modified = self.reader_client.get(url)['Last-Modified']
+        self.assertEqual(self.reader_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=modified).status_code, 304)
+
+        with mock.patch.object(view_cache, 'time', wraps=time) as clock:
+            clock.time.return_value = time.time() + 60
+            with on_commit_callbacks():
+                post.delete()
+        self.assertEqual(self.reader_client.get(
+            url, HTTP_IF_MODIFIED_SINCE=modified).status_code, 200)
+
+    def test_validators_depend_on_visitor(self):
+        """ETag страницы различается для разных посетителей"""
+        url = self.urls[0]
+        etag = self.client.get(url)['ETag']
+        self.assertNotEqual(self.reader_client.get(url)['ETag'], etag)
@@ -0,0 +1,131 @@
+"""Ветки комментариев.
+
+Корневые комментарии поста листаются keyset-курсором, а ответы
+хранятся материализованным путем: path — id всех предков и самого
+комментария, дополненные нулями до COMMENT_PATH_STEP знаков. Поэтому
+ветка целиком выбирается одним запросом по префиксу пути, а сортировка
+по path сразу дает порядок обхода.
+
+Под каждым корнем выводится не больше COMMENT_REPLIES_PER_ROOT ответов.
+Если ответов больше, у последнего выведенного проставлен more_replies —
+курсор следующей пачки ответов этой ветки (get_reply_page).
+"""
+import operator
+import re
+from functools import reduce
+
+from django.db.models import CharField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Concat, LPad
+
+from . import constants
+from .models import Comment
+from .utils import CursorPage, CursorPaginator, InvalidCursor
+
+REPLY_CURSOR = re.compile(r'\d+')
+# Пути состоят из цифр, поэтому path + ':' больше путей всех потомков.
+BRANCH_END = ':'
+
+
+def fill_paths():
+    """Проставляет путь корням, созданным в обход save() (bulk_create)."""
+    return Comment.objects.filter(path='', parent=None).update(
+        path=LPad(
+            Cast('pk', CharField()),
+            constants.COMMENT_PATH_STEP,
+            Value('0'),
+        )
+    )
+
+
+def _replies_end(limit):
+    """Путь ответа, следующего за первыми limit ответами ветки корня.
+
+    Подзапрос идет по индексу (post, path) и читает не больше limit + 1
+    строк; None — в ветке не больше limit ответов.
+    """
+    return Subquery(
+        Comment.objects.filter(
+            post_id=OuterRef('post_id'),
+            path__gt=OuterRef('path'),
+            path__lt=Concat(OuterRef('path'), Value(BRANCH_END)),
+        ).order_by('path').values('path')[limit:limit + 1]
+    )
+
+
+def get_thread_page(post_id, cursor=None, per_page=None):
+    """Страница веток: корни по курсору и первые ответы каждого.
+
+    Два запроса независимо от размера веток. object_list страницы —
+    плоский список в порядке вывода, отступ задает comment.depth.
+    """
+    paginator = CursorPaginator(
+        Comment.objects.filter(
+            post_id=post_id, parent=None
+        ).select_related('author').annotate(
+            replies_end=_replies_end(constants.COMMENT_REPLIES_PER_ROOT)
+        ),
+        per_page or constants.COMMENTS_PER_PAGE,
+    )
+    page = paginator.get_page(cursor)
+    roots = [root for root in page.object_list if root.path]
+
+    replies = {}
+    if roots:
+        branches = reduce(operator.or_, (
+            Q(
+                path__gt=root.path,
+                path__lt=root.replies_end or root.path + BRANCH_END,
+            )
+            for root in roots
+        ))
+        queryset = Comment.objects.filter(
+            branches, post_id=post_id
+        ).select_related('author').order_by('path')
+        for reply in queryset:
+            root_path = reply.path[:constants.COMMENT_PATH_STEP]
+            replies.setdefault(root_path, []).append(reply)
+    for root in roots:
+        if root.replies_end and replies.get(root.path):
+            last = replies[root.path][-1]
+            last.more_replies = last.path
+
+    page.object_list = [
+        comment
+        for root in page.object_list
+        for comment in (root, *replies.get(root.path, ()))
+    ]
+    return page
+
+
+def get_reply_page(post_id, cursor, per_page=None):
+    """Следующая пачка ответов ветки после курсора more_replies.
+
+    Курсор — путь последнего выведенного ответа: ответы идут в порядке
+    path, поэтому продолжение — ответы той же ветки с большим путем.
+    """
+    step = constants.COMMENT_PATH_STEP
+    if (not cursor or not REPLY_CURSOR.fullmatch(cursor)
+            or len(cursor) % step or len(cursor) < 2 * step):
+        raise InvalidCursor(cursor)
+    limit = per_page or constants.COMMENT_REPLIES_PER_ROOT
+    replies = list(Comment.objects.filter(
+        post_id=post_id,
+        path__gt=cursor,
+        path__lt=cursor[:step] + BRANCH_END,
+    ).select_related('author').order_by('path')[:limit + 1])
+    if len(replies) > limit:
+        replies = replies[:limit]
+        replies[-1].more_replies = replies[-1].path
+    return CursorPage(replies, None)
+
+
+def serialize(comment):
+    return {
+        'id': comment.pk,
+        'parent': comment.parent_id,
+        'depth': comment.depth,
+        'author': comment.author.username,
+        'text': comment.text,
+        'created': comment.created.isoformat(),
+        'more_replies': getattr(comment, 'more_replies', None),
+    }
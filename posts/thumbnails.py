@@ -0,0 +1,115 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections, transaction
+from PIL import features
+from sorl.thumbnail import get_thumbnail
+
+from . import constants
+
+logger = logging.getLogger(__name__)
+
+# Имя варианта: (геометрия, опции sorl)
+VARIANTS = {
+    'card': ('960x339', {'crop': 'center', 'upscale': True}),
+    'small': ('480x170', {'crop': 'center', 'upscale': True}),
+    'card_webp': (
+        '960x339', {'crop': 'center', 'upscale': True, 'format': 'WEBP'}),
+    'small_webp': (
+        '480x170', {'crop': 'center', 'upscale': True, 'format': 'WEBP'}),
+}
+if not features.check('webp'):
+    VARIANTS = {
+        name: variant for name, variant in VARIANTS.items()
+        if variant[1].get('format') != 'WEBP'
+    }
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def _variants_key(image_name):
+    return f'post_thumbnails:{image_name}'
+
+
+def generate(post_id, image_name):
+    """Строит все варианты картинки и публикует их адреса в кеше."""
+    urls = {}
+    for name, (geometry, options) in VARIANTS.items():
+        try:
+            urls[name] = get_thumbnail(image_name, geometry, **options).url
+        except Exception:
+            logger.exception(
+                'Не удалось построить миниатюру %s для %s', name, image_name)
+    if 'card' not in urls:
+        # Отметка остается еще на THUMBNAIL_PENDING_TIMEOUT: битая
+        # картинка не должна запускать Pillow при каждом показе.
+        cache.set(
+            f'{_variants_key(image_name)}:pending',
+            1,
+            constants.THUMBNAIL_PENDING_TIMEOUT,
+        )
+        return None
+
+    cache.set(_variants_key(image_name), urls, None)
+    _refresh_pages(post_id)
+    return urls
+
+
+def _refresh_pages(post_id):
+    from .cache import invalidate
+    from .models import Post
+    from .signals import bump_post_versions, post_cache_tags
+
+    bump_post_versions(pk=post_id)
+    post = Post.objects.select_related('author', 'group').filter(
+        pk=post_id).first()
+    if post is not None:
+        invalidate(*post_cache_tags(post))
+
+
+def _run(post_id, image_name):
+    try:
+        generate(post_id, image_name)
+    finally:
+        connections.close_all()
+
+
+def schedule(post):
+    """Ставит генерацию миниатюр в фоновый пул после коммита."""
+    image_name = post.image.name
+    if not image_name or not cache.add(
+        f'{_variants_key(image_name)}:pending',
+        1,
+        constants.THUMBNAIL_PENDING_TIMEOUT,
+    ):
+        return
+
+    def submit():
+        if settings.THUMBNAIL_PREGENERATE_ASYNC:
+            _get_executor().submit(_run, post.pk, image_name)
+        else:
+            generate(post.pk, image_name)
+
+    transaction.on_commit(submit)
+
+
+def get_variants(post):
+    """Адреса готовых миниатюр или None, пока они генерируются."""
+    if not post.image:
+        return None
+    urls = cache.get(_variants_key(post.image.name))
+    if urls is None:
+        schedule(post)
+    return urls
@@ -0,0 +1,259 @@
+"""Потоковый импорт и экспорт групп, постов, комментариев и подписок."""
+import contextlib
+import csv
+import io
+import json
+import os
+import time
+import zlib
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+
+from .models import Comment, Follow, Group, Post
+from . import constants, counters, feed, search, threads
+from .cache import invalidate
+
+NDJSON = 'ndjson'
+CSV = 'csv'
+FORMATS = (NDJSON, CSV)
+
+# Порядок важен: при импорте связанные строки должны уже существовать.
+MODELS = {
+    'groups': (Group, ('id', 'title', 'slug', 'description')),
+    'posts': (
+        Post, ('id', 'author_id', 'group_id', 'text', 'image', 'created'),
+    ),
+    'comments': (Comment, (
+        'id', 'post_id', 'author_id', 'parent_id', 'path', 'text', 'created',
+    )),
+    'follows': (Follow, ('id', 'user_id', 'author_id')),
+}
+
+CHECKPOINT_NAME = '.import-checkpoint.json'
+
+
+def file_name(name, data_format):
+    return f'{name}.{data_format}'
+
+
+def _encode(value):
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def serialize(name, data_format, rows, header=True):
+    """Превращает кортежи значений в строки NDJSON или CSV."""
+    _, fields = MODELS[name]
+    if data_format == NDJSON:
+        for row in rows:
+            yield json.dumps(
+                dict(zip(fields, map(_encode, row))), ensure_ascii=False,
+            ) + '\n'
+        return
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if header:
+        writer.writerow(fields)
+    for row in rows:
+        writer.writerow(map(_encode, row))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def export_rows(name, after=None, chunk_size=constants.TRANSFER_CHUNK_SIZE,
+                **filters):
+    """Читает строки модели по порядку pk, не загружая их в память."""
+    model, fields = MODELS[name]
+    queryset = model.objects.filter(**filters).order_by('pk')
+    if after is not None:
+        queryset = queryset.filter(pk__gt=after)
+    return queryset.values_list(*fields).iterator(chunk_size=chunk_size)
+
+
+def buffered(chunks, size=constants.EXPORT_BUFFER_SIZE):
+    """Склеивает мелкие строки в куски примерно по size символов."""
+    parts = []
+    length = 0
+    for chunk in chunks:
+        parts.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield ''.join(parts)
+            parts = []
+            length = 0
+    if parts:
+        yield ''.join(parts)
+
+
+def gzipped(chunks, encoding='utf-8'):
+    """Сжимает поток строк в gzip по мере чтения."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode(encoding))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def author_export(author_id, name, data_format=NDJSON, after=None):
+    """Поток постов или комментариев автора, начиная после pk after."""
+    rows = export_rows(name, after=after, author_id=author_id)
+    return buffered(serialize(name, data_format, rows))
+
+
+def _parse(name, data_format, lines):
+    model, fields = MODELS[name]
+    if data_format == NDJSON:
+        records = (json.loads(line) for line in lines if line.strip())
+    else:
+        records = csv.DictReader(lines, fieldnames=fields)
+        next(records, None)
+    for record in records:
+        values = {}
+        for field_name in fields:
+            field = model._meta.get_field(field_name)
+            value = record.get(field_name)
+            if value == '' and field.null:
+                value = None
+            values[field.attname] = field.to_python(value)
+        yield model(**values)
+
+
+@contextlib.contextmanager
+def preserved_created():
+    """Сохраняет исходную дату создания вместо auto_now_add."""
+    fields = [model._meta.get_field('created') for model in (Post, Comment)]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Checkpoint:
+    """Число уже загруженных строк каждого файла импорта."""
+
+    def __init__(self, directory, resume):
+        self.path = os.path.join(directory, CHECKPOINT_NAME)
+        self.done = {}
+        if resume and os.path.exists(self.path):
+            with open(self.path, encoding='utf-8') as file:
+                self.done = json.load(file)
+
+    def save(self, name, rows):
+        self.done[name] = rows
+        temporary = self.path + '.tmp'
+        with open(temporary, 'w', encoding='utf-8') as file:
+            json.dump(self.done, file)
+        os.replace(temporary, self.path)
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def _batches(objects, size):
+    batch = []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_file(name, path, data_format, checkpoint,
+                batch_size=constants.TRANSFER_BATCH_SIZE):
+    """Загружает файл пачками bulk_create; возвращает число строк.
+
+    Каждая пачка фиксируется своей транзакцией вместе с отметкой
+    в checkpoint, поэтому прерванный импорт продолжается с последней
+    пачки. Повторная вставка уже загруженных pk игнорируется.
+    """
+    model, _ = MODELS[name]
+    skip = checkpoint.done.get(name, 0)
+    rows = skip
+    with open(path, encoding='utf-8', newline='') as file:
+        objects = _parse(name, data_format, file)
+        for _ in range(skip):
+            next(objects, None)
+        for batch in _batches(objects, batch_size):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, ignore_conflicts=True)
+            rows += len(batch)
+            checkpoint.save(name, rows)
+    return rows - skip
+
+
+def reset_sequences():
+    """Сдвигает счетчики pk после вставки строк с явными id."""
+    statements = connection.ops.sequence_reset_sql(
+        no_style(), [model for model, _ in MODELS.values()]
+    )
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def rebuild_dependent():
+    """Пересчитывает то, что обычно поддерживают сигналы моделей."""
+    with transaction.atomic():
+        counters.reconcile()
+        feed.rebuild_timelines()
+        threads.fill_paths()
+    search.get_backend().rebuild()
+    invalidate('index', 'groups')
+
+
+def import_data(directory, data_format=NDJSON, names=None, resume=False,
+                batch_size=constants.TRANSFER_BATCH_SIZE, report=None):
+    """Импортирует файлы каталога; report(name, rows, seconds)."""
+    checkpoint = Checkpoint(directory, resume)
+    with preserved_created():
+        for name in MODELS:
+            if names and name not in names:
+                continue
+            path = os.path.join(directory, file_name(name, data_format))
+            if not os.path.exists(path):
+                continue
+            start = time.monotonic()
+            rows = import_file(name, path, data_format, checkpoint, batch_size)
+            if report:
+                report(name, rows, time.monotonic() - start)
+    reset_sequences()
+    rebuild_dependent()
+    checkpoint.clear()
+
+
+class _RowCounter:
+    def __init__(self, rows):
+        self.rows = 0
+        self._iterator = iter(rows)
+
+    def __iter__(self):
+        for row in self._iterator:
+            self.rows += 1
+            yield row
+
+
+def export_data(directory, data_format=NDJSON, names=None, report=None):
+    """Выгружает модели в файлы каталога; report(name, rows, seconds)."""
+    os.makedirs(directory, exist_ok=True)
+    for name in MODELS:
+        if names and name not in names:
+            continue
+        start = time.monotonic()
+        counter = _RowCounter(export_rows(name))
+        path = os.path.join(directory, file_name(name, data_format))
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.writelines(serialize(name, data_format, counter))
+        if report:
+            report(name, counter.rows, time.monotonic() - start)
@@ -1,6 +1,9 @@
-from django.urls import path
+from django.urls import path, register_converter
 
 from . import views
+from .syndication import FeedFormatConverter
+
+register_converter(FeedFormatConverter, 'feed_format')
 
 app_name = 'posts'
 
@@ -9,6 +12,12 @@ urlpatterns = [
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.comment_list,
+        name='comment_list'
+    ),
+    path('search/', views.search, name='search'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
@@ -28,4 +37,66 @@ urlpatterns = [
         views.profile_unfollow,
         name='profile_unfollow'
     ),
+    path(
+        'feed/<feed_format:feed_format>/',
+        views.index_feed,
+        name='index_feed'
+    ),
+    path(
+        'group/<slug:slug>/feed/<feed_format:feed_format>/',
+        views.group_feed,
+        name='group_feed'
+    ),
+    path(
+        'profile/<str:username>/feed/<feed_format:feed_format>/',
+        views.profile_feed,
+        name='profile_feed'
+    ),
+    path(
+        'follow/feed/rotate/',
+        views.follow_feed_rotate,
+        name='follow_feed_rotate'
+    ),
+    path(
+        'follow/feed/<str:token>/<feed_format:feed_format>/',
+        views.follow_feed,
+        name='follow_feed'
+    ),
+    path(
+        'profile/<str:username>/export/',
+        views.author_export,
+        name='author_export'
+    ),
+    path('api/v1/posts/', views.api_index, name='api_index'),
+    path(
+        'api/v1/posts/<int:post_id>/',
+        views.api_post,
+        name='api_post'
+    ),
+    path(
+        'api/v1/groups/<slug:slug>/',
+        views.api_group,
+        name='api_group'
+    ),
+    path(
+        'api/v1/profiles/<str:username>/',
+        views.api_profile,
+        name='api_profile'
+    ),
+    path('api/v1/follow/', views.api_follow, name='api_follow'),
+    path(
+        'api/v1/batch/posts/',
+        views.api_batch_posts,
+        name='api_batch_posts'
+    ),
+    path(
+        'api/v1/batch/comments/',
+        views.api_batch_comments,
+        name='api_batch_comments'
+    ),
+    path(
+        'api/v1/batch/follows/',
+        views.api_batch_follows,
+        name='api_batch_follows'
+    ),
 ]
@@ -1,34 +1,257 @@
+import base64
+import binascii
+import logging
 import time
 import functools
+from collections.abc import Sequence
+from contextlib import ExitStack, contextmanager
 
-from django.db import connection, reset_queries
+from django.conf import settings
+from django.db import connections
+from django.db.models import Q, QuerySet
 from django.core.paginator import Paginator
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCounter:
+    """Обертка для connection.execute_wrapper: считает запросы и время.
+
+    В отличие от connection.queries работает и при DEBUG=False.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.duration += time.perf_counter() - start
+
+
+@contextmanager
+def count_queries(counter):
+    """Подключает counter ко всем соединениям, включая реплики."""
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
 
 
 def query_debugger(func):
 
     @functools.wraps(func)
     def inner_func(*args, **kwargs):
-
-        reset_queries()
-
-        start_queries = len(connection.queries)
+        counter = QueryCounter()
 
         start = time.perf_counter()
-        result = func(*args, **kwargs)
+        with count_queries(counter):
+            result = func(*args, **kwargs)
         end = time.perf_counter()
 
-        end_queries = len(connection.queries)
-
         print(f"Function : {func.__name__}")
-        print(f"Number of Queries : {end_queries - start_queries}")
+        print(f"Number of Queries : {counter.count}")
         print(f"Finished in : {(end - start):.2f}s")
         return result
 
     return inner_func
 
 
-def get_page_obj(request, object_list, per_page):
-    paginator = Paginator(object_list, per_page)
-    page_number = request.GET.get('page')
-    return paginator.get_page(page_number)
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+def _check_budget(view, request, counter, max_queries):
+    if counter.count > max_queries:
+        message = (
+            f'{view.__name__}: {counter.count} запросов '
+            f'при бюджете {max_queries} ({request.path})'
+        )
+        logger.error(message)
+        if getattr(settings, 'QUERY_BUDGET_STRICT', False):
+            raise QueryBudgetExceeded(message)
+
+
+def _counted_stream(chunks, counter, check):
+    """Считает запросы, которые выполняются при отдаче потока."""
+    chunks = iter(chunks)
+    while True:
+        with count_queries(counter):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        yield chunk
+    check()
+
+
+def query_budget(max_queries):
+    """Объявляет максимальное число SQL-запросов для view.
+
+    Превышение пишется в лог, а при QUERY_BUDGET_STRICT приводит
+    к исключению, чтобы регрессию поймали тесты. У потокового ответа
+    в бюджет входят и запросы, выполненные при отдаче потока; они
+    проверяются, когда поток дочитан до конца.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(request, *args, **kwargs):
+            counter = QueryCounter()
+            with count_queries(counter):
+                response = view(request, *args, **kwargs)
+            check = functools.partial(
+                _check_budget, view, request, counter, max_queries)
+            if getattr(response, 'streaming', False):
+                response.streaming_content = _counted_stream(
+                    response.streaming_content, counter, check)
+            else:
+                check()
+            return response
+
+        wrapper.query_budget = max_queries
+        return wrapper
+    return decorator
+
+
+CURSOR_NEXT = 'n'
+CURSOR_PREVIOUS = 'p'
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(direction, created, pk):
+    raw = f'{direction}|{created.isoformat()}|{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        direction, created, pk = raw.decode().split('|')
+        created = parse_datetime(created)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+        raise InvalidCursor(token)
+    if direction not in (CURSOR_NEXT, CURSOR_PREVIOUS) or created is None:
+        raise InvalidCursor(token)
+    return direction, created, pk
+
+
+class CursorPage(Sequence):
+    """Страница keyset-пагинации: не знает общего числа страниц."""
+
+    def __init__(self, object_list, paginator, next_cursor=None,
+                 previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """Пагинация по ключу (created, id) без COUNT(*) и OFFSET.
+
+    ordering задает пару полей (время, уникальный ключ), по которой
+    идет пагинация; она должна совпадать с индексом выборки.
+    """
+
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, ordering=('created', 'pk')):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.created_field, self.pk_field = ordering
+
+    @cached_property
+    def count(self):
+        """COUNT(*) выполняется только по явному запросу, не при рендере."""
+        return self.object_list.count()
+
+    def page_queryset(self, direction=CURSOR_NEXT, created=None, pk=None):
+        """Запрос одной страницы (с лишней строкой для has_next)."""
+        created_field, pk_field = self.created_field, self.pk_field
+        if direction == CURSOR_NEXT:
+            queryset = self.object_list.order_by(
+                f'-{created_field}', f'-{pk_field}')
+            if created is not None:
+                queryset = queryset.filter(
+                    Q(**{f'{created_field}__lt': created})
+                    | Q(**{created_field: created, f'{pk_field}__lt': pk})
+                )
+        else:
+            queryset = self.object_list.order_by(
+                created_field, pk_field
+            ).filter(
+                Q(**{f'{created_field}__gt': created})
+                | Q(**{created_field: created, f'{pk_field}__gt': pk})
+            )
+        return queryset[:self.per_page + 1]
+
+    def get_page(self, cursor=None):
+        """Возвращает страницу по курсору; битый курсор даёт первую."""
+        try:
+            direction, created, pk = decode_cursor(cursor)
+        except InvalidCursor:
+            direction, created, pk = CURSOR_NEXT, None, None
+
+        rows = list(self.page_queryset(direction, created, pk))
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+
+        if direction == CURSOR_PREVIOUS:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, created is not None
+
+        next_cursor = previous_cursor = None
+        if rows and has_next:
+            next_cursor = self._cursor(CURSOR_NEXT, rows[-1])
+        if rows and has_previous:
+            previous_cursor = self._cursor(CURSOR_PREVIOUS, rows[0])
+        return CursorPage(rows, self, next_cursor, previous_cursor)
+
+    def _cursor(self, direction, row):
+        # Строки .values() — словари, у них поля берутся по ключу.
+        if isinstance(row, dict):
+            created, pk = row[self.created_field], row[self.pk_field]
+        else:
+            created = getattr(row, self.created_field)
+            pk = getattr(row, self.pk_field)
+        return encode_cursor(direction, created, pk)
+
+
+def get_page_obj(request, object_list, per_page, ordering=('created', 'pk')):
+    """Keyset-страница для querysets; ?page=N оставлен для старых ссылок."""
+    if 'page' in request.GET or not isinstance(object_list, QuerySet):
+        paginator = Paginator(object_list, per_page)
+        page_number = request.GET.get('page')
+        return paginator.get_page(page_number)
+
+    paginator = CursorPaginator(object_list, per_page, ordering)
+    return paginator.get_page(request.GET.get('cursor'))
@@ -1,14 +1,28 @@
+import json
+
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
+from django.db import transaction
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_POST
 
+from core.routers import primary_view
 from .models import Post, Group, User, Follow
 from .forms import PostForm, CommentForm
 from . import constants
-from .utils import get_page_obj
-
-
-@cache_page(20, key_prefix='index_page')
+from .utils import InvalidCursor, get_page_obj, query_budget
+from .cache import cached_view
+from .conditional import (
+    conditional_view, group_state, index_state, post_state, profile_state
+)
+from .feed import FEED_ORDERING, get_follow_feed
+from .search import search_post_ids
+from . import api, batch, syndication, threads, transfer
+
+
+@query_budget(5)
+@conditional_view(index_state)
+@cached_view('index')
 def index(request):
     template = 'posts/index.html'
     post_list = Post.objects.select_related(
@@ -28,11 +42,15 @@ def index(request):
     return render(request, template, context)
 
 
+@query_budget(6)
+@conditional_view(group_state)
+@cached_view('groups', 'group:{slug}')
 def group_posts(request, slug):
     template = 'posts/group_list.html'
     group = get_object_or_404(Group, slug=slug)
     post_list = group.posts.select_related(
         'author',
+        'group',
     )
 
     page_obj = get_page_obj(
@@ -48,10 +66,17 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@query_budget(7)
+@conditional_view(profile_state)
+@cached_view('groups', 'profile:{username}')
 def profile(request, username):
     template = 'posts/profile.html'
-    author = get_object_or_404(User, username=username)
+    author = get_object_or_404(
+        User.objects.select_related('stats'),
+        username=username,
+    )
     post_list = author.posts.select_related(
+        'author',
         'group',
     )
 
@@ -74,13 +99,38 @@ def profile(request, username):
     return render(request, template, context)
 
 
+def post_author_cache_tags(request, post_id):
+    return [
+        f'profile:{username}' for username in Post.objects.filter(
+            pk=post_id
+        ).values_list('author__username', flat=True)
+    ]
+
+
+def get_comment_page(request, post_id, cursor_name):
+    """Пачка веток по курсору или, с ?replies=, продолжение одной ветки."""
+    if 'replies' not in request.GET:
+        return threads.get_thread_page(post_id, request.GET.get(cursor_name))
+    try:
+        return threads.get_reply_page(post_id, request.GET['replies'])
+    except InvalidCursor:
+        raise Http404
+
+
+@query_budget(7)
+@conditional_view(post_state)
+@cached_view('groups', 'post:{post_id}', post_author_cache_tags)
 def post_detail(request, post_id):
     template = 'posts/post_detail.html'
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.select_related(
-        'post'
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'),
+        pk=post_id,
+    )
+    comments = get_comment_page(request, post.pk, 'comments')
+    form = CommentForm(
+        request.POST or None,
+        initial={'parent': request.GET.get('reply_to')},
     )
-    form = CommentForm(request.POST or None)
 
     context = {
         'post': post,
@@ -90,6 +140,57 @@ def post_detail(request, post_id):
     return render(request, template, context)
 
 
+@query_budget(7)
+@conditional_view(post_state)
+@cached_view('groups', 'post:{post_id}', post_author_cache_tags)
+def comment_list(request, post_id):
+    template = 'posts/includes/comments.html'
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = get_comment_page(request, post_id, 'cursor')
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            'comments': [threads.serialize(item) for item in comments],
+            'next_cursor': comments.next_cursor,
+        })
+
+    context = {
+        'post_id': post_id,
+        'comments': comments,
+    }
+    return render(request, template, context)
+
+
+@query_budget(4)
+def search(request):
+    template = 'posts/search.html'
+    query = request.GET.get('q', '').strip()
+    post_ids = search_post_ids(query) if query else []
+
+    page_obj = get_page_obj(
+        request,
+        post_ids,
+        constants.NUMBER_OF_RECENT_POSTS
+    )
+    posts = Post.objects.select_related(
+        'author',
+        'group',
+    ).in_bulk(page_obj.object_list)
+    page_obj.object_list = [
+        posts[post_id] for post_id in page_obj.object_list
+        if post_id in posts
+    ]
+
+    context = {
+        'query': query,
+        'page_obj': page_obj,
+    }
+    return render(request, template, context)
+
+
+@query_budget(12)
+@primary_view
 @login_required
 def post_create(request):
     template = 'posts/create_post.html'
@@ -108,12 +209,15 @@ def post_create(request):
     if form.is_valid():
         new_post = form.save(commit=False)
         new_post.author = request.user
-        new_post.save()
+        with transaction.atomic():
+            new_post.save()
         return redirect('posts:profile', request.user.username)
 
     return render(request, template, context)
 
 
+@query_budget(10)
+@primary_view
 @login_required
 def post_edit(request, post_id):
     template = 'posts/create_post.html'
@@ -136,58 +240,260 @@ def post_edit(request, post_id):
         return render(request, template, context)
 
     if form.is_valid():
-        form.save()
+        # Счетчики поста пишут другие запросы: сохраняем только поля
+        # формы, чтобы не затереть их значениями из начала запроса.
+        post = form.save(commit=False)
+        post.save(update_fields=(*PostForm.Meta.fields, 'version', 'modified'))
         return redirect('posts:post_detail', post_id)
 
     return render(request, template, context)
 
 
+@query_budget(8)
+@primary_view
 @login_required
 def add_comment(request, post_id):
     template = 'posts:post_detail'
     post = get_object_or_404(Post, id=post_id)
-    form = CommentForm(request.POST or None)
+    form = CommentForm(request.POST or None, post=post)
 
     if form.is_valid():
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        with transaction.atomic():
+            comment.save()
 
     return redirect(template, post_id=post_id)
 
 
+@query_budget(5)
 @login_required
 def follow_index(request):
     template = 'posts/follow.html'
-    post_list = Post.objects.filter(
-        author__following__user=request.user
-    ).select_related(
+    post_list = get_follow_feed(request.user).select_related(
         'author',
+        'group',
     )
 
     page_obj = get_page_obj(
         request,
         post_list,
-        constants.NUMBER_OF_RECENT_POSTS
+        constants.NUMBER_OF_RECENT_POSTS,
+        FEED_ORDERING,
     )
 
     context = {
-        'page_obj': page_obj
+        'page_obj': page_obj,
+        'feed_token': syndication.follow_feed_token(request.user),
     }
     return render(request, template, context)
 
 
+@query_budget(16)
+@primary_view
 @login_required
 def profile_follow(request, username):
     if request.user.username != username:
         author = get_object_or_404(User, username=username)
-        Follow.objects.get_or_create(user=request.user, author=author)
+        with transaction.atomic():
+            Follow.objects.get_or_create(user=request.user, author=author)
     return redirect('posts:profile', username)
 
 
+@query_budget(15)
+@primary_view
 @login_required
 def profile_unfollow(request, username):
     author = get_object_or_404(User, username=username)
-    Follow.objects.filter(user=request.user, author=author).delete()
+    with transaction.atomic():
+        Follow.objects.filter(user=request.user, author=author).delete()
     return redirect('posts:profile', username)
+
+
+@query_budget(4)
+@login_required
+def author_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        return redirect('posts:profile', username)
+
+    records = request.GET.get('records')
+    if records not in constants.AUTHOR_EXPORT_RECORDS:
+        records = constants.AUTHOR_EXPORT_RECORDS[0]
+    data_format = request.GET.get('format')
+    if data_format not in transfer.FORMATS:
+        data_format = transfer.NDJSON
+    after = request.GET.get('after')
+    after = int(after) if after and after.isdigit() else None
+
+    chunks = transfer.author_export(author.pk, records, data_format, after)
+    filename = f'{username}-{records}.{data_format}'
+    content_type = (
+        'application/x-ndjson' if data_format == transfer.NDJSON
+        else 'text/csv'
+    )
+    if request.GET.get('gzip'):
+        chunks = transfer.gzipped(chunks)
+        filename += '.gz'
+        content_type = 'application/gzip'
+
+    response = StreamingHttpResponse(
+        chunks, content_type=f'{content_type}; charset=utf-8'
+    )
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@query_budget(4)
+@conditional_view(index_state)
+@cached_view('index')
+def index_feed(request, feed_format):
+    return syndication.serve(syndication.IndexFeed, request, feed_format)
+
+
+@query_budget(5)
+@conditional_view(group_state)
+@cached_view('groups', 'group:{slug}')
+def group_feed(request, slug, feed_format):
+    return syndication.serve(
+        syndication.GroupFeed, request, feed_format, slug=slug
+    )
+
+
+@query_budget(5)
+@conditional_view(profile_state)
+@cached_view('groups', 'profile:{username}')
+def profile_feed(request, username, feed_format):
+    return syndication.serve(
+        syndication.ProfileFeed, request, feed_format, username=username
+    )
+
+
+@query_budget(6)
+@primary_view
+@require_POST
+@login_required
+def follow_feed_rotate(request):
+    with transaction.atomic():
+        syndication.rotate_follow_feed_token(request.user)
+    return redirect('posts:follow_index')
+
+
+@query_budget(8)
+@conditional_view(syndication.follow_state)
+@cached_view(syndication.follow_cache_tags)
+def follow_feed(request, token, feed_format):
+    return syndication.serve(
+        syndication.FollowFeed, request, feed_format, token=token
+    )
+
+
+@query_budget(4)
+@conditional_view(index_state)
+@cached_view('index')
+def api_index(request):
+    return api.render(request, api.post_page(request, Post.objects.all()))
+
+
+@query_budget(5)
+@conditional_view(group_state)
+@cached_view('groups', 'group:{slug}')
+def api_group(request, slug):
+    group = Group.objects.filter(slug=slug).values(
+        'pk', *api.GROUP_FIELDS
+    ).first()
+    if group is None:
+        return api.render_error('Группа не найдена', 404)
+
+    data = api.post_page(request, Post.objects.filter(group_id=group['pk']))
+    data['group'] = {name: group[name] for name in api.GROUP_FIELDS}
+    return api.render(request, data)
+
+
+@query_budget(7)
+@conditional_view(profile_state)
+@cached_view('groups', 'profile:{username}')
+def api_profile(request, username):
+    author = User.objects.filter(username=username).values(
+        'pk', *api.AUTHOR_FIELDS.values()
+    ).first()
+    if author is None:
+        return api.render_error('Автор не найден', 404)
+
+    data = api.post_page(request, Post.objects.filter(author_id=author['pk']))
+    data['author'] = api.item(
+        author, api.AUTHOR_FIELDS, api.AUTHOR_FIELDS)
+    data['author']['following'] = (
+        request.user.is_authenticated and Follow.objects.filter(
+            user=request.user, author_id=author['pk']
+        ).exists()
+    )
+    return api.render(request, data)
+
+
+@query_budget(7)
+@conditional_view(post_state)
+@cached_view('groups', 'post:{post_id}', post_author_cache_tags)
+def api_post(request, post_id):
+    names = api.selected_fields(request)
+    row = api.project(
+        Post.objects.filter(pk=post_id), names
+    ).first()
+    if row is None:
+        return api.render_error('Пост не найден', 404)
+
+    comments = threads.get_thread_page(post_id, request.GET.get('cursor'))
+    return api.render(request, {
+        'post': api.item(row, names),
+        'comments': [threads.serialize(comment) for comment in comments],
+        'next': comments.next_cursor,
+    })
+
+
+@query_budget(4)
+def api_follow(request):
+    if not request.user.is_authenticated:
+        return api.render_error('Требуется авторизация', 401)
+
+    return api.render(request, api.post_page(
+        request, get_follow_feed(request.user), FEED_ORDERING
+    ))
+
+
+def batch_response(request, write):
+    """Разбирает {"items": [...]} и отдает результаты по элементам."""
+    if not request.user.is_authenticated:
+        return api.render_error('Требуется авторизация', 401)
+    try:
+        data = json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError) as error:
+        return api.render_error(f'Некорректный JSON: {error}', 400)
+    if not isinstance(data, dict) or not isinstance(data.get('items'), list):
+        return api.render_error('Ожидается объект {"items": [...]}', 400)
+    try:
+        results = write(request.user, data['items'])
+    except batch.BatchError as error:
+        return api.render_error(str(error), 400)
+    return api.render(request, {'results': results})
+
+
+@query_budget(12)
+@primary_view
+@require_POST
+def api_batch_posts(request):
+    return batch_response(request, batch.create_posts)
+
+
+@query_budget(11)
+@primary_view
+@require_POST
+def api_batch_comments(request):
+    return batch_response(request, batch.create_comments)
+
+
+@query_budget(16)
+@primary_view
+@require_POST
+def api_batch_follows(request):
+    return batch_response(request, batch.change_follows)
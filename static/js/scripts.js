@@ -0,0 +1,18 @@
+// Подгрузка следующих веток комментариев без перезагрузки страницы.
+// Без JavaScript ссылка «Показать еще» открывает ту же пачку на странице
+// поста.
+document.addEventListener('click', function (event) {
+  var link = event.target.closest('[data-comments-url]');
+  if (!link) {
+    return;
+  }
+  event.preventDefault();
+  fetch(link.dataset.commentsUrl, {credentials: 'same-origin'})
+    .then(function (response) {
+      return response.text();
+    })
+    .then(function (html) {
+      link.insertAdjacentHTML('afterend', html);
+      link.remove();
+    });
+});
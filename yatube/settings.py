@@ -1,5 +1,7 @@
 import os
 
+from core.database import database_from_env, replica_from_env
+
 # Build paths inside the project like this: os.path.join(BASE_DIR, ...)
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -41,6 +43,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.ProfilingMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -76,16 +80,40 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
+
+# Потоков, в которых ASGI-обертка выполняет запросы к Django
+ASGI_THREADS = int(os.environ.get('ASGI_THREADS', 16))
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Движок и параметры подключения задаются переменными окружения DB_*:
+# DB_ENGINE=postgresql, DB_NAME, DB_USER, DB_PASSWORD, DB_HOST, DB_PORT,
+# DB_CONN_MAX_AGE, DB_POOL=1 с DB_POOL_MIN_SIZE и DB_POOL_MAX_SIZE.
+# Без них используется SQLite-файл db.sqlite3 (DB_BUSY_TIMEOUT).
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
-    }
+    'default': database_from_env(BASE_DIR),
+}
+
+# Реплика для чтения задается так же переменными DB_REPLICA_*;
+# без DB_REPLICA_NAME или DB_REPLICA_HOST все идет в основную базу
+REPLICA_DATABASE = replica_from_env(BASE_DIR)
+if REPLICA_DATABASE:
+    DATABASES['replica'] = REPLICA_DATABASE
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+DATABASE_ROUTERS = ['core.routers.PrimaryReplicaRouter']
+
+# После записи пользователь столько секунд читает с основной базы
+REPLICA_STICKY_COOKIE = 'primary_db'
+REPLICA_STICKY_SECONDS = 10
+
+# Прагмы для каждого соединения SQLite: WAL не блокирует чтение
+# во время записи, NORMAL не вызывает fsync на каждый коммит
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
 }
 
 
@@ -142,11 +170,45 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 # Указываем директорию, в которую будут складываться файлы писем
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
+# Адрес сайта для ссылок в письмах-дайджестах
+SITE_URL = os.environ.get('SITE_URL', 'http://127.0.0.1:8000')
+
 
 # Путь к кастомным страницам ошибок
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
 
+# Превышение бюджета SQL-запросов view пишется в лог;
+# тесты бюджетов включают исключение через override_settings
+QUERY_BUDGET_STRICT = False
+
+
+# Профилирование запросов: доля профилируемых запросов
+# и порог медленного запроса в миллисекундах
+PROFILING_SAMPLE_RATE = 0.1
+PROFILING_SLOW_REQUEST_MS = 500
+
+
+# Миниатюры картинок строятся в фоновом пуле потоков после сохранения поста
+THUMBNAIL_PREGENERATE_ASYNC = True
+THUMBNAIL_WORKERS = 2
+
+
+# Фоновые задачи core.tasks выполняются командой run_tasks; с TASKS_EAGER
+# (его включает тестовый раннер) — в том же процессе после коммита.
+# Повторы — с удваивающейся паузой
+TASKS_EAGER = os.environ.get('TASKS_EAGER', '0') == '1'
+TASKS_MAX_ATTEMPTS = 5
+TASKS_BACKOFF_SECONDS = 10
+TASKS_BACKOFF_MAX = 3600
+TASKS_LOCK_TIMEOUT = 600
+# Пока задача выполняется, обработчик продлевает захват с этим периодом.
+TASKS_HEARTBEAT_INTERVAL = 60
+TASKS_POLL_INTERVAL = 1
+
+TEST_RUNNER = 'core.testing.TestRunner'
+
+
 # Кешированиеr
 CACHES = {
     'default': {